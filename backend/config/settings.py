@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import os
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
 from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -137,11 +138,12 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # Byte-compatible with DRF's JSON classes; uses orjson when the "fast" extra is installed.
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+        "studio.renderers.FastJSONRenderer",
     ],
     "DEFAULT_PARSER_CLASSES": [
-        "rest_framework.parsers.JSONParser",
+        "studio.renderers.FastJSONParser",
     ],
 }
 
@@ -188,5 +190,29 @@ CSRF_TRUSTED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+CORS_ALLOW_HEADERS = (*default_headers, "if-none-match", "if-match")
+
+CORS_EXPOSE_HEADERS = ["ETag"]
+
 
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
+
+# Block version storage: "full" keeps a complete payload per version, "delta" (opt-in)
+# stores text diffs against the previous version with a full keyframe every N versions.
+STUDIO_BLOCK_VERSION_STORAGE = os.environ.get("STUDIO_BLOCK_VERSION_STORAGE", "full")
+STUDIO_BLOCK_VERSION_KEYFRAME_INTERVAL = int(
+    os.environ.get("STUDIO_BLOCK_VERSION_KEYFRAME_INTERVAL", "16")
+)
+
+# Overrides of the retention rules applied by ``manage.py prune_block_versions``; unset
+# keys keep the defaults in studio.data.retention.DEFAULT_VERSION_RETENTION.
+STUDIO_BLOCK_VERSION_RETENTION = {}
+
+# Seconds during which autosaved edits of a block are merged into one version; see
+# studio.data.autosave. Pending drafts are listed in chapter reads until written; run
+# ``manage.py flush_block_drafts`` periodically to write idle ones.
+STUDIO_BLOCK_AUTOSAVE_WINDOW = int(os.environ.get("STUDIO_BLOCK_AUTOSAVE_WINDOW", "10"))
+
+# Seconds a book's context tree stays cached; entries are keyed by the book's context
+# version, so writes invalidate them regardless (see studio.data.context).
+STUDIO_CONTEXT_CACHE_TIMEOUT = int(os.environ.get("STUDIO_CONTEXT_CACHE_TIMEOUT", "300"))
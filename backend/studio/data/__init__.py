@@ -1,10 +1,19 @@
 from .blocks import (
+    ChapterBlockConflictError,
+    apply_chapter_block_operations,
+    autosave_chapter_block,
+    commit_chapter_block_draft,
     create_chapter_block,
     delete_chapter_block,
     delete_chapter_block_version,
     ensure_turn_identifiers,
     extract_chapter_context_for_block,
+    flush_chapter_block_drafts,
+    get_chapter_block,
+    get_chapter_block_drafts,
+    get_chapter_block_window,
     list_chapter_block_versions,
+    transfer_chapter_blocks,
     update_chapter_block,
 )
 from .books import (
@@ -12,10 +21,16 @@ from .books import (
     delete_book,
     get_book_metadata,
     get_library_books,
+    iter_library_books,
     update_book,
 )
 from .bootstrap import bootstrap_sample_data
-from .chapters import create_chapter, get_chapter_detail, update_chapter
+from .chapters import (
+    create_chapter,
+    get_chapter_detail,
+    get_chapter_revision,
+    update_chapter,
+)
 from .context import (
     create_book_context_item,
     delete_book_context_item,
@@ -29,20 +44,33 @@ from .conversions import (
     create_block_conversion_suggestion,
 )
 from .editor import get_editor_state
+from .export import iter_book_export
+from .importer import guess_manuscript_format, import_manuscript
 
 __all__ = [
     "create_book",
     "delete_book",
     "get_book_metadata",
     "get_library_books",
+    "iter_library_books",
     "update_book",
     "create_chapter",
     "get_chapter_detail",
+    "get_chapter_revision",
     "update_chapter",
+    "ChapterBlockConflictError",
+    "apply_chapter_block_operations",
+    "transfer_chapter_blocks",
+    "autosave_chapter_block",
+    "commit_chapter_block_draft",
     "create_chapter_block",
     "delete_chapter_block",
     "delete_chapter_block_version",
     "extract_chapter_context_for_block",
+    "flush_chapter_block_drafts",
+    "get_chapter_block",
+    "get_chapter_block_drafts",
+    "get_chapter_block_window",
     "list_chapter_block_versions",
     "update_chapter_block",
     "ensure_turn_identifiers",
@@ -53,6 +81,9 @@ __all__ = [
     "update_book_context_items",
     "update_chapter_context_visibility",
     "get_editor_state",
+    "iter_book_export",
+    "guess_manuscript_format",
+    "import_manuscript",
     "bootstrap_sample_data",
     "create_block_conversion_suggestion",
     "apply_block_conversion_suggestion",
@@ -0,0 +1,118 @@
+"""Write-behind buffer for autosaved block edits.
+
+Autosave PATCHes store their changes in a ``ChapterBlockDraft`` row instead of writing a
+block version, so a burst of keystrokes costs one small upsert per request. The drafts
+of a block are merged into a single version (see ``studio.data.blocks``) when:
+
+* the block gets a regular edit or an explicit commit,
+* another block of the same chapter is edited, created or reordered,
+* the draft is older than ``STUDIO_BLOCK_AUTOSAVE_WINDOW`` seconds when the next autosave
+  of the block arrives, or when ``manage.py flush_block_drafts`` runs.
+
+Reads never flush. Chapter detail and block window responses list the pending drafts
+(``pendingDrafts``) and the chapter ETag changes with them, so clients render the
+buffered text until it is written; the flush command can run periodically to write idle
+bursts.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from ..models import ChapterBlockDraft
+
+__all__ = [
+    "AUTOSAVE_EXCLUDED_FIELDS",
+    "autosave_window",
+    "draft_due_before",
+    "draft_changes",
+    "pending_drafts",
+    "store_block_draft",
+    "take_block_draft",
+]
+
+# Structural edits are never buffered; they go through a regular block update.
+AUTOSAVE_EXCLUDED_FIELDS = frozenset({"position", "version"})
+
+
+def autosave_window() -> timedelta:
+    return timedelta(seconds=max(0, int(getattr(settings, "STUDIO_BLOCK_AUTOSAVE_WINDOW", 10))))
+
+
+def draft_due_before(now: Optional[datetime] = None) -> datetime:
+    """Return the creation time before which a draft is due for flushing."""
+    return (now or timezone.now()) - autosave_window()
+
+
+def pending_drafts(
+    chapter_id: Optional[str] = None,
+    *,
+    block_ids: Optional[List[str]] = None,
+    exclude_block_id: Optional[str] = None,
+    due_only: bool = False,
+) -> List[Tuple[str, str]]:
+    """Return ``(chapter_id, block_id)`` for blocks with buffered changes, oldest first."""
+    drafts = ChapterBlockDraft.objects.order_by("created_at", "block_id")
+    if chapter_id is not None:
+        drafts = drafts.filter(chapter_id=chapter_id)
+    if block_ids is not None:
+        drafts = drafts.filter(block_id__in=block_ids)
+    if exclude_block_id is not None:
+        drafts = drafts.exclude(block_id=exclude_block_id)
+    if due_only:
+        drafts = drafts.filter(created_at__lte=draft_due_before())
+    return list(drafts.values_list("chapter_id", "block_id"))
+
+
+def draft_changes(chapter_id: str) -> List[Tuple[str, Dict[str, Any], datetime]]:
+    """Return ``(block_id, changes, created_at)`` for the chapter's drafts, oldest first."""
+    drafts = ChapterBlockDraft.objects.filter(chapter_id=chapter_id).order_by(
+        "created_at", "block_id"
+    )
+    return [
+        (block_id, dict(changes or {}), created_at)
+        for block_id, changes, created_at in drafts.values_list("block_id", "changes", "created_at")
+    ]
+
+
+def take_block_draft(block_id: str) -> Dict[str, Any]:
+    """Remove and return the buffered changes of a block; call inside the write transaction."""
+    changes = ChapterBlockDraft.objects.filter(pk=block_id).values_list("changes", flat=True)
+    buffered = changes.first()
+    if buffered is None:
+        return {}
+    ChapterBlockDraft.objects.filter(pk=block_id).delete()
+    return dict(buffered)
+
+
+def store_block_draft(
+    chapter_id: str,
+    block_id: str,
+    changes: Dict[str, Any],
+) -> ChapterBlockDraft:
+    """Merge ``changes`` over the block's buffered changes, starting a burst if needed.
+
+    Call inside the write transaction. Locking a missing row does not stop a concurrent
+    first autosave from starting the burst, so a lost insert merges into the winner's row.
+    """
+    draft = ChapterBlockDraft.objects.select_for_update().filter(pk=block_id).first()
+    if draft is None:
+        try:
+            with transaction.atomic():
+                return ChapterBlockDraft.objects.create(
+                    block_id=block_id,
+                    chapter_id=chapter_id,
+                    changes=dict(changes),
+                )
+        except IntegrityError:
+            draft = ChapterBlockDraft.objects.select_for_update().filter(pk=block_id).first()
+            if draft is None:
+                raise KeyError(f"Unknown block: {block_id}") from None
+    draft.changes = {**dict(draft.changes or {}), **changes}
+    draft.save(update_fields=["changes", "updated_at"])
+    return draft
@@ -1,24 +1,80 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from uuid import uuid4
 
-from django.db import transaction
-from django.db.models import F, Max
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.utils import timezone
 
 from ..models import Chapter, ChapterBlock, ChapterBlockType, ChapterBlockVersion
-from ..payloads import ChapterDetailPayload
+from ..payloads import (
+    ChapterBlockAutosavePayload,
+    ChapterBlockDeltaPayload,
+    ChapterBlockDraftPayload,
+    ChapterBlockPayload,
+    ChapterBlockPositionPayload,
+    ChapterBlockTransferPayload,
+    ChapterBlockWindowPayload,
+    ChapterDetailPayload,
+    payload_content_hash,
+)
+from .autosave import (
+    AUTOSAVE_EXCLUDED_FIELDS,
+    draft_changes,
+    pending_drafts,
+    store_block_draft,
+    take_block_draft,
+)
+from .chapters import apply_chapter_text_delta, bump_chapter_revision
+from .materializer import (
+    materialize_chapter_block_window,
+    materialize_chapter_blocks,
+    materialize_chapter_detail,
+    store_chapter_snapshot,
+)
+from .ordering import (
+    BLOCK_ORDERING,
+    append_sort_key,
+    apply_block_order,
+    block_position,
+    move_sort_key,
+    ordered_chapter_blocks,
+    sort_key_at,
+)
+from .versions import (
+    activate_version,
+    deactivate_versions,
+    detach_version_dependents,
+    stored_version_fields,
+    version_payload,
+    version_payloads,
+)
 
 __all__ = [
     "ensure_turn_identifiers",
     "extract_chapter_context_for_block",
+    "get_chapter_block",
+    "get_chapter_block_drafts",
+    "get_chapter_block_window",
     "create_chapter_block",
     "update_chapter_block",
+    "autosave_chapter_block",
+    "commit_chapter_block_draft",
+    "flush_chapter_block_drafts",
     "delete_chapter_block",
     "list_chapter_block_versions",
     "delete_chapter_block_version",
+    "apply_chapter_block_operations",
+    "transfer_chapter_blocks",
+    "BLOCK_OPERATION_TYPES",
+    "ChapterBlockConflictError",
 ]
 
+ChapterBlockMutationResult = ChapterDetailPayload | ChapterBlockDeltaPayload
+
+BLOCK_OPERATION_TYPES = ("create", "update", "delete", "move", "activateVersion")
+
 
 def ensure_turn_identifiers(block_id: str, turns: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     normalized: List[Dict[str, Any]] = []
@@ -106,163 +162,539 @@ def extract_chapter_context_for_block(
     }
 
 
-def update_chapter_block(
+def get_chapter_block(chapter_id: str, block_id: str) -> Optional[ChapterBlockPayload]:
+    blocks = materialize_chapter_blocks(chapter_id, block_ids=[block_id])
+    return blocks[0] if blocks else None
+
+
+def get_chapter_block_drafts(chapter_id: str) -> List[ChapterBlockDraftPayload]:
+    """Return the chapter's blocks with their buffered autosave changes applied.
+
+    Drafts are not part of the chapter detail or its snapshot until they are written, so
+    reads report them alongside the stored blocks instead.
+    """
+    drafts = draft_changes(chapter_id)
+    if not drafts:
+        return []
+    blocks = {
+        block["id"]: block
+        for block in materialize_chapter_blocks(
+            chapter_id, block_ids=[block_id for block_id, _changes, _created in drafts]
+        )
+    }
+    pending: List[ChapterBlockDraftPayload] = []
+    for block_id, changes, created_at in drafts:
+        block = blocks.get(block_id)
+        if block is None:  # pragma: no cover - deleted while reading
+            continue
+        block.update(changes)  # type: ignore[typeddict-item]
+        pending.append({"block": block, "pendingSince": created_at})
+    return pending
+
+
+def get_chapter_block_window(
     chapter_id: str,
-    block_id: str,
-    changes: Dict[str, Any],
-) -> ChapterDetailPayload:
-    with transaction.atomic():
-        try:
-            block = (
-                ChapterBlock.objects.select_for_update()
-                .select_related("chapter", "chapter__book", "active_version")
-                .prefetch_related("versions")
-                .get(chapter_id=chapter_id, pk=block_id)
-            )
-        except ChapterBlock.DoesNotExist as exc:
-            raise KeyError(f"Unknown block: {block_id}") from exc
+    *,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: int = 50,
+) -> ChapterBlockWindowPayload:
+    revision = Chapter.objects.filter(pk=chapter_id).values_list("revision", flat=True).first()
+    if revision is None:
+        raise KeyError(f"Unknown chapter: {chapter_id}")
+
+    blocks, previous_cursor, next_cursor = materialize_chapter_block_window(
+        chapter_id,
+        after=after,
+        before=before,
+        limit=limit,
+    )
+    return {
+        "chapterId": chapter_id,
+        "revision": int(revision),
+        "blocks": blocks,
+        "previousCursor": previous_cursor,
+        "nextCursor": next_cursor,
+        "pendingDrafts": get_chapter_block_drafts(chapter_id),
+    }
 
-        if "type" in changes and changes["type"] != block.type:
-            raise ValueError("El tipo de bloque no puede cambiarse en esta operación.")
 
-        version_hint = changes.get("version")
-        if version_hint is not None:
-            try:
-                version_hint = int(version_hint)
-            except (TypeError, ValueError) as exc:  # pragma: no cover - serializer guards
-                raise ValueError("El número de versión debe ser un entero válido.") from exc
-            if not 1 <= version_hint <= 999:
-                raise ValueError("El número de versión debe estar entre 1 y 999.")
-
-        position_changed = False
-        if "position" in changes and changes["position"] is not None:
-            new_position = int(changes["position"])
-            if new_position != block.position:
-                block.position = new_position
-                position_changed = True
-
-        payload_updates: Dict[str, Any] = {
-            key: value
-            for key, value in changes.items()
-            if key not in {"id", "type", "position", "version"}
-        }
+def _materialize_mutated_chapter(chapter_id: str) -> ChapterDetailPayload:
+    detail = materialize_chapter_detail(chapter_id)
+    if detail is None:  # pragma: no cover - the mutation already resolved the chapter
+        raise KeyError(f"Unknown chapter: {chapter_id}")
+    # Write-through: the freshly built payload becomes the snapshot for the new revision.
+    store_chapter_snapshot(detail)
+    return detail
 
-        if "turns" in payload_updates and isinstance(payload_updates["turns"], list):
-            payload_updates["turns"] = ensure_turn_identifiers(block_id, payload_updates["turns"])
 
-        versions: List[ChapterBlockVersion] = list(block.versions.all())
-        if not versions:
-            # Safety net: ensure blocks always keep at least one version.
-            seed_version = ChapterBlockVersion.objects.create(
-                block=block,
-                version=1,
-                payload=dict(block.payload or {}),
-                is_active=True,
-            )
-            versions = [seed_version]
-            block.active_version = seed_version
-            block.active_version_number = 1
-            block.version_count = 1
-
-        if version_hint is not None:
-            base_version = next((item for item in versions if item.version == version_hint), None)
-            if base_version is None:
-                raise KeyError(f"Unknown version {version_hint} for block {block_id}")
+def _build_block_delta(
+    chapter_id: str,
+    *,
+    revision: int,
+    changed_block_ids: Iterable[str] = (),
+    shifted_from_position: Optional[int] = None,
+    shifted_to_position: Optional[int] = None,
+    removed_block_ids: Iterable[str] = (),
+) -> ChapterBlockDeltaPayload:
+    """Describe a block mutation without materialising the whole chapter.
+
+    ``shifted_from_position`` and ``shifted_to_position`` bound (inclusively) the dense
+    positions whose blocks moved as a side effect of the mutation; only their identifiers
+    and new positions are reported. The stored sort keys of those blocks are unchanged.
+    """
+    changed_ids = list(dict.fromkeys(changed_block_ids))
+
+    shifted: List[ChapterBlockPositionPayload] = []
+    if shifted_from_position is not None:
+        block_ids = ordered_chapter_blocks(chapter_id).values_list("id", flat=True)
+        if shifted_to_position is None:
+            block_ids = block_ids[shifted_from_position:]
         else:
-            base_version = block.active_version or versions[0]
+            block_ids = block_ids[shifted_from_position : shifted_to_position + 1]
+        shifted = [
+            {"id": block_id, "position": position}
+            for position, block_id in enumerate(block_ids, start=shifted_from_position)
+            if block_id not in changed_ids
+        ]
+
+    return {
+        "chapterId": chapter_id,
+        "revision": revision,
+        "blocks": materialize_chapter_blocks(chapter_id, block_ids=changed_ids),
+        "shiftedBlocks": shifted,
+        "removedBlockIds": list(removed_block_ids),
+    }
+
+
+def _version_text_stats(version: Optional[ChapterBlockVersion]) -> Tuple[int, int]:
+    if version is None:
+        return 0, 0
+    return int(version.word_count), int(version.token_count)
+
+
+def _version_text_delta(
+    previous: Optional[ChapterBlockVersion],
+    current: Optional[ChapterBlockVersion],
+) -> Tuple[int, int]:
+    previous_words, previous_tokens = _version_text_stats(previous)
+    current_words, current_tokens = _version_text_stats(current)
+    return current_words - previous_words, current_tokens - previous_tokens
+
+
+def _apply_version_change(
+    chapter_id: str,
+    previous: Optional[ChapterBlockVersion],
+    current: Optional[ChapterBlockVersion],
+) -> None:
+    words, tokens = _version_text_delta(previous, current)
+    apply_chapter_text_delta(chapter_id, words=words, tokens=tokens)
+
 
-        base_payload = dict(base_version.payload or {})
-        merged_payload = dict(base_payload)
-        merged_payload.update(payload_updates)
+class ChapterBlockConflictError(RuntimeError):
+    """Raised when a block changed since the revision the client edited."""
 
-        payload_changed = merged_payload != base_payload
+    def __init__(self, block: Optional[ChapterBlockPayload]):
+        super().__init__("El bloque fue modificado por otra edición.")
+        self.block = block
 
-        target_version: Optional[ChapterBlockVersion] = None
-        for candidate in versions:
-            if dict(candidate.payload or {}) == merged_payload:
-                target_version = candidate
-                break
 
-        created_new_version = False
-        if payload_changed and target_version is None:
-            next_version_number = max(version.version for version in versions) + 1
+class _StaleBlockError(Exception):
+    pass
+
+
+# Retries for edits without ``expected_revision`` that lose a compare-and-swap race.
+_BLOCK_WRITE_ATTEMPTS = 3
+
+
+def _compare_and_save_block(block: ChapterBlock, fields: List[str]) -> None:
+    """Write ``fields`` only if the block still has the revision it was read with."""
+    block.updated_at = timezone.now()
+    values = {field: getattr(block, field) for field in fields}
+    saved = ChapterBlock.objects.filter(pk=block.pk, revision=block.revision).update(
+        **values,
+        updated_at=block.updated_at,
+        revision=F("revision") + 1,
+    )
+    if not saved:
+        raise _StaleBlockError(block.pk)
+    block.revision += 1
+
+
+def _get_chapter_block_row(chapter_id: str, block_id: str) -> ChapterBlock:
+    try:
+        return ChapterBlock.objects.select_related("active_version").get(
+            chapter_id=chapter_id, pk=block_id
+        )
+    except ChapterBlock.DoesNotExist as exc:
+        raise KeyError(f"Unknown block: {block_id}") from exc
+
+
+def _lock_chapter_block(chapter_id: str, block_id: str) -> ChapterBlock:
+    try:
+        return (
+            ChapterBlock.objects.select_for_update()
+            .select_related("active_version")
+            .get(chapter_id=chapter_id, pk=block_id)
+        )
+    except ChapterBlock.DoesNotExist as exc:
+        raise KeyError(f"Unknown block: {block_id}") from exc
+
+
+def _apply_block_changes(
+    chapter_id: str,
+    block: ChapterBlock,
+    changes: Dict[str, Any],
+) -> Tuple[Optional[Tuple[int, int]], Tuple[int, int]]:
+    """Write ``changes`` to a block, creating or activating a version as needed.
+
+    The block row is written with a compare-and-swap on its revision, so callers that
+    did not lock it get ``_StaleBlockError`` when a concurrent edit won. The chapter row
+    is not touched.
+
+    Returns the previous and new sort keys when the block was moved (or ``None``), and
+    the word and token difference the caller applies to the chapter counters.
+    """
+    block_id = block.id
+
+    if "type" in changes and changes["type"] != block.type:
+        raise ValueError("El tipo de bloque no puede cambiarse en esta operación.")
+
+    version_hint = changes.get("version")
+    if version_hint is not None:
+        try:
+            version_hint = int(version_hint)
+        except (TypeError, ValueError) as exc:  # pragma: no cover - serializer guards
+            raise ValueError("El número de versión debe ser un entero válido.") from exc
+        if not 1 <= version_hint <= 999:
+            raise ValueError("El número de versión debe estar entre 1 y 999.")
+
+    moved: Optional[Tuple[int, int]] = None
+    if "position" in changes and changes["position"] is not None:
+        new_key = move_sort_key(
+            chapter_id, block.id, block.sort_key, max(0, int(changes["position"]))
+        )
+        if new_key is not None:
+            # Only the moved block receives a new key between its future neighbours; a
+            # renumber may have rewritten its stored key, which still marks the old spot.
+            previous_key = ChapterBlock.objects.values_list("sort_key", flat=True).get(pk=block.id)
+            moved = (previous_key, new_key)
+            block.sort_key = new_key
+
+    payload_updates: Dict[str, Any] = {
+        key: value
+        for key, value in changes.items()
+        if key not in {"id", "type", "position", "version"}
+    }
+
+    if "turns" in payload_updates and isinstance(payload_updates["turns"], list):
+        payload_updates["turns"] = ensure_turn_identifiers(block_id, payload_updates["turns"])
+
+    versions = ChapterBlockVersion.objects.filter(block=block)
+    previous_version = block.active_version
+
+    if version_hint is not None:
+        base_version = versions.filter(version=version_hint).first()
+        if base_version is None:
+            raise KeyError(f"Unknown version {version_hint} for block {block_id}")
+    else:
+        base_version = block.active_version or versions.order_by("version").first()
+
+    if base_version is None:
+        # Safety net: ensure blocks always keep at least one version.
+        base_version = ChapterBlockVersion.objects.create(
+            block=block,
+            version=1,
+            payload=dict(block.payload or {}),
+            is_active=True,
+            **ChapterBlockVersion.derived_fields(block.type, block.payload),
+        )
+        block.active_version = base_version
+        block.active_version_number = 1
+        block.version_count = 1
+
+    if base_version.id == block.active_version_id:
+        # The block row mirrors its active version, which may be stored as a delta.
+        base_payload = dict(block.payload or {})
+    else:
+        base_payload = version_payload(base_version)
+    merged_payload = dict(base_payload)
+    merged_payload.update(payload_updates)
+
+    payload_changed = merged_payload != base_payload
+
+    target_version: Optional[ChapterBlockVersion] = None
+    target_payload = base_payload
+    if payload_changed:
+        target_payload = merged_payload
+        derived = ChapterBlockVersion.derived_fields(block.type, merged_payload)
+        # Identical content maps to an existing version through the (block, hash) index.
+        target_version = next(
+            (
+                candidate
+                for candidate in versions.filter(content_hash=derived["content_hash"])
+                if version_payload(candidate) == merged_payload
+            ),
+            None,
+        )
+        if target_version is None:
+            stats = versions.aggregate(latest=Max("version"), total=Count("id"))
+            next_version_number = int(stats["latest"] or 0) + 1
             if next_version_number > 999:
                 raise ValueError("No se pueden crear más de 999 versiones para este bloque.")
 
             target_version = ChapterBlockVersion.objects.create(
                 block=block,
                 version=next_version_number,
-                payload=merged_payload,
                 is_active=True,
+                **derived,
+                **stored_version_fields(block_id, merged_payload, latest=stats["latest"]),
             )
-            versions.append(target_version)
-            created_new_version = True
+            block.version_count = int(stats["total"]) + 1
 
-        if target_version is None:
-            target_version = base_version
+    if target_version is None:
+        target_version = base_version
 
-        # Activate selected version if needed.
-        if block.active_version_id != target_version.id:
+    # Activate selected version if needed.
+    if block.active_version_id != target_version.id:
+        deactivate_versions(
             ChapterBlockVersion.objects.filter(block=block, is_active=True).exclude(
                 pk=target_version.id
-            ).update(is_active=False)
-            if not target_version.is_active:
-                target_version.is_active = True
-                target_version.save(update_fields=["is_active", "updated_at"])
-            block.active_version = target_version
-            block.active_version_number = int(target_version.version)
-
-        block.payload = dict(target_version.payload or {})
-
-        desired_version_count = len(versions)
-        if block.version_count != desired_version_count:
-            block.version_count = desired_version_count
-
-        update_fields = ["updated_at"]
-        if position_changed:
-            update_fields.append("position")
-        if created_new_version or payload_changed or block.active_version_id == target_version.id:
-            update_fields.extend(
-                ["payload", "active_version", "active_version_number", "version_count"]
-            )
-        else:
-            # Ensure payload stays in sync when only changing version selection
-            update_fields.extend(
-                ["payload", "active_version", "active_version_number", "version_count"]
             )
+        )
+        activate_version(target_version, block.type, target_payload)
+        block.active_version = target_version
+        block.active_version_number = int(target_version.version)
+
+    block.payload = dict(target_payload)
 
-        block.save(update_fields=list(dict.fromkeys(update_fields)))
+    update_fields = ["payload", "active_version", "active_version_number", "version_count"]
+    if moved is not None:
+        update_fields.append("sort_key")
 
-        chapter = block.chapter
-    return chapter.to_detail_payload()
+    _compare_and_save_block(block, update_fields)
+    return moved, _version_text_delta(previous_version, target_version)
+
+
+def _write_block_changes(
+    chapter_id: str,
+    block_id: str,
+    changes: Dict[str, Any],
+    *,
+    expected_revision: Optional[int] = None,
+) -> Optional[Tuple[int, Optional[Tuple[int, int]]]]:
+    """Write ``changes`` over the block's buffered autosave changes as one version.
+
+    With ``expected_revision`` the edit only succeeds if the block is still at that
+    revision; otherwise a lost race is retried a few times against the fresh state.
+    Raises ``ChapterBlockConflictError`` carrying the current block when it gives up.
+
+    The chapter counters and revision are updated in the same compare-and-swap
+    transaction, so a saved edit is never left without its revision bump.
+
+    Returns the new chapter revision and the moved sort keys, or ``None`` when there was
+    nothing to write.
+    """
+    attempts = 1 if expected_revision is not None else _BLOCK_WRITE_ATTEMPTS
+    for attempt in range(1, attempts + 1):
+        try:
+            with transaction.atomic():
+                block = _get_chapter_block_row(chapter_id, block_id)
+                if expected_revision is not None and block.revision != expected_revision:
+                    raise _StaleBlockError(block_id)
+                merged_changes = {**take_block_draft(block_id), **changes}
+                if not merged_changes:
+                    return None
+                moved, (words, tokens) = _apply_block_changes(chapter_id, block, merged_changes)
+                apply_chapter_text_delta(chapter_id, words=words, tokens=tokens)
+                return bump_chapter_revision(chapter_id), moved
+        except (_StaleBlockError, IntegrityError) as exc:
+            # IntegrityError: a concurrent edit took the next version number first.
+            if attempt == attempts:
+                raise ChapterBlockConflictError(get_chapter_block(chapter_id, block_id)) from exc
+    return None  # pragma: no cover - the last attempt returns or raises
+
+
+def _block_write_result(
+    chapter_id: str,
+    block_id: str,
+    written: Optional[Tuple[int, Optional[Tuple[int, int]]]],
+    *,
+    delta: bool,
+) -> ChapterBlockMutationResult:
+    if not delta:
+        return _materialize_mutated_chapter(chapter_id)
+    if written is None:
+        revision = Chapter.objects.values_list("revision", flat=True).get(pk=chapter_id)
+        written = (int(revision), None)
+    revision, moved = written
+    shifted_from: Optional[int] = None
+    shifted_to: Optional[int] = None
+    if moved is not None:
+        # Dense positions are only ranked for the delta, after the write committed.
+        shifted_from, shifted_to = sorted(
+            block_position(chapter_id, sort_key, block_id) for sort_key in moved
+        )
+    return _build_block_delta(
+        chapter_id,
+        revision=revision,
+        changed_block_ids=[block_id],
+        shifted_from_position=shifted_from,
+        shifted_to_position=shifted_to,
+    )
+
+
+def update_chapter_block(
+    chapter_id: str,
+    block_id: str,
+    changes: Dict[str, Any],
+    *,
+    delta: bool = False,
+    expected_revision: Optional[int] = None,
+) -> ChapterBlockMutationResult:
+    """Apply ``changes`` to a block without locking it or its chapter.
+
+    Autosaved changes buffered for the block are committed in the same version; those of
+    other blocks in the chapter are flushed first.
+    """
+    flush_chapter_block_drafts(chapter_id, exclude_block_id=block_id)
+    written = _write_block_changes(
+        chapter_id,
+        block_id,
+        changes,
+        expected_revision=expected_revision,
+    )
+    return _block_write_result(chapter_id, block_id, written, delta=delta)
+
+
+def flush_chapter_block_drafts(
+    chapter_id: Optional[str] = None,
+    *,
+    block_ids: Optional[List[str]] = None,
+    exclude_block_id: Optional[str] = None,
+    due_only: bool = False,
+) -> List[str]:
+    """Write buffered autosave changes as block versions and return the flushed block ids.
+
+    Each block is written in its own transaction, like an edit without ``If-Match``. A
+    draft that cannot be written stays buffered for the next explicit edit to report.
+    """
+    flushed: List[str] = []
+    drafts = pending_drafts(
+        chapter_id,
+        block_ids=block_ids,
+        exclude_block_id=exclude_block_id,
+        due_only=due_only,
+    )
+    for draft_chapter_id, block_id in drafts:
+        try:
+            written = _write_block_changes(draft_chapter_id, block_id, {})
+        except (KeyError, ValueError, ChapterBlockConflictError):
+            continue
+        if written is not None:
+            flushed.append(block_id)
+    return flushed
+
+
+def autosave_chapter_block(
+    chapter_id: str,
+    block_id: str,
+    changes: Dict[str, Any],
+    *,
+    expected_revision: Optional[int] = None,
+) -> ChapterBlockAutosavePayload:
+    """Buffer content ``changes`` for a block instead of writing a version right away.
+
+    The returned block shows the buffered changes over the stored block; its revision and
+    the chapter revision only move once the buffer is flushed (see ``studio.data.autosave``).
+    """
+    if AUTOSAVE_EXCLUDED_FIELDS & set(changes):
+        raise ValueError("El autoguardado solo admite cambios de contenido del bloque.")
+
+    flush_chapter_block_drafts(chapter_id, exclude_block_id=block_id)
+    # A burst older than the window becomes its own version before a new one starts.
+    flush_chapter_block_drafts(chapter_id, block_ids=[block_id], due_only=True)
+
+    updates = {key: value for key, value in changes.items() if key not in {"id", "type"}}
+    if "turns" in updates and isinstance(updates["turns"], list):
+        updates["turns"] = ensure_turn_identifiers(block_id, updates["turns"])
+
+    with transaction.atomic():
+        row = (
+            ChapterBlock.objects.filter(chapter_id=chapter_id, pk=block_id)
+            .values_list("type", "revision", "chapter__revision")
+            .first()
+        )
+        if row is None:
+            raise KeyError(f"Unknown block: {block_id}")
+        block_type, block_revision, chapter_revision = row
+        if "type" in changes and changes["type"] != block_type:
+            raise ValueError("El tipo de bloque no puede cambiarse en esta operación.")
+        if expected_revision is not None and block_revision != expected_revision:
+            raise ChapterBlockConflictError(get_chapter_block(chapter_id, block_id))
+        draft = store_block_draft(chapter_id, block_id, updates)
+
+    block = get_chapter_block(chapter_id, block_id)
+    if block is None:  # pragma: no cover - deleted right after buffering
+        raise KeyError(f"Unknown block: {block_id}")
+    block.update(draft.changes)  # type: ignore[typeddict-item]
+    return {
+        "chapterId": chapter_id,
+        "revision": int(chapter_revision),
+        "block": block,
+        "pendingSince": draft.created_at,
+    }
+
+
+def commit_chapter_block_draft(
+    chapter_id: str,
+    block_id: str,
+    *,
+    delta: bool = False,
+) -> ChapterBlockMutationResult:
+    """Write the block's buffered autosave changes now; a no-op without a buffer."""
+    if not ChapterBlock.objects.filter(chapter_id=chapter_id, pk=block_id).exists():
+        raise KeyError(f"Unknown block: {block_id}")
+    written = _write_block_changes(chapter_id, block_id, {})
+    return _block_write_result(chapter_id, block_id, written, delta=delta)
+
+
+def _delete_block_row(chapter_id: str, block: ChapterBlock) -> None:
+    _apply_version_change(chapter_id, block.active_version, None)
+    block.delete()
 
 
 def delete_chapter_block(
     chapter_id: str,
     block_id: str,
-) -> ChapterDetailPayload:
+    *,
+    delta: bool = False,
+) -> ChapterBlockMutationResult:
+    # The block's own buffered changes are dropped with it.
+    flush_chapter_block_drafts(chapter_id, exclude_block_id=block_id)
     with transaction.atomic():
         try:
             block = (
                 ChapterBlock.objects.select_for_update()
-                .select_related("chapter", "chapter__book")
+                .select_related("active_version")
                 .get(chapter_id=chapter_id, pk=block_id)
             )
         except ChapterBlock.DoesNotExist as exc:
             raise KeyError(f"Unknown block: {block_id}") from exc
 
-        chapter = block.chapter
-        position = block.position
-        block.delete()
+        # Deleting leaves a gap in the sort keys; following blocks are not rewritten.
+        _delete_block_row(chapter_id, block)
 
-        ChapterBlock.objects.filter(
-            chapter=chapter,
-            position__gt=position,
-        ).update(position=F("position") - 1)
+        revision = bump_chapter_revision(chapter_id)
 
-    return (
-        Chapter.objects.select_related("book").prefetch_related("blocks").get(pk=chapter_id)
-    ).to_detail_payload()
+    if delta:
+        return _build_block_delta(
+            chapter_id,
+            revision=revision,
+            shifted_from_position=block_position(chapter_id, block.sort_key, block_id),
+            removed_block_ids=[block_id],
+        )
+    return _materialize_mutated_chapter(chapter_id)
 
 
 def list_chapter_block_versions(
@@ -279,19 +711,24 @@ def list_chapter_block_versions(
         raise KeyError(f"Unknown block: {block_id}") from exc
 
     versions = sorted(block.versions.all(), key=lambda item: item.version)
-    return [version.to_payload() for version in versions]
+    payloads = version_payloads(versions)
+    return [version.to_payload(payload=payloads[int(version.version)]) for version in versions]
 
 
 def delete_chapter_block_version(
     chapter_id: str,
     block_id: str,
     version_number: int,
-) -> ChapterDetailPayload:
+    *,
+    delta: bool = False,
+) -> ChapterBlockMutationResult:
+    # The buffered changes are based on the current versions; write them first.
+    flush_chapter_block_drafts(chapter_id, block_ids=[block_id])
     with transaction.atomic():
         try:
             block = (
                 ChapterBlock.objects.select_for_update()
-                .select_related("chapter", "chapter__book", "active_version")
+                .select_related("active_version")
                 .prefetch_related("versions")
                 .get(chapter_id=chapter_id, pk=block_id)
             )
@@ -306,6 +743,9 @@ def delete_chapter_block_version(
         if target is None:
             raise KeyError(f"Unknown version {version_number} for block {block_id}")
 
+        previous_version = block.active_version
+        payloads = version_payloads(versions)
+        detach_version_dependents(block_id, [version_number])
         target.delete()
         versions = [item for item in versions if item.version != version_number]
 
@@ -324,104 +764,401 @@ def delete_chapter_block_version(
             if fallback is None:
                 raise ValueError("No hay versiones disponibles para activar tras la eliminación.")
 
-            ChapterBlockVersion.objects.filter(block=block).exclude(pk=fallback.pk).update(
-                is_active=False
+            deactivate_versions(
+                ChapterBlockVersion.objects.filter(block=block).exclude(pk=fallback.pk)
             )
-            if not fallback.is_active:
-                fallback.is_active = True
-                fallback.save(update_fields=["is_active", "updated_at"])
+            block.payload = payloads[int(fallback.version)]
+            activate_version(fallback, block.type, block.payload)
             block.active_version = fallback
             block.active_version_number = int(fallback.version)
-            block.payload = dict(fallback.payload or {})
         else:
             # Ensure the persisted payload stays in sync with the active version.
-            block.payload = dict(active_version.payload or {})
-            ChapterBlockVersion.objects.filter(block=block, is_active=True).exclude(
-                pk=active_version.pk
-            ).update(is_active=False)
-
-        block.save(
-            update_fields=[
-                "payload",
-                "active_version",
-                "active_version_number",
-                "version_count",
-                "updated_at",
-            ]
+            block.payload = payloads[int(active_version.version)]
+            deactivate_versions(
+                ChapterBlockVersion.objects.filter(block=block, is_active=True).exclude(
+                    pk=active_version.pk
+                )
+            )
+
+        _compare_and_save_block(
+            block,
+            ["payload", "active_version", "active_version_number", "version_count"],
         )
+        _apply_version_change(chapter_id, previous_version, block.active_version)
 
-        chapter = block.chapter
-    return chapter.to_detail_payload()
+        revision = bump_chapter_revision(chapter_id)
+
+    if delta:
+        return _build_block_delta(chapter_id, revision=revision, changed_block_ids=[block_id])
+    return _materialize_mutated_chapter(chapter_id)
+
+
+def _insert_block_row(chapter: Chapter, payload: Dict[str, Any], *, sort_key: int) -> ChapterBlock:
+    """Create a block and its first version at ``sort_key`` without touching siblings."""
+    chapter_id = chapter.id
+    block_type = str(payload.get("type"))
+    if block_type not in ChapterBlockType.values:
+        raise ValueError("Tipo de bloque no soportado.")
+
+    block_id = str(payload.get("id") or uuid4().hex)
+
+    if ChapterBlock.objects.filter(pk=block_id).exists():
+        raise ValueError("Ya existe un bloque con ese identificador.")
+
+    payload_updates: Dict[str, Any] = {
+        key: value for key, value in payload.items() if key not in {"id", "type", "position"}
+    }
+
+    if block_type == ChapterBlockType.DIALOGUE:
+        turns = payload_updates.get("turns")
+        if turns is None:
+            turns = []
+        if not isinstance(turns, list):
+            raise ValueError("Los turnos de diálogo deben enviarse como lista.")
+        payload_updates["turns"] = ensure_turn_identifiers(block_id, turns)
+
+    payload_data: Dict[str, Any] = dict(payload_updates)
+
+    block = ChapterBlock.objects.create(
+        id=block_id,
+        chapter=chapter,
+        type=block_type,
+        sort_key=sort_key,
+        payload=payload_data,
+        version_count=1,
+        active_version_number=1,
+    )
+
+    version = ChapterBlockVersion.objects.create(
+        block=block,
+        version=1,
+        payload=payload_data,
+        is_active=True,
+        **ChapterBlockVersion.derived_fields(block_type, payload_data),
+    )
+    block.active_version = version
+    block.save(update_fields=["active_version", "updated_at"])
+    _apply_version_change(chapter_id, None, version)
+    return block
 
 
 def create_chapter_block(
     chapter_id: str,
     payload: Dict[str, Any],
+    *,
+    delta: bool = False,
+    sort_key: Optional[int] = None,
+    respond: bool = True,
+) -> Optional[ChapterBlockMutationResult]:
+    """Insert a block; with ``respond=False`` nothing is materialized and ``None`` returned.
+
+    An explicit ``sort_key`` takes precedence over the payload's dense ``position``.
+    """
+    flush_chapter_block_drafts(chapter_id)
+    with transaction.atomic():
+        # No chapter lock: concurrent inserts at the same spot may share a sort key and
+        # are then ordered by id.
+        try:
+            chapter = Chapter.objects.only("id").get(pk=chapter_id)
+        except Chapter.DoesNotExist as exc:
+            raise KeyError(f"Unknown chapter: {chapter_id}") from exc
+
+        raw_position = payload.get("position")
+        explicit_key = sort_key is not None
+        shifted_from_position: Optional[int] = None
+        if not explicit_key and raw_position is None:
+            sort_key = append_sort_key(chapter_id)
+        elif not explicit_key:
+            position = max(0, int(raw_position))
+            sort_key = sort_key_at(chapter_id, position)
+            shifted_from_position = position + 1
+
+        block_id = _insert_block_row(chapter, payload, sort_key=sort_key).id
+
+        revision = bump_chapter_revision(chapter_id)
+
+    if not respond:
+        return None
+    if delta:
+        if explicit_key:
+            shifted_from_position = block_position(chapter_id, sort_key, block_id) + 1
+        return _build_block_delta(
+            chapter_id,
+            revision=revision,
+            changed_block_ids=[block_id],
+            shifted_from_position=shifted_from_position,
+        )
+    return _materialize_mutated_chapter(chapter_id)
+
+
+def _clamp_index(raw_position: Any, size: int) -> int:
+    if raw_position is None:
+        return size
+    return max(0, min(int(raw_position), size))
+
+
+def _apply_block_operation(
+    chapter: Chapter,
+    order: List[str],
+    operation: Dict[str, Any],
+) -> None:
+    op = operation.get("op")
+    if op == "create":
+        block_payload = dict(operation.get("block") or {})
+        index = _clamp_index(block_payload.get("position"), len(order))
+        # The final order is persisted once all operations ran; append for now.
+        block = _insert_block_row(chapter, block_payload, sort_key=append_sort_key(chapter.id))
+        order.insert(index, block.id)
+        return
+
+    block_id = str(operation.get("blockId") or "")
+    if block_id not in order:
+        raise KeyError(f"Unknown block: {block_id}")
+
+    if op == "delete":
+        block = _lock_chapter_block(chapter.id, block_id)
+        _delete_block_row(chapter.id, block)
+        order.remove(block_id)
+    elif op == "move":
+        order.remove(block_id)
+        order.insert(_clamp_index(operation.get("position"), len(order)), block_id)
+    elif op == "update":
+        changes = dict(operation.get("changes") or {})
+        new_position = changes.pop("position", None)
+        if changes:
+            block = _lock_chapter_block(chapter.id, block_id)
+            _moved, (words, tokens) = _apply_block_changes(chapter.id, block, changes)
+            apply_chapter_text_delta(chapter.id, words=words, tokens=tokens)
+        if new_position is not None:
+            order.remove(block_id)
+            order.insert(_clamp_index(new_position, len(order)), block_id)
+    elif op == "activateVersion":
+        block = _lock_chapter_block(chapter.id, block_id)
+        _moved, (words, tokens) = _apply_block_changes(
+            chapter.id, block, {"version": operation.get("version")}
+        )
+        apply_chapter_text_delta(chapter.id, words=words, tokens=tokens)
+    else:
+        raise ValueError(f"Operación no soportada: {op}.")
+
+
+def apply_chapter_block_operations(
+    chapter_id: str,
+    operations: List[Dict[str, Any]],
 ) -> ChapterDetailPayload:
+    """Apply an ordered list of block operations atomically and return the final chapter.
+
+    Operations see the effects of the previous ones. Positions are tracked in memory and
+    written once at the end, rewriting only the blocks whose sort key must change, and
+    the chapter revision is bumped a single time. Buffered autosave changes of the
+    chapter are flushed beforehand.
+    """
+    flush_chapter_block_drafts(chapter_id)
     with transaction.atomic():
         try:
-            chapter = (
-                Chapter.objects.select_for_update()
-                .select_related("book")
-                .prefetch_related("blocks")
-                .get(pk=chapter_id)
-            )
+            chapter = Chapter.objects.select_for_update().get(pk=chapter_id)
         except Chapter.DoesNotExist as exc:
             raise KeyError(f"Unknown chapter: {chapter_id}") from exc
 
-        block_type = str(payload.get("type"))
-        if block_type not in ChapterBlockType.values:
-            raise ValueError("Tipo de bloque no soportado.")
+        order = list(
+            ChapterBlock.objects.filter(chapter=chapter)
+            .order_by(*BLOCK_ORDERING)
+            .values_list("id", flat=True)
+        )
+        for index, operation in enumerate(operations, start=1):
+            try:
+                _apply_block_operation(chapter, order, operation)
+            except KeyError as exc:
+                raise ValueError(f"Operación {index}: {exc.args[0]}") from exc
+            except ValueError as exc:
+                raise ValueError(f"Operación {index}: {exc}") from exc
 
-        block_id = str(payload.get("id") or uuid4().hex)
+        apply_block_order(chapter_id, order)
+        bump_chapter_revision(chapter_id)
 
-        if ChapterBlock.objects.filter(pk=block_id).exists():
-            raise ValueError("Ya existe un bloque con ese identificador.")
+    return _materialize_mutated_chapter(chapter_id)
 
-        raw_position = payload.get("position")
-        if raw_position is None:
-            current_max = chapter.blocks.aggregate(Max("position")).get("position__max")
-            position = (int(current_max) + 1) if current_max is not None else 0
-        else:
-            position = int(raw_position)
-            ChapterBlock.objects.filter(
-                chapter=chapter,
-                position__gte=position,
-            ).update(position=F("position") + 1)
-
-        payload_updates: Dict[str, Any] = {
-            key: value for key, value in payload.items() if key not in {"id", "type", "position"}
-        }
 
-        if block_type == ChapterBlockType.DIALOGUE:
-            turns = payload_updates.get("turns")
-            if turns is None:
-                turns = []
-            if not isinstance(turns, list):
-                raise ValueError("Los turnos de diálogo deben enviarse como lista.")
-            payload_updates["turns"] = ensure_turn_identifiers(block_id, turns)
-
-        payload_data: Dict[str, Any] = dict(payload_updates)
-
-        block = ChapterBlock.objects.create(
-            id=block_id,
-            chapter=chapter,
-            type=block_type,
-            position=position,
-            payload=payload_data,
-            version_count=1,
-            active_version_number=1,
-        )
+def _block_range_ids(chapter_id: str, first_block_id: str, last_block_id: str) -> List[str]:
+    order = list(ordered_chapter_blocks(chapter_id).values_list("id", flat=True))
+    for block_id in (first_block_id, last_block_id):
+        if block_id not in order:
+            raise KeyError(f"Unknown block: {block_id}")
+    start, end = order.index(first_block_id), order.index(last_block_id)
+    if end < start:
+        raise ValueError("El último bloque del rango debe ir después del primero.")
+    return order[start : end + 1]
 
-        version = ChapterBlockVersion.objects.create(
-            block=block,
-            version=1,
-            payload=payload_data,
-            is_active=True,
+
+def _copy_turn_ids(
+    payload: Dict[str, Any],
+    block_id: str,
+    turn_ids: Dict[str, str],
+) -> Dict[str, Any]:
+    """Return ``payload`` with its dialogue turn ids mapped to new ids of ``block_id``.
+
+    ``turn_ids`` is shared by every version of the block, so a turn keeps one id across
+    the copied history.
+    """
+    turns = payload.get("turns")
+    if not isinstance(turns, list):
+        return payload
+    copied: List[Dict[str, Any]] = []
+    for turn in turns:
+        source_id = turn.get("id") or uuid4().hex
+        turn_id = turn_ids.setdefault(source_id, f"{block_id}-turn-{len(turn_ids) + 1:02d}")
+        copied.append({**turn, "id": turn_id})
+    return {**payload, "turns": copied}
+
+
+def _copy_block_rows(blocks: List[ChapterBlock], target: Chapter) -> Dict[str, str]:
+    """Clone ``blocks`` and their whole version history into ``target``.
+
+    Returns the new identifier of each source block. The copies keep their source sort
+    keys until the caller places them. Dialogue copies get fresh turn ids.
+    """
+    new_ids = {block.id: uuid4().hex for block in blocks}
+    turn_ids: Dict[str, Dict[str, str]] = {
+        block.id: {} for block in blocks if block.type == ChapterBlockType.DIALOGUE
+    }
+
+    def copied_payload(block_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if block_id not in turn_ids or not payload:
+            return payload
+        return _copy_turn_ids(payload, new_ids[block_id], turn_ids[block_id])
+
+    ChapterBlock.objects.bulk_create(
+        [
+            ChapterBlock(
+                id=new_ids[block.id],
+                chapter=target,
+                type=block.type,
+                sort_key=block.sort_key,
+                payload=copied_payload(block.id, block.payload),
+                active_version_number=block.active_version_number,
+                version_count=block.version_count,
+            )
+            for block in blocks
+        ]
+    )
+    versions = ChapterBlockVersion.objects.filter(block_id__in=list(new_ids)).order_by(
+        "block_id", "version"
+    )
+    # Delta bases are version numbers of the same block, so chains copy verbatim; turn
+    # lists are never text-diffed, so remapping them in ``set`` keeps deltas valid.
+    copies: Dict[str, List[ChapterBlockVersion]] = {}
+    for version in versions.iterator():
+        delta = version.delta
+        if delta is not None:
+            delta = {**delta, "set": copied_payload(version.block_id, delta["set"])}
+        copies.setdefault(version.block_id, []).append(
+            ChapterBlockVersion(
+                block_id=new_ids[version.block_id],
+                version=version.version,
+                payload=copied_payload(version.block_id, version.payload),
+                delta=delta,
+                is_active=version.is_active,
+                rendered_text=version.rendered_text,
+                word_count=version.word_count,
+                token_count=version.token_count,
+                content_hash=version.content_hash,
+                activated_at=version.activated_at,
+            )
+        )
+    for block_id in turn_ids:
+        # New turn ids change what the content hash covers.
+        payloads = version_payloads(copies.get(block_id, []))
+        for copy in copies.get(block_id, []):
+            copy.content_hash = payload_content_hash(payloads[int(copy.version)])
+    ChapterBlockVersion.objects.bulk_create(
+        [copy for block_copies in copies.values() for copy in block_copies],
+        batch_size=500,
+    )
+    ChapterBlock.objects.filter(pk__in=list(new_ids.values())).update(
+        active_version=Subquery(
+            ChapterBlockVersion.objects.filter(
+                block=OuterRef("pk"),
+                version=OuterRef("active_version_number"),
+            ).values("id")[:1]
         )
-        block.active_version = version
-        block.save(update_fields=["active_version", "updated_at"])
+    )
+    return new_ids
+
+
+def transfer_chapter_blocks(
+    source_chapter_id: str,
+    first_block_id: str,
+    *,
+    target_chapter_id: str,
+    last_block_id: Optional[str] = None,
+    position: Optional[int] = None,
+    copy: bool = False,
+) -> ChapterBlockTransferPayload:
+    """Move or copy a contiguous range of blocks, with their versions, to another chapter.
+
+    The range runs from ``first_block_id`` to ``last_block_id`` (inclusive) in source
+    order and lands at ``position`` of the target chapter (appended by default). Both
+    chapters must belong to the same book; they are locked for the transfer, their text
+    counters shift by the transferred totals and each gets one revision bump.
+    """
+    chapter_ids = sorted({source_chapter_id, target_chapter_id})
+    for chapter_id in chapter_ids:
+        flush_chapter_block_drafts(chapter_id)
 
-    return (
-        Chapter.objects.select_related("book").prefetch_related("blocks").get(pk=chapter_id)
-    ).to_detail_payload()
+    with transaction.atomic():
+        chapters = {
+            chapter.id: chapter
+            for chapter in Chapter.objects.select_for_update().filter(pk__in=chapter_ids)
+        }
+        for chapter_id in chapter_ids:
+            if chapter_id not in chapters:
+                raise KeyError(f"Unknown chapter: {chapter_id}")
+        if chapters[source_chapter_id].book_id != chapters[target_chapter_id].book_id:
+            raise ValueError("Los capítulos deben pertenecer al mismo libro.")
+
+        range_ids = _block_range_ids(
+            source_chapter_id,
+            first_block_id,
+            last_block_id or first_block_id,
+        )
+        blocks_by_id = ChapterBlock.objects.select_related("active_version").in_bulk(range_ids)
+        blocks = [blocks_by_id[block_id] for block_id in range_ids]
+        words = tokens = 0
+        for block in blocks:
+            block_words, block_tokens = _version_text_stats(block.active_version)
+            words += block_words
+            tokens += block_tokens
+
+        moving = set() if copy else set(range_ids)
+        target_order = [
+            block_id
+            for block_id in ordered_chapter_blocks(target_chapter_id).values_list("id", flat=True)
+            if block_id not in moving
+        ]
+        index = _clamp_index(position, len(target_order))
+        if copy:
+            new_ids = _copy_block_rows(blocks, chapters[target_chapter_id])
+            placed = [new_ids[block_id] for block_id in range_ids]
+        else:
+            ChapterBlock.objects.filter(pk__in=range_ids).update(
+                chapter_id=target_chapter_id,
+                revision=F("revision") + 1,
+                updated_at=timezone.now(),
+            )
+            placed = list(range_ids)
+        target_order[index:index] = placed
+        apply_block_order(target_chapter_id, target_order)
+
+        if source_chapter_id != target_chapter_id or copy:
+            apply_chapter_text_delta(target_chapter_id, words=words, tokens=tokens)
+        if source_chapter_id != target_chapter_id and not copy:
+            apply_chapter_text_delta(source_chapter_id, words=-words, tokens=-tokens)
+            bump_chapter_revision(source_chapter_id)
+        bump_chapter_revision(target_chapter_id)
+
+    target = _materialize_mutated_chapter(target_chapter_id)
+    if source_chapter_id == target_chapter_id:
+        source = target
+    else:
+        source = _materialize_mutated_chapter(source_chapter_id)
+    return {"blockIds": placed, "source": source, "target": target}
@@ -1,19 +1,22 @@
 from __future__ import annotations
 
 from copy import deepcopy
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 from uuid import uuid4
 
 from django.db import IntegrityError, transaction
-from django.db.models import Max
+from django.db.models import F, Max
 
-from ..models import Book
+from ..models import Book, Chapter
 from ..payloads import LibraryBookPayload
 from ..sample_data import SAMPLE_LIBRARY_BOOKS
 from .context import ensure_book_context_sections
 
+_STREAM_CHUNK_SIZE = 200
+
 __all__ = [
     "get_library_books",
+    "iter_library_books",
     "get_book_metadata",
     "create_book",
     "update_book",
@@ -28,6 +31,60 @@ def get_library_books() -> List[LibraryBookPayload]:
     return [book.to_payload() for book in books]
 
 
+def iter_library_books() -> Iterator[LibraryBookPayload]:
+    """Yield library books one at a time, matching ``get_library_books`` output.
+
+    Books and chapter summaries are read through two ordered server-side cursors that are
+    merged by book, so memory stays bounded by the size of a single book.
+    """
+    books = (
+        Book.objects.order_by("order", "title", "id")
+        .values("id", "title", "author", "synopsis", "tokens", "word_count")
+        .iterator(chunk_size=_STREAM_CHUNK_SIZE)
+    )
+    chapters = (
+        Chapter.objects.order_by("book__order", "book__title", "book_id", "ordinal", "id")
+        .values("id", "book_id", "title", "summary", "ordinal", "tokens", "word_count")
+        .iterator(chunk_size=_STREAM_CHUNK_SIZE)
+    )
+
+    pending = next(chapters, None)
+    found = False
+    for book in books:
+        found = True
+        summaries: List[Dict[str, Any]] = []
+        while pending is not None and pending["book_id"] == book["id"]:
+            summary: Dict[str, Any] = {
+                "id": pending["id"],
+                "title": pending["title"],
+                "ordinal": int(pending["ordinal"]),
+            }
+            if pending["summary"]:
+                summary["summary"] = pending["summary"]
+            if pending["tokens"] is not None:
+                summary["tokens"] = int(pending["tokens"])
+            if pending["word_count"] is not None:
+                summary["wordCount"] = int(pending["word_count"])
+            summaries.append(summary)
+            pending = next(chapters, None)
+
+        payload: Dict[str, Any] = {
+            "id": book["id"],
+            "title": book["title"],
+            "tokens": int(book["tokens"]),
+            "wordCount": int(book["word_count"]),
+            "chapters": summaries,
+        }
+        if book["author"]:
+            payload["author"] = book["author"]
+        if book["synopsis"]:
+            payload["synopsis"] = book["synopsis"]
+        yield payload  # type: ignore[misc]
+
+    if not found:
+        yield from deepcopy(SAMPLE_LIBRARY_BOOKS)  # type: ignore[misc]
+
+
 def get_book_metadata(book_id: str) -> Optional[Dict[str, Any]]:
     try:
         book = Book.objects.get(pk=book_id)
@@ -110,6 +167,10 @@ def update_book(book_id: str, changes: Dict[str, Any]) -> LibraryBookPayload:
         if fields_to_update:
             book.save(update_fields=fields_to_update)
 
+        if "title" in fields_to_update:
+            # Chapter details embed the book title, so their revisions must move too.
+            Chapter.objects.filter(book=book).update(revision=F("revision") + 1)
+
     return book.to_payload()
 
 
@@ -12,6 +12,7 @@ from ..models import (
     LibraryContextItem,
     LibrarySection,
 )
+from ..payloads import count_words, payload_content_hash, render_block_text
 from ..sample_data import (
     DEFAULT_EDITOR_CHAPTER_ID,
     SAMPLE_CHAPTER_BLOCKS,
@@ -19,7 +20,9 @@ from ..sample_data import (
     SAMPLE_LIBRARY_BOOKS,
     SAMPLE_LIBRARY_SECTIONS,
 )
+from ..tokens import estimate_tokens
 from .context import get_section_templates_for_book
+from .ordering import SORT_KEY_GAP
 
 __all__ = ["bootstrap_sample_data"]
 
@@ -51,6 +54,19 @@ def bootstrap_sample_data(*, force: bool = False, apps=None) -> None:
         "active_version_number",
         "active_version",
     }.issubset(block_field_names)
+    # Historical models prior to migration 0013 store a plain ``position``.
+    if "sort_key" in block_field_names:
+        block_order_field, block_order_step = "sort_key", SORT_KEY_GAP
+    else:
+        block_order_field, block_order_step = "position", 1
+    version_field_names = (
+        {field.name for field in ChapterBlockVersionModel._meta.fields}
+        if ChapterBlockVersionModel is not None
+        else set()
+    )
+    version_supports_rendered_text = {"rendered_text", "word_count"}.issubset(version_field_names)
+    version_supports_content_hash = "content_hash" in version_field_names
+    version_supports_token_count = "token_count" in version_field_names
 
     with transaction.atomic():
         if not force and LibrarySectionModel.objects.exists():
@@ -97,7 +113,7 @@ def bootstrap_sample_data(*, force: bool = False, apps=None) -> None:
                     defaults = {
                         "chapter": chapter_obj,
                         "type": block.get("type", "paragraph"),
-                        "position": int(block.get("position", 0)),
+                        block_order_field: int(block.get("position", 0)) * block_order_step,
                         "payload": payload,
                     }
                     if block_supports_version_metadata:
@@ -117,10 +133,13 @@ def bootstrap_sample_data(*, force: bool = False, apps=None) -> None:
                         version_obj, _ = ChapterBlockVersionModel.objects.update_or_create(
                             block=block_obj,
                             version=1,
-                            defaults={
-                                "payload": payload,
-                                "is_active": True,
-                            },
+                            defaults=_version_defaults(
+                                block_obj.type,
+                                payload,
+                                with_rendered_text=version_supports_rendered_text,
+                                with_content_hash=version_supports_content_hash,
+                                with_token_count=version_supports_token_count,
+                            ),
                         )
                         # Historical models prior to migration 0006 lack these fields.
                         updated_fields: list[str] = []
@@ -171,7 +190,7 @@ def bootstrap_sample_data(*, force: bool = False, apps=None) -> None:
                     defaults = {
                         "chapter": chapter_obj,
                         "type": block.get("type", "paragraph"),
-                        "position": int(block.get("position", 0)),
+                        block_order_field: int(block.get("position", 0)) * block_order_step,
                         "payload": payload,
                     }
                     if block_supports_version_metadata:
@@ -191,10 +210,13 @@ def bootstrap_sample_data(*, force: bool = False, apps=None) -> None:
                         version_obj, _ = ChapterBlockVersionModel.objects.update_or_create(
                             block=block_obj,
                             version=1,
-                            defaults={
-                                "payload": payload,
-                                "is_active": True,
-                            },
+                            defaults=_version_defaults(
+                                block_obj.type,
+                                payload,
+                                with_rendered_text=version_supports_rendered_text,
+                                with_content_hash=version_supports_content_hash,
+                                with_token_count=version_supports_token_count,
+                            ),
                         )
                         updated_fields: list[str] = []
                         if hasattr(block_obj, "active_version"):
@@ -294,3 +316,22 @@ def bootstrap_sample_data(*, force: bool = False, apps=None) -> None:
                         item_id=item.get("id", f"{slug}-{item_order}"),
                         defaults=defaults,
                     )
+
+
+def _version_defaults(
+    block_type: str,
+    payload: Dict[str, Any],
+    *,
+    with_rendered_text: bool,
+    with_content_hash: bool,
+    with_token_count: bool,
+) -> Dict[str, Any]:
+    defaults: Dict[str, Any] = {"payload": payload, "is_active": True}
+    if with_rendered_text:
+        text = render_block_text(block_type, payload)
+        defaults.update({"rendered_text": text, "word_count": count_words(text)})
+        if with_token_count:
+            defaults["token_count"] = estimate_tokens(text)
+    if with_content_hash:
+        defaults["content_hash"] = payload_content_hash(payload)
+    return defaults
@@ -1,24 +1,32 @@
 from __future__ import annotations
 
 from copy import deepcopy
-from typing import Any, Dict, Optional
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
 from uuid import uuid4
 
 from django.db import IntegrityError, transaction
-from django.db.models import Max
+from django.db.models import F, Max, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
 
-from ..models import Book, Chapter
+from ..models import Book, Chapter, ChapterBlock, ChapterBlockVersion
 from ..payloads import (
     ChapterDetailPayload,
     ChapterSummaryPayload,
     chapter_detail_from_blocks,
 )
 from ..sample_data import SAMPLE_CHAPTER_BLOCKS, SAMPLE_CHAPTER_METADATA
+from ..tokens import estimate_tokens
+from .materializer import get_chapter_snapshot
 
 __all__ = [
     "get_chapter_detail",
+    "get_chapter_revision",
     "create_chapter",
     "update_chapter",
+    "bump_chapter_revision",
+    "apply_chapter_text_delta",
+    "recount_token_counters",
 ]
 
 
@@ -30,6 +38,7 @@ def _build_sample_chapter_detail(chapter_id: str) -> Optional[ChapterDetailPaylo
     for block in blocks:
         block.setdefault("activeVersion", 1)
         block.setdefault("versionCount", 1)
+        block.setdefault("revision", 1)
     return chapter_detail_from_blocks(
         chapter_id=chapter_id,
         title=str(metadata.get("title", "")),
@@ -44,15 +53,41 @@ def _build_sample_chapter_detail(chapter_id: str) -> Optional[ChapterDetailPaylo
 
 
 def get_chapter_detail(chapter_id: str) -> Optional[ChapterDetailPayload]:
-    try:
-        chapter = (
-            Chapter.objects.select_related("book")
-            .prefetch_related("blocks", "blocks__active_version")
-            .get(pk=chapter_id)
-        )
-    except Chapter.DoesNotExist:
+    detail = get_chapter_snapshot(chapter_id)
+    if detail is None:
         return _build_sample_chapter_detail(chapter_id)
-    return chapter.to_detail_payload()
+    return detail
+
+
+def get_chapter_revision(
+    chapter_id: str,
+) -> Optional[Tuple[int, datetime, Optional[datetime]]]:
+    """Return the chapter revision, creation time and latest autosave draft update.
+
+    Drafts change what readers are shown (see ``studio.data.autosave``) without bumping
+    the revision, so their latest update belongs in the chapter ETag. Block rows are not
+    touched.
+    """
+    row = (
+        Chapter.objects.filter(pk=chapter_id)
+        .annotate(drafts_updated_at=Max("block_drafts__updated_at"))
+        .values_list("revision", "created_at", "drafts_updated_at")
+        .first()
+    )
+    if row is None:
+        return None
+    revision, created_at, drafts_updated_at = row
+    return int(revision), created_at, drafts_updated_at
+
+
+def bump_chapter_revision(chapter_id: str) -> int:
+    """Increment the chapter revision and return the new value.
+
+    Must run inside the transaction that performs the mutation so readers never observe
+    new content under an old revision.
+    """
+    Chapter.objects.filter(pk=chapter_id).update(revision=F("revision") + 1)
+    return int(Chapter.objects.values_list("revision", flat=True).get(pk=chapter_id))
 
 
 def _next_chapter_ordinal(book: Book) -> int:
@@ -62,16 +97,45 @@ def _next_chapter_ordinal(book: Book) -> int:
     return int(current_max) + 1
 
 
+def _shifted_counter(field: str, delta: int) -> Greatest:
+    return Greatest(Coalesce(F(field), Value(0)) + delta, Value(0))
+
+
+def _shift_book_totals(book_id: str, *, words: int, tokens: int) -> None:
+    if not words and not tokens:
+        return
+    Book.objects.filter(pk=book_id).update(
+        word_count=_shifted_counter("word_count", words),
+        tokens=_shifted_counter("tokens", tokens),
+    )
+
+
+def apply_chapter_text_delta(chapter_id: str, *, words: int, tokens: int) -> None:
+    """Shift the chapter and book text counters by the difference of a block edit.
+
+    Block mutations pass the old/new word and token difference so the totals are kept in
+    sync without recounting the chapter.
+    """
+    if not words and not tokens:
+        return
+    Chapter.objects.filter(pk=chapter_id).update(
+        word_count=_shifted_counter("word_count", words),
+        tokens=_shifted_counter("tokens", tokens),
+    )
+    book_id = Chapter.objects.filter(pk=chapter_id).values_list("book_id", flat=True).first()
+    if book_id is not None:
+        _shift_book_totals(book_id, words=words, tokens=tokens)
+
+
 def create_chapter(
     *,
     book_id: str,
     title: str,
     summary: Optional[str] = None,
     ordinal: Optional[int] = None,
-    tokens: Optional[int] = None,
-    word_count: Optional[int] = None,
     chapter_id: Optional[str] = None,
 ) -> ChapterSummaryPayload:
+    """Create an empty chapter; its counters only move with block edits from then on."""
     with transaction.atomic():
         try:
             book = Book.objects.select_for_update().get(pk=book_id)
@@ -87,8 +151,8 @@ def create_chapter(
                 title=title,
                 summary=summary or "",
                 ordinal=effective_ordinal,
-                tokens=int(tokens) if tokens is not None else None,
-                word_count=int(word_count) if word_count is not None else None,
+                tokens=0,
+                word_count=0,
             )
         except IntegrityError as exc:
             raise ValueError("Ya existe un capítulo con ese identificador.") from exc
@@ -97,6 +161,11 @@ def create_chapter(
 
 
 def update_chapter(chapter_id: str, changes: Dict[str, Any]) -> ChapterSummaryPayload:
+    """Update chapter metadata.
+
+    Word and token counters are derived from the blocks and are never set here; use
+    ``recount_token_counters`` to rebuild them.
+    """
     with transaction.atomic():
         try:
             chapter = Chapter.objects.select_for_update().get(pk=chapter_id)
@@ -117,17 +186,51 @@ def update_chapter(chapter_id: str, changes: Dict[str, Any]) -> ChapterSummaryPa
             chapter.ordinal = int(changes["ordinal"])
             fields_to_update.append("ordinal")
 
-        if "tokens" in changes:
-            tokens = changes["tokens"]
-            chapter.tokens = int(tokens) if tokens is not None else None
-            fields_to_update.append("tokens")
-
-        if "word_count" in changes:
-            word_count = changes["word_count"]
-            chapter.word_count = int(word_count) if word_count is not None else None
-            fields_to_update.append("word_count")
-
         if fields_to_update:
             chapter.save(update_fields=fields_to_update)
+            chapter.revision = bump_chapter_revision(chapter_id)
 
     return chapter.to_summary_payload()
+
+
+def recount_token_counters(book_id: Optional[str] = None, *, batch_size: int = 500) -> int:
+    """Re-estimate stored token counts with the current tokenizer backend.
+
+    Block versions with rendered text get a fresh ``token_count``; chapter and book totals
+    are then summed from the active versions, bumping the revision of every chapter whose
+    total changed. Returns the number of such chapters.
+    """
+    versions = ChapterBlockVersion.objects.exclude(rendered_text="")
+    chapters = Chapter.objects.all()
+    if book_id is not None:
+        versions = versions.filter(block__chapter__book_id=book_id)
+        chapters = chapters.filter(book_id=book_id)
+
+    pending = []
+    for version in versions.only("id", "rendered_text", "token_count").iterator(batch_size):
+        tokens = estimate_tokens(version.rendered_text)
+        if tokens != version.token_count:
+            version.token_count = tokens
+            pending.append(version)
+    ChapterBlockVersion.objects.bulk_update(pending, ["token_count"], batch_size=batch_size)
+
+    totals = dict(
+        ChapterBlock.objects.filter(chapter__in=chapters, active_version__isnull=False)
+        .values("chapter_id")
+        .annotate(tokens=Sum("active_version__token_count"))
+        .values_list("chapter_id", "tokens")
+    )
+    changed = 0
+    with transaction.atomic():
+        for chapter_id, tokens in chapters.values_list("id", "tokens"):
+            total = int(totals.get(chapter_id) or 0)
+            if tokens != total:
+                Chapter.objects.filter(pk=chapter_id).update(
+                    tokens=total, revision=F("revision") + 1
+                )
+                changed += 1
+        book_ids = chapters.values("book_id")
+        for book in Book.objects.filter(pk__in=book_ids).annotate(total=Sum("chapters__tokens")):
+            if book.tokens != int(book.total or 0):
+                Book.objects.filter(pk=book.pk).update(tokens=int(book.total or 0))
+    return changed
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 from copy import deepcopy
-from typing import Any, Dict, Iterable, List, Optional, cast
+from typing import Any, Dict, Iterable, List, Optional, Tuple, cast
 from uuid import uuid4
 
+from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
 from django.db.models import Max, Q
+from django.utils import timezone
 
 from ..models import (
     Book,
@@ -17,11 +20,14 @@ from ..models import (
 )
 from ..payloads import ContextItemPayload, ContextSectionPayload
 from ..sample_data import SAMPLE_LIBRARY_BOOKS, SAMPLE_LIBRARY_SECTIONS
+from ..tokens import estimate_tokens
+from .chapters import bump_chapter_revision
 
 __all__ = [
     "get_section_templates_for_book",
     "ensure_book_context_sections",
     "get_book_context_sections",
+    "invalidate_book_context",
     "create_book_context_item",
     "delete_book_context_item",
     "get_active_context_items",
@@ -105,20 +111,82 @@ def _coerce_optional_text(value: Optional[str]) -> str:
     return str(value)
 
 
+def _context_item_key(
+    section_slug: Any, item_id: Any, chapter_id: Any
+) -> Tuple[str, str, Optional[str]]:
+    return str(section_slug), str(item_id), None if chapter_id is None else str(chapter_id)
+
+
+_CONTEXT_TEXT_FIELDS = ("name", "role", "summary", "title", "description", "facts")
+
+
+def _context_item_tokens(item: LibraryContextItem) -> int:
+    text = "\n".join(
+        str(value) for field in _CONTEXT_TEXT_FIELDS if (value := getattr(item, field))
+    )
+    return estimate_tokens(text)
+
+
 def _visibility_key(section_slug: str, item_id: str) -> str:
     return f"{section_slug}::{item_id}"
 
 
+def invalidate_book_context(**book_filters: Any) -> None:
+    """Drop the cached context trees of the books matching ``book_filters``.
+
+    Section, item and visibility saves and deletes call this through signals (see
+    ``studio.signals``); bulk writes, which send no signals, must call it themselves.
+    """
+    Book.objects.filter(**book_filters).update(context_version=uuid4().hex)
+
+
+def _context_cache_timeout() -> int:
+    return max(0, int(getattr(settings, "STUDIO_CONTEXT_CACHE_TIMEOUT", 300)))
+
+
+def _context_cache_key(book_id: str, version: str, chapter_id: Optional[str]) -> str:
+    return f"studio:context:{book_id}:{version}:{chapter_id or ''}"
+
+
+def _context_version(book_id: str) -> Optional[str]:
+    return Book.objects.filter(pk=book_id).values_list("context_version", flat=True).first()
+
+
 def get_book_context_sections(
     book_id: str,
     *,
     chapter_id: Optional[str] = None,
 ) -> List[ContextSectionPayload]:
+    """Return the context tree of a book, as seen from ``chapter_id`` when given.
+
+    Trees are cached under the book's ``context_version``, which every context write
+    replaces, so a read costs one primary-key lookup plus a cache hit.
+    """
+    version = _context_version(book_id)
+    if version is None:
+        return []
+    key = _context_cache_key(book_id, version, chapter_id)
+    cached = cache.get(key)
+    if cached is not None:
+        return cast(List[ContextSectionPayload], cached)
+
     try:
         book = Book.objects.get(pk=book_id)
     except Book.DoesNotExist:
         return []
+    payloads = _build_book_context_sections(book, chapter_id=chapter_id)
+    # A write (including sections created on first use) may have landed meanwhile; only
+    # cache trees that still match the version they were looked up under.
+    if _context_version(book_id) == version:
+        cache.set(key, payloads, _context_cache_timeout())
+    return payloads
+
 
+def _build_book_context_sections(
+    book: Book,
+    *,
+    chapter_id: Optional[str],
+) -> List[ContextSectionPayload]:
     sections = ensure_book_context_sections(book)
 
     chapter_specific_items: Dict[str, List[ContextItemPayload]] = {}
@@ -208,12 +276,7 @@ def create_book_context_item(
         ).get("order__max")
         next_order = (int(current_max) + 1) if current_max is not None else 0
 
-        tokens_raw = payload.get("tokens")
-        tokens_value = None
-        if tokens_raw not in {None, ""}:
-            tokens_value = int(tokens_raw)
-
-        LibraryContextItem.objects.create(
+        item = LibraryContextItem(
             section=section,
             chapter=chapter,
             item_id=item_id,
@@ -224,11 +287,17 @@ def create_book_context_item(
             title=_coerce_optional_text(payload.get("title")),
             description=_coerce_optional_text(payload.get("description")),
             facts=_coerce_optional_text(payload.get("facts")),
-            tokens=tokens_value,
             checked=bool(payload.get("checked", False)),
             disabled=bool(payload.get("disabled", False)),
             order=next_order,
         )
+        tokens_raw = payload.get("tokens")
+        # An explicit count wins; otherwise the item is measured locally.
+        if tokens_raw not in {None, ""}:
+            item.tokens = int(tokens_raw)
+        else:
+            item.tokens = _context_item_tokens(item)
+        item.save(force_insert=True)
 
     return get_book_context_sections(book_id)
 
@@ -318,31 +387,29 @@ def update_book_context_items(
     }
 
     with transaction.atomic():
+        # One locked IN-query resolves every target; the scope is checked in memory.
+        items = {
+            _context_item_key(item.section.slug, item.item_id, item.chapter_id): item
+            for item in LibraryContextItem.objects.select_for_update()
+            .select_related("section")
+            .filter(
+                section__book_id=book_id,
+                item_id__in={str(update["id"]) for update in updates},
+            )
+        }
+
+        changed: Dict[int, LibraryContextItem] = {}
+        changed_fields: set[str] = set()
+        counted: set[int] = set()
         for update in updates:
             section_slug = str(update["sectionSlug"])
             item_id = str(update["id"])
             chapter_id = update.get("chapterId")
 
-            try:
-                item = (
-                    LibraryContextItem.objects.select_for_update()
-                    .select_related("section")
-                    .get(
-                        section__book_id=book_id,
-                        section__slug=section_slug,
-                        item_id=item_id,
-                        **(
-                            {"chapter_id": str(chapter_id)}
-                            if chapter_id is not None
-                            else {"chapter__isnull": True}
-                        ),
-                    )
-                )
-            except LibraryContextItem.DoesNotExist as exc:
+            item = items.get(_context_item_key(section_slug, item_id, chapter_id))
+            if item is None:
                 scope = section_slug if chapter_id is None else f"{section_slug}:{chapter_id}"
-                raise KeyError(f"Unknown context item: {scope}:{item_id}") from exc
-
-            fields_to_update: List[str] = []
+                raise KeyError(f"Unknown context item: {scope}:{item_id}")
 
             for field, model_field in editable_fields.items():
                 if field not in update:
@@ -351,10 +418,27 @@ def update_book_context_items(
                 raw_value = update[field]
                 coerced = "" if raw_value in {None, ""} else str(raw_value)
                 setattr(item, model_field, coerced)
-                fields_to_update.append(model_field)
-
-            if fields_to_update:
-                item.save(update_fields=fields_to_update + ["updated_at"])
+                changed_fields.add(model_field)
+                changed[item.pk] = item
+
+            # As on create, an explicit count wins; otherwise the item is measured locally.
+            tokens_raw = update.get("tokens")
+            if tokens_raw not in {None, ""}:
+                item.tokens = int(tokens_raw)
+                counted.add(item.pk)
+                changed[item.pk] = item
+
+        if changed:
+            now = timezone.now()
+            for item in changed.values():
+                if item.pk not in counted:
+                    item.tokens = _context_item_tokens(item)
+                item.updated_at = now
+            LibraryContextItem.objects.bulk_update(
+                list(changed.values()), sorted(changed_fields) + ["tokens", "updated_at"]
+            )
+            # bulk_update sends no signals.
+            invalidate_book_context(pk=book_id)
 
     return get_book_context_sections(book_id)
 
@@ -372,39 +456,53 @@ def update_chapter_context_visibility(
         book = chapter.book
 
         if updates:
+            requested: Dict[Tuple[str, str], bool] = {}
             for update in updates:
-                section_slug = str(update["sectionSlug"])
-                item_id = str(update["id"])
-                visible = bool(update["visible"])
-
-                try:
-                    context_item = (
-                        LibraryContextItem.objects.select_for_update()
-                        .select_related("section")
-                        .get(
-                            section__book=book,
-                            section__slug=section_slug,
-                            item_id=item_id,
-                            chapter__isnull=True,
-                        )
-                    )
-                except LibraryContextItem.DoesNotExist as exc:
-                    raise KeyError(
-                        f"Unknown book-scoped context item: {section_slug}:{item_id}"
-                    ) from exc
-
-                default_visible = bool(context_item.checked)
-
-                if visible == default_visible:
-                    ChapterContextVisibility.objects.filter(
-                        chapter=chapter,
-                        context_item=context_item,
-                    ).delete()
+                requested[(str(update["sectionSlug"]), str(update["id"]))] = bool(update["visible"])
+
+            context_items = {
+                (item.section.slug, item.item_id): item
+                for item in LibraryContextItem.objects.select_for_update()
+                .select_related("section")
+                .filter(
+                    section__book=book,
+                    item_id__in={item_id for _slug, item_id in requested},
+                    chapter__isnull=True,
+                )
+            }
+
+            defaults: List[int] = []
+            overrides: List[ChapterContextVisibility] = []
+            for (section_slug, item_id), visible in requested.items():
+                context_item = context_items.get((section_slug, item_id))
+                if context_item is None:
+                    raise KeyError(f"Unknown book-scoped context item: {section_slug}:{item_id}")
+                if visible == bool(context_item.checked):
+                    defaults.append(context_item.pk)
                 else:
-                    ChapterContextVisibility.objects.update_or_create(
-                        chapter=chapter,
-                        context_item=context_item,
-                        defaults={"visible": visible},
+                    overrides.append(
+                        ChapterContextVisibility(
+                            chapter=chapter,
+                            context_item=context_item,
+                            visible=visible,
+                        )
                     )
 
+            if defaults:
+                ChapterContextVisibility.objects.filter(
+                    chapter=chapter,
+                    context_item_id__in=defaults,
+                ).delete()
+            if overrides:
+                ChapterContextVisibility.objects.bulk_create(
+                    overrides,
+                    update_conflicts=True,
+                    unique_fields=["chapter", "context_item"],
+                    update_fields=["visible", "updated_at"],
+                )
+
+            # Neither write above sends signals.
+            invalidate_book_context(pk=book.id)
+            bump_chapter_revision(chapter_id)
+
         return get_book_context_sections(book.id, chapter_id=chapter_id)
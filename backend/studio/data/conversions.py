@@ -22,6 +22,8 @@ from ..serializers import ChapterBlockCreateSerializer
 from ..services.gemini import GeminiServiceError, generate_block_conversion
 from .blocks import create_chapter_block, extract_chapter_context_for_block
 from .generation import normalize_generated_blocks
+from .materializer import get_chapter_snapshot
+from .ordering import sort_key_after, sort_key_before
 
 __all__ = [
     "create_block_conversion_suggestion",
@@ -33,6 +35,13 @@ class BlockConversionError(RuntimeError):
     """Raised when a stored conversion cannot be applied."""
 
 
+def _materialize_chapter(chapter_id: str) -> ChapterDetailPayload:
+    detail = get_chapter_snapshot(chapter_id)
+    if detail is None:
+        raise KeyError(f"Unknown chapter: {chapter_id}")
+    return detail
+
+
 def _build_conversion_prompt(
     *,
     chapter: Chapter,
@@ -40,7 +49,7 @@ def _build_conversion_prompt(
     instructions: Optional[str],
     context_block_id: Optional[str],
 ) -> str:
-    chapter_payload: ChapterDetailPayload = chapter.to_detail_payload()
+    chapter_payload = _materialize_chapter(chapter.id)
     context_window = extract_chapter_context_for_block(chapter_payload, context_block_id)
     return build_block_conversion_prompt(
         chapter=chapter_payload,
@@ -63,11 +72,7 @@ def create_block_conversion_suggestion(
         raise ValueError("El texto fuente no puede estar vacío.")
 
     try:
-        chapter = (
-            Chapter.objects.select_related("book")
-            .prefetch_related("blocks", "blocks__active_version")
-            .get(pk=chapter_id)
-        )
+        chapter = Chapter.objects.get(pk=chapter_id)
     except Chapter.DoesNotExist as exc:
         raise KeyError(f"Unknown chapter: {chapter_id}") from exc
 
@@ -148,7 +153,7 @@ def apply_block_conversion_suggestion(
         try:
             conversion = (
                 ChapterBlockConversion.objects.select_for_update()
-                .select_related("chapter", "chapter__book")
+                .select_related("chapter")
                 .get(pk=conversion_id)
             )
         except ChapterBlockConversion.DoesNotExist as exc:
@@ -166,39 +171,40 @@ def apply_block_conversion_suggestion(
         serializer.is_valid(raise_exception=True)
 
         chapter = conversion.chapter
-        base_position: Optional[int] = None
         if placement != "append" and anchor_block_id:
             try:
                 anchor = (
                     ChapterBlock.objects.select_for_update()
-                    .only("id", "position")
+                    .only("id")
                     .get(chapter=chapter, pk=anchor_block_id)
                 )
             except ChapterBlock.DoesNotExist as exc:
                 raise KeyError(f"Unknown anchor block: {anchor_block_id}") from exc
-            base_position = anchor.position
-            if placement == "after":
-                base_position += 1
+            previous_id = anchor.id
         elif placement != "append" and not anchor_block_id:
             raise ValueError(
                 "Debe proporcionarse 'anchor_block_id' salvo que placement sea 'append'."
             )
 
         created_block_ids: List[str] = []
-        detail: Optional[ChapterDetailPayload] = None
-        for index, block_payload in enumerate(serializer.validated_data):
+        for block_payload in serializer.validated_data:
             create_payload = dict(block_payload)
             block_id = uuid4().hex
             create_payload["id"] = block_id
-            if base_position is not None:
-                create_payload["position"] = base_position + index
-            detail = create_chapter_block(chapter_id=chapter.id, payload=create_payload)
+            # Each block goes right after the previous one, or right before the anchor, so
+            # only neighbouring keys are read.
+            sort_key: Optional[int] = None
+            if placement == "after":
+                sort_key = sort_key_after(chapter.id, previous_id)
+                previous_id = block_id
+            elif placement == "before":
+                sort_key = sort_key_before(chapter.id, anchor.id)
+            # Only the final chapter state is returned, so skip per-block materialisation.
+            create_chapter_block(
+                chapter_id=chapter.id, payload=create_payload, sort_key=sort_key, respond=False
+            )
             created_block_ids.append(block_id)
 
         conversion.mark_accepted(block_ids=created_block_ids)
 
-    if detail is None:
-        # Safety net: fetch latest chapter detail.
-        chapter.refresh_from_db()
-        detail = chapter.to_detail_payload()
-    return detail
+    return _materialize_chapter(chapter.id)
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 from ..payloads import EditorPayload, build_editor_state
-from ..sample_data import DEFAULT_EDITOR_CHAPTER_ID, DEFAULT_EDITOR_TOKEN_BUDGET
+from ..sample_data import DEFAULT_EDITOR_CHAPTER_ID
+from ..tokens import estimate_tokens
 from .chapters import get_chapter_detail
 
 __all__ = ["get_editor_state"]
@@ -12,4 +13,10 @@ def get_editor_state(chapter_id: str | None = None) -> EditorPayload:
     detail = get_chapter_detail(target_id)
     if detail is None:
         raise KeyError(f"Unknown chapter: {target_id}")
-    return build_editor_state(source=detail, token_budget=DEFAULT_EDITOR_TOKEN_BUDGET)
+    # Chapter tokens are measured on every block write; chapters that were never counted
+    # are estimated from their content.
+    tokens = detail.get("tokens")
+    return build_editor_state(
+        source=detail,
+        tokens=estimate_tokens(detail["content"]) if tokens is None else int(tokens),
+    )
@@ -0,0 +1,84 @@
+"""Streaming export of a whole book as Markdown, plain text or JSON Lines."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from ..models import Book, ChapterBlockType
+from ..payloads import ChapterBlockPayload
+from ..representations import represent_chapter_block
+from .importer import escape_markdown_line
+from .materializer import iter_book_chapter_blocks
+
+__all__ = [
+    "BOOK_EXPORT_FORMATS",
+    "iter_book_export",
+]
+
+BOOK_EXPORT_FORMATS = ("markdown", "text", "jsonl")
+
+_encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def _markdown_block(block: ChapterBlockPayload, text: str) -> str:
+    # Scene breaks use the forms the manuscript importer reads back.
+    if block["type"] == ChapterBlockType.SCENE_BOUNDARY:
+        label = str(block.get("label") or "").strip()
+        return f"### {label}" if label else "***"
+    # Text lines that look like Markdown structure are escaped so they import as text.
+    return "\n".join(escape_markdown_line(line) for line in text.split("\n"))
+
+
+def _iter_markdown(book_id: str) -> Iterator[str]:
+    separator = ""
+    for chapter, blocks in iter_book_chapter_blocks(book_id):
+        yield f"{separator}# {chapter['title']}\n"
+        separator = "\n"
+        for block, text in blocks:
+            rendered = _markdown_block(block, text)
+            if rendered:
+                yield f"\n{rendered}\n"
+
+
+def _iter_text(book_id: str) -> Iterator[str]:
+    separator = ""
+    for chapter, blocks in iter_book_chapter_blocks(book_id):
+        yield f"{separator}{chapter['title']}\n"
+        separator = "\n\n"
+        for _block, text in blocks:
+            if text:
+                yield f"\n{text}\n"
+
+
+def _iter_jsonl(book: Dict[str, Any]) -> Iterator[str]:
+    yield _encoder.encode({"kind": "book", **book}) + "\n"
+    for chapter, blocks in iter_book_chapter_blocks(book["id"]):
+        yield _encoder.encode({"kind": "chapter", **chapter}) + "\n"
+        for block, text in blocks:
+            record = {
+                "kind": "block",
+                "chapterId": chapter["id"],
+                "block": represent_chapter_block(block),
+                "text": text,
+            }
+            yield _encoder.encode(record) + "\n"
+
+
+def iter_book_export(book_id: str, export_format: str) -> Iterator[str]:
+    """Return an iterator of text fragments rendering the book in ``export_format``.
+
+    The book and format are checked before anything is yielded; blocks are then read
+    through a single cursor and rendered with ``block_to_text``, one at a time.
+    """
+    if export_format not in BOOK_EXPORT_FORMATS:
+        raise ValueError("Formato de exportación no soportado.")
+    book = Book.objects.filter(pk=book_id).values("id", "title", "author", "synopsis").first()
+    if book is None:
+        raise KeyError(f"Unknown book: {book_id}")
+    if export_format == "markdown":
+        return _iter_markdown(book_id)
+    if export_format == "text":
+        return _iter_text(book_id)
+    return _iter_jsonl(book)
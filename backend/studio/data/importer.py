@@ -0,0 +1,295 @@
+"""Deterministic import of Markdown or plain-text manuscripts into chapters and blocks.
+
+The manuscript is read line by line and split with simple heuristics:
+
+* Markdown ``#``/``##`` headings and standalone "Capítulo 3"/"Chapter IV" lines start a
+  chapter; deeper Markdown headings become labelled scene boundaries.
+* Thematic breaks such as ``***``, ``* * *`` or ``---`` become scene boundaries.
+* Paragraphs are separated by blank lines; wrapped lines are joined with a space.
+* A leading ``\\`` escapes a Markdown marker (``\\#``, ``\\***``, ``\\- ``) so the
+  line stays paragraph text; the exporter writes such escapes.
+* Paragraphs whose lines open with a dialogue mark (``—``, ``«``, ``“``, ``"``) become
+  dialogue blocks with one turn per line; consecutive ones share a block.
+
+Rows are written with ``bulk_create`` in batches inside a single transaction, so an
+import either lands completely or not at all.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Literal, Optional, Tuple, TypedDict
+from uuid import uuid4
+
+from django.db import transaction
+from django.db.models import Max, OuterRef, Subquery
+
+from ..models import Book, Chapter, ChapterBlock, ChapterBlockType, ChapterBlockVersion
+from ..payloads import ChapterSummaryPayload
+from .chapters import apply_chapter_text_delta
+from .ordering import SORT_KEY_GAP
+
+__all__ = [
+    "MANUSCRIPT_FORMATS",
+    "ManuscriptImportResult",
+    "escape_markdown_line",
+    "guess_manuscript_format",
+    "import_manuscript",
+    "parse_manuscript",
+]
+
+MANUSCRIPT_FORMATS = ("markdown", "text")
+DEFAULT_IMPORT_BATCH_SIZE = 2000
+
+_MARKDOWN_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_CHAPTER_HEADING = re.compile(
+    r"^(?:cap[ií]tulo|chapter|parte|part)\s+(?:\d+|[ivxlcdm]+)\b.{0,120}$", re.IGNORECASE
+)
+_CHAPTER_KEYWORD = re.compile(r"^(?:cap[ií]tulo|chapter|parte|part)\s", re.IGNORECASE)
+_SCENE_BREAK = re.compile(r"^\s*([*\-_])(\s*\1){2,}\s*$")
+# Line openings Markdown would read as a heading, quote, list item or thematic break.
+_MARKDOWN_MARKER = re.compile(r"^(?:#|>|[-*+](?:\s|$)|([*\-_])(?:\s*\1){2,}\s*$)")
+# "- " is left out: it opens Markdown list items, which are not dialogue.
+_DIALOGUE_MARKS = ("—", "«", "“", '"', "– ")
+
+ManuscriptEvent = Tuple[Literal["chapter", "block"], str, Dict[str, Any]]
+
+
+class ManuscriptImportResult(TypedDict):
+    bookId: str
+    chapters: List[ChapterSummaryPayload]
+    blockCount: int
+    wordCount: int
+
+
+def guess_manuscript_format(filename: str) -> str:
+    return "markdown" if filename.lower().endswith((".md", ".markdown")) else "text"
+
+
+def escape_markdown_line(line: str) -> str:
+    """Backslash-escape a leading Markdown marker so the line reads back as plain text."""
+    stripped = line.lstrip()
+    return f"\\{stripped}" if _MARKDOWN_MARKER.match(stripped) else line
+
+
+def _is_chapter_heading(line: str) -> bool:
+    # Spelled-out numbers ("CAPÍTULO PRIMERO") are only trusted in upper case.
+    if _CHAPTER_HEADING.match(line):
+        return True
+    return line.isupper() and _CHAPTER_KEYWORD.match(line) is not None and len(line) <= 120
+
+
+def _is_dialogue_line(line: str) -> bool:
+    return line.startswith(_DIALOGUE_MARKS)
+
+
+def _chunk_events(lines: List[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Turn the lines of one blank-line separated chunk into block payloads."""
+    if not _is_dialogue_line(lines[0]):
+        yield ChapterBlockType.PARAGRAPH, {"text": " ".join(lines)}
+        return
+    utterances: List[str] = []
+    for line in lines:
+        if _is_dialogue_line(line) or not utterances:
+            utterances.append(line)
+        else:
+            utterances[-1] = f"{utterances[-1]} {line}"
+    yield ChapterBlockType.DIALOGUE, {"turns": [{"utterance": text} for text in utterances]}
+
+
+def parse_manuscript(lines: Iterable[str], *, markdown: bool) -> Iterator[ManuscriptEvent]:
+    """Yield ``("chapter", title, {})`` and ``("block", type, payload)`` events in order.
+
+    Blocks seen before the first chapter heading belong to an implicit first chapter.
+    Dialogue turns have no identifiers yet; the importer assigns them.
+    """
+    chunk: List[str] = []
+    pending_dialogue: Optional[Dict[str, Any]] = None
+
+    def flush_dialogue() -> Iterator[ManuscriptEvent]:
+        nonlocal pending_dialogue
+        if pending_dialogue is not None:
+            yield "block", ChapterBlockType.DIALOGUE, pending_dialogue
+            pending_dialogue = None
+
+    def flush_chunk() -> Iterator[ManuscriptEvent]:
+        nonlocal pending_dialogue
+        if not chunk:
+            return
+        if len(chunk) == 1 and _is_chapter_heading(chunk[0]):
+            yield from flush_dialogue()
+            yield "chapter", chunk[0], {}
+        else:
+            for block_type, payload in _chunk_events(chunk):
+                if block_type == ChapterBlockType.DIALOGUE:
+                    if pending_dialogue is None:
+                        pending_dialogue = payload
+                    else:
+                        pending_dialogue["turns"].extend(payload["turns"])
+                    continue
+                yield from flush_dialogue()
+                yield "block", block_type, payload
+        chunk.clear()
+
+    for raw_line in lines:
+        line = raw_line.strip()
+        if not line:
+            yield from flush_chunk()
+            continue
+
+        if markdown and line.startswith("\\") and _MARKDOWN_MARKER.match(line[1:]):
+            chunk.append(line[1:])
+            continue
+
+        heading = _MARKDOWN_HEADING.match(line) if markdown else None
+        if heading is not None or _SCENE_BREAK.match(line):
+            yield from flush_chunk()
+            yield from flush_dialogue()
+            if heading is None:
+                yield "block", ChapterBlockType.SCENE_BOUNDARY, {}
+            elif len(heading.group(1)) <= 2:
+                yield "chapter", heading.group(2), {}
+            else:
+                yield "block", ChapterBlockType.SCENE_BOUNDARY, {"label": heading.group(2)}
+            continue
+
+        chunk.append(line)
+
+    yield from flush_chunk()
+    yield from flush_dialogue()
+
+
+class _ImportWriter:
+    """Accumulate parsed rows and write them with ``bulk_create`` every ``batch_size``."""
+
+    def __init__(self, book: Book, *, batch_size: int) -> None:
+        self.book = book
+        self.batch_size = batch_size
+        current_max = book.chapters.aggregate(Max("ordinal")).get("ordinal__max")
+        self.next_ordinal = 0 if current_max is None else int(current_max) + 1
+        self.chapter_ids: List[str] = []
+        self.totals: Dict[str, Tuple[int, int]] = {}
+        self.pending_chapters: List[Chapter] = []
+        self.pending_blocks: List[ChapterBlock] = []
+        self.pending_versions: List[ChapterBlockVersion] = []
+        self.chapter: Optional[Chapter] = None
+        self.block_index = 0
+        self.block_count = 0
+
+    def start_chapter(self, title: str) -> None:
+        chapter = Chapter(
+            id=uuid4().hex,
+            book=self.book,
+            title=title.strip()[:255] or "Sin título",
+            ordinal=self.next_ordinal,
+            word_count=0,
+            tokens=0,
+        )
+        self.next_ordinal += 1
+        self.chapter = chapter
+        self.block_index = 0
+        self.chapter_ids.append(chapter.id)
+        self.totals[chapter.id] = (0, 0)
+        self.pending_chapters.append(chapter)
+
+    def add_block(self, block_type: str, payload: Dict[str, Any], *, default_title: str) -> None:
+        if self.chapter is None:
+            self.start_chapter(default_title)
+        assert self.chapter is not None
+        block_id = uuid4().hex
+        if "turns" in payload:
+            payload["turns"] = [
+                {"id": f"{block_id}-turn-{index:02d}", **turn}
+                for index, turn in enumerate(payload["turns"], start=1)
+            ]
+        derived = ChapterBlockVersion.derived_fields(block_type, payload)
+        self.pending_blocks.append(
+            ChapterBlock(
+                id=block_id,
+                chapter=self.chapter,
+                type=block_type,
+                sort_key=self.block_index * SORT_KEY_GAP,
+                payload=payload,
+            )
+        )
+        self.pending_versions.append(
+            ChapterBlockVersion(
+                block_id=block_id,
+                version=1,
+                payload=payload,
+                is_active=True,
+                **derived,
+            )
+        )
+        words, tokens = self.totals[self.chapter.id]
+        self.totals[self.chapter.id] = (
+            words + int(derived["word_count"]),
+            tokens + int(derived["token_count"]),
+        )
+        self.block_index += 1
+        self.block_count += 1
+        if len(self.pending_blocks) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.pending_chapters:
+            Chapter.objects.bulk_create(self.pending_chapters, batch_size=self.batch_size)
+            self.pending_chapters = []
+        if not self.pending_blocks:
+            return
+        block_ids = [block.id for block in self.pending_blocks]
+        ChapterBlock.objects.bulk_create(self.pending_blocks, batch_size=self.batch_size)
+        ChapterBlockVersion.objects.bulk_create(self.pending_versions, batch_size=self.batch_size)
+        # One statement links every block of the batch to its first version.
+        ChapterBlock.objects.filter(pk__in=block_ids).update(
+            active_version=Subquery(
+                ChapterBlockVersion.objects.filter(block=OuterRef("pk"), version=1).values("id")[:1]
+            )
+        )
+        self.pending_blocks = []
+        self.pending_versions = []
+
+    def finish(self) -> None:
+        self.flush()
+        for chapter_id, (words, tokens) in self.totals.items():
+            apply_chapter_text_delta(chapter_id, words=words, tokens=tokens)
+
+
+def import_manuscript(
+    book_id: str,
+    lines: Iterable[str],
+    *,
+    markdown: bool,
+    default_title: str = "Sin título",
+    batch_size: int = DEFAULT_IMPORT_BATCH_SIZE,
+) -> ManuscriptImportResult:
+    """Append the chapters of a manuscript to a book and return what was created.
+
+    ``lines`` is consumed lazily, so a file object can be passed directly. Chapters get
+    ordinals after the book's existing ones and blocks start with a single version.
+    """
+    if batch_size < 1:
+        raise ValueError("El tamaño de lote debe ser al menos 1.")
+    with transaction.atomic():
+        try:
+            book = Book.objects.select_for_update().get(pk=book_id)
+        except Book.DoesNotExist as exc:
+            raise KeyError(f"Unknown book: {book_id}") from exc
+
+        writer = _ImportWriter(book, batch_size=batch_size)
+        for kind, value, payload in parse_manuscript(lines, markdown=markdown):
+            if kind == "chapter":
+                writer.start_chapter(value)
+            else:
+                writer.add_block(value, payload, default_title=default_title)
+        writer.finish()
+
+        chapters = Chapter.objects.filter(pk__in=writer.chapter_ids).order_by("ordinal")
+        summaries = [chapter.to_summary_payload() for chapter in chapters]
+
+    return {
+        "bookId": book_id,
+        "chapters": summaries,
+        "blockCount": writer.block_count,
+        "wordCount": sum(words for words, _tokens in writer.totals.values()),
+    }
@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ..models import Chapter, ChapterBlock, ChapterSnapshot
+from ..payloads import (
+    ChapterBlockPayload,
+    ChapterDetailPayload,
+    chapter_detail_from_blocks,
+    render_block_text,
+)
+from .ordering import (
+    BLOCK_ORDERING,
+    annotate_block_positions,
+    block_position,
+    following_blocks,
+    preceding_blocks,
+)
+
+__all__ = [
+    "materialize_chapter_blocks",
+    "materialize_chapter_detail",
+    "materialize_chapter_header",
+    "iter_chapter_block_payloads",
+    "iter_chapter_paragraphs",
+    "iter_book_chapter_blocks",
+    "materialize_chapter_block_window",
+    "get_chapter_snapshot",
+    "store_chapter_snapshot",
+]
+
+_BLOCK_FIELDS = (
+    "id",
+    "type",
+    "sort_key",
+    "payload",
+    "active_version_id",
+    "active_version_number",
+    "version_count",
+    "revision",
+    "active_version__rendered_text",
+)
+
+_STREAM_CHUNK_SIZE = 200
+
+_CHAPTER_FIELDS = (
+    "id",
+    "title",
+    "summary",
+    "ordinal",
+    "tokens",
+    "word_count",
+    "revision",
+    "book_id",
+    "book__title",
+)
+
+
+def _block_payload_from_row(row: Dict[str, Any]) -> ChapterBlockPayload:
+    """Mirror ``ChapterBlock.to_payload`` for a ``values()`` row."""
+    data: Dict[str, Any] = {
+        "id": row["id"],
+        "type": row["type"],
+        "position": int(row["position"]),
+    }
+    # ``payload`` mirrors the active version, whose own row may hold only a delta.
+    data.update(row["payload"] or {})
+    data["activeVersion"] = int(row["active_version_number"] or 1)
+    data["versionCount"] = int(row["version_count"] or 1)
+    data["revision"] = int(row["revision"] or 1)
+    return data  # type: ignore[return-value]
+
+
+def _rendered_text_from_row(row: Dict[str, Any]) -> str:
+    # Versions store their rendering; only legacy blocks without one are rendered here.
+    if row["active_version_id"] is not None:
+        return row["active_version__rendered_text"] or ""
+    return render_block_text(row["type"], row["payload"] or {})
+
+
+def _with_positions(rows: Iterable[Dict[str, Any]], start: int = 0) -> Iterator[Dict[str, Any]]:
+    for position, row in enumerate(rows, start=start):
+        row["position"] = position
+        yield row
+
+
+def _block_rows(
+    chapter_id: str,
+    *,
+    block_ids: Optional[Iterable[str]] = None,
+) -> List[Dict[str, Any]]:
+    queryset = ChapterBlock.objects.filter(chapter_id=chapter_id).order_by(*BLOCK_ORDERING)
+    if block_ids is None:
+        return list(_with_positions(queryset.values(*_BLOCK_FIELDS)))
+    # A subset cannot be ranked by enumeration; count the preceding blocks instead.
+    queryset = annotate_block_positions(queryset.filter(pk__in=list(block_ids)))
+    return list(queryset.values(*_BLOCK_FIELDS, "position"))
+
+
+def materialize_chapter_blocks(
+    chapter_id: str,
+    *,
+    block_ids: Optional[Iterable[str]] = None,
+) -> List[ChapterBlockPayload]:
+    """Return block payloads ordered by position using a single joined query."""
+    return [_block_payload_from_row(row) for row in _block_rows(chapter_id, block_ids=block_ids)]
+
+
+def iter_chapter_paragraphs(
+    chapter_id: str,
+    *,
+    chunk_size: int = _STREAM_CHUNK_SIZE,
+) -> Iterator[str]:
+    """Yield the chapter ``paragraphs`` from the pre-rendered version text."""
+    rows = (
+        ChapterBlock.objects.filter(chapter_id=chapter_id)
+        .order_by(*BLOCK_ORDERING)
+        .values("id", "type", "active_version_id", "active_version__rendered_text")
+        .iterator(chunk_size=chunk_size)
+    )
+    for row in rows:
+        if row["active_version_id"] is None:
+            row["payload"] = (
+                ChapterBlock.objects.filter(pk=row["id"]).values_list("payload", flat=True).first()
+            )
+        text = _rendered_text_from_row(row)
+        if text:
+            yield text
+
+
+def iter_chapter_block_payloads(
+    chapter_id: str,
+    *,
+    chunk_size: int = _STREAM_CHUNK_SIZE,
+) -> Iterator[ChapterBlockPayload]:
+    """Yield block payloads ordered by position without loading the whole chapter."""
+    rows = (
+        ChapterBlock.objects.filter(chapter_id=chapter_id)
+        .order_by(*BLOCK_ORDERING)
+        .values(*_BLOCK_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+    for row in _with_positions(rows):
+        yield _block_payload_from_row(row)
+
+
+def iter_book_chapter_blocks(
+    book_id: str,
+    *,
+    chunk_size: int = _STREAM_CHUNK_SIZE,
+) -> Iterator[Tuple[Dict[str, Any], Iterator[Tuple[ChapterBlockPayload, str]]]]:
+    """Yield each chapter of a book with an iterator over its blocks and rendered text.
+
+    Chapters come in ``ordinal`` order and every block of the book is read through one
+    cursor sorted the same way, so a chapter's blocks are only available until the next
+    chapter is requested.
+    """
+    chapters = list(
+        Chapter.objects.filter(book_id=book_id)
+        .order_by("ordinal", "id")
+        .values("id", "title", "summary", "ordinal")
+    )
+    rows = (
+        ChapterBlock.objects.filter(chapter__book_id=book_id)
+        .order_by("chapter__ordinal", "chapter_id", *BLOCK_ORDERING)
+        .values(*_BLOCK_FIELDS, "chapter_id")
+        .iterator(chunk_size=chunk_size)
+    )
+    pending = next(rows, None)
+
+    def chapter_blocks(chapter_id: str) -> Iterator[Tuple[ChapterBlockPayload, str]]:
+        nonlocal pending
+        position = 0
+        while pending is not None and pending["chapter_id"] == chapter_id:
+            row = pending
+            row["position"] = position
+            position += 1
+            yield _block_payload_from_row(row), _rendered_text_from_row(row)
+            pending = next(rows, None)
+
+    for chapter in chapters:
+        blocks = chapter_blocks(chapter["id"])
+        yield chapter, blocks
+        # Skip whatever the caller left unread so the cursor reaches the next chapter.
+        for _ in blocks:
+            pass
+
+
+def _block_cursor(row: Dict[str, Any]) -> str:
+    return f"{int(row['sort_key'])}:{row['id']}"
+
+
+def _resolve_block_cursor(chapter_id: str, cursor: str) -> Tuple[int, str]:
+    """Return the ``(sort_key, id)`` a window cursor points at.
+
+    A cursor names the block at the edge of the previous window. The block's current key
+    wins, so cursors survive renumbering; the encoded key is only used once the block is
+    gone.
+    """
+    raw_key, separator, block_id = cursor.partition(":")
+    try:
+        sort_key = int(raw_key)
+    except ValueError:
+        sort_key = None
+    if not separator or not block_id or sort_key is None:
+        raise ValueError(f"Invalid block cursor: {cursor}")
+    current = (
+        ChapterBlock.objects.filter(chapter_id=chapter_id, pk=block_id)
+        .values_list("sort_key", flat=True)
+        .first()
+    )
+    return (int(current) if current is not None else sort_key), block_id
+
+
+def materialize_chapter_block_window(
+    chapter_id: str,
+    *,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: int,
+) -> Tuple[List[ChapterBlockPayload], Optional[str], Optional[str]]:
+    """Return up to ``limit`` blocks next to a block cursor.
+
+    ``after`` pages forward from the cursor's block (exclusive) and ``before`` pages
+    backward. Alongside the blocks, the cursors for the previous and next windows are
+    returned, or ``None`` when the window touches the start or end of the chapter.
+    """
+    queryset = ChapterBlock.objects.filter(chapter_id=chapter_id)
+    if before is not None:
+        rows = list(
+            queryset.filter(preceding_blocks(*_resolve_block_cursor(chapter_id, before)))
+            .order_by("-sort_key", "-id")
+            .values(*_BLOCK_FIELDS)[: limit + 1]
+        )
+        rows = rows[:limit][::-1]
+        has_next = (
+            bool(rows)
+            and queryset.filter(following_blocks(rows[-1]["sort_key"], rows[-1]["id"])).exists()
+        )
+    else:
+        if after is not None:
+            queryset = queryset.filter(following_blocks(*_resolve_block_cursor(chapter_id, after)))
+        rows = list(queryset.order_by(*BLOCK_ORDERING).values(*_BLOCK_FIELDS)[: limit + 1])
+        has_next = len(rows) > limit
+        rows = rows[:limit]
+
+    if not rows:
+        return [], None, None
+
+    first_position = block_position(chapter_id, rows[0]["sort_key"], rows[0]["id"])
+    blocks = [_block_payload_from_row(row) for row in _with_positions(rows, first_position)]
+    previous_cursor = _block_cursor(rows[0]) if first_position > 0 else None
+    next_cursor = _block_cursor(rows[-1]) if has_next else None
+    return blocks, previous_cursor, next_cursor
+
+
+def _chapter_detail_from_row(
+    chapter: Dict[str, Any],
+    block_rows: List[Dict[str, Any]],
+) -> ChapterDetailPayload:
+    paragraphs = [text for text in map(_rendered_text_from_row, block_rows) if text]
+    return chapter_detail_from_blocks(
+        chapter_id=chapter["id"],
+        title=chapter["title"],
+        summary=chapter["summary"] or None,
+        ordinal=int(chapter["ordinal"]),
+        tokens=int(chapter["tokens"]) if chapter["tokens"] is not None else None,
+        word_count=int(chapter["word_count"]) if chapter["word_count"] is not None else None,
+        blocks=[_block_payload_from_row(row) for row in block_rows],
+        book_id=chapter["book_id"],
+        book_title=chapter["book__title"],
+        revision=int(chapter["revision"]),
+        paragraphs=paragraphs,
+    )
+
+
+def materialize_chapter_header(chapter_id: str) -> Optional[ChapterDetailPayload]:
+    """Return the chapter detail payload with empty blocks, paragraphs and content."""
+    chapter = Chapter.objects.filter(pk=chapter_id).values(*_CHAPTER_FIELDS).first()
+    if chapter is None:
+        return None
+    return _chapter_detail_from_row(chapter, [])
+
+
+def materialize_chapter_detail(chapter_id: str) -> Optional[ChapterDetailPayload]:
+    """Build the chapter detail payload without instantiating block models."""
+    chapter = Chapter.objects.filter(pk=chapter_id).values(*_CHAPTER_FIELDS).first()
+    if chapter is None:
+        return None
+    return _chapter_detail_from_row(chapter, _block_rows(chapter_id))
+
+
+def store_chapter_snapshot(detail: ChapterDetailPayload) -> None:
+    """Persist ``detail`` as the chapter snapshot for its revision."""
+    revision = detail.get("revision")
+    if revision is None:
+        return
+    ChapterSnapshot.objects.update_or_create(
+        chapter_id=detail["id"],
+        defaults={"revision": int(revision), "payload": detail},
+    )
+
+
+def get_chapter_snapshot(chapter_id: str) -> Optional[ChapterDetailPayload]:
+    """Return the chapter detail from its snapshot, rebuilding it when stale.
+
+    A fresh snapshot costs a single query; every mutation bumps the chapter revision, which
+    invalidates the stored document until the next read or full mutation response
+    rewrites it.
+    """
+    row = (
+        Chapter.objects.filter(pk=chapter_id)
+        .values_list("revision", "snapshot__revision", "snapshot__payload")
+        .first()
+    )
+    if row is None:
+        return None
+
+    revision, snapshot_revision, snapshot_payload = row
+    if snapshot_revision is not None and int(snapshot_revision) == int(revision):
+        return snapshot_payload
+
+    detail = materialize_chapter_detail(chapter_id)
+    if detail is not None:
+        store_chapter_snapshot(detail)
+    return detail
@@ -0,0 +1,274 @@
+"""Sparse ordering keys for chapter blocks.
+
+Blocks are ordered by ``ChapterBlock.sort_key``, an integer spaced ``SORT_KEY_GAP`` apart
+when a chapter is (re)numbered. Inserting takes the midpoint between the neighbouring
+keys and deleting leaves a hole, so neither touches sibling rows. Only when two
+neighbours run out of room is the chapter renumbered. The dense ``position`` exposed by
+the API is the rank of a block within its chapter and is computed on read.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from django.db.models import Count, Max, OuterRef, Q, QuerySet, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from ..models import ChapterBlock
+
+__all__ = [
+    "BLOCK_ORDERING",
+    "SORT_KEY_GAP",
+    "annotate_block_positions",
+    "append_sort_key",
+    "apply_block_order",
+    "block_position",
+    "following_blocks",
+    "move_sort_key",
+    "ordered_chapter_blocks",
+    "plan_sort_keys",
+    "preceding_blocks",
+    "renumber_chapter_blocks",
+    "sort_key_after",
+    "sort_key_at",
+    "sort_key_before",
+    "sort_key_between",
+]
+
+SORT_KEY_GAP = 1 << 16
+
+BLOCK_ORDERING = ("sort_key", "id")
+
+
+def ordered_chapter_blocks(chapter_id: str) -> QuerySet[ChapterBlock]:
+    return ChapterBlock.objects.filter(chapter_id=chapter_id).order_by(*BLOCK_ORDERING)
+
+
+def preceding_blocks(sort_key: Any, block_id: Any) -> Q:
+    """Match the blocks ordered before ``(sort_key, block_id)``; ties break on the id."""
+    return Q(sort_key__lt=sort_key) | Q(sort_key=sort_key, id__lt=block_id)
+
+
+def following_blocks(sort_key: Any, block_id: Any) -> Q:
+    """Match the blocks ordered after ``(sort_key, block_id)``; ties break on the id."""
+    return Q(sort_key__gt=sort_key) | Q(sort_key=sort_key, id__gt=block_id)
+
+
+def block_position(chapter_id: str, sort_key: int, block_id: str) -> int:
+    """Return the dense position of the block identified by ``(sort_key, block_id)``.
+
+    The block's own stored row is ignored, so a key that was not saved yet can be ranked.
+    """
+    return (
+        ChapterBlock.objects.filter(chapter_id=chapter_id)
+        .filter(preceding_blocks(sort_key, block_id))
+        .exclude(pk=block_id)
+        .count()
+    )
+
+
+def annotate_block_positions(queryset: QuerySet[ChapterBlock]) -> QuerySet[ChapterBlock]:
+    """Annotate ``position`` on a filtered subset of blocks with a correlated count."""
+    preceding = (
+        ChapterBlock.objects.filter(chapter_id=OuterRef("chapter_id"))
+        .filter(preceding_blocks(OuterRef("sort_key"), OuterRef("id")))
+        .order_by()
+        .values("chapter_id")
+        .annotate(total=Count("*"))
+        .values("total")
+    )
+    return queryset.annotate(position=Coalesce(Subquery(preceding), Value(0)))
+
+
+def sort_key_between(previous: Optional[int], following: Optional[int]) -> Optional[int]:
+    """Return a key strictly between two neighbours, or ``None`` when there is no room."""
+    if previous is None and following is None:
+        return 0
+    if previous is None:
+        return int(following) - SORT_KEY_GAP
+    if following is None:
+        return int(previous) + SORT_KEY_GAP
+    if following - previous < 2:
+        return None
+    return (previous + following) // 2
+
+
+def _neighbour_keys(
+    chapter_id: str,
+    index: int,
+    exclude_id: Optional[str],
+) -> Tuple[Optional[int], Optional[int]]:
+    # A dense index from the API can only be resolved by seeking to it in key order.
+    queryset = ordered_chapter_blocks(chapter_id)
+    if exclude_id is not None:
+        queryset = queryset.exclude(pk=exclude_id)
+    keys = queryset.values_list("sort_key", flat=True)
+    if index <= 0:
+        return None, keys.first()
+    window = list(keys[index - 1 : index + 1])
+    if not window:
+        # Past the end: append after the current last block.
+        return queryset.aggregate(Max("sort_key"))["sort_key__max"], None
+    return window[0], window[1] if len(window) > 1 else None
+
+
+def sort_key_at(chapter_id: str, index: int, *, exclude_id: Optional[str] = None) -> int:
+    """Return a key placing a block at dense ``index``, renumbering lazily if needed.
+
+    ``exclude_id`` leaves the block being moved out of the neighbour lookup.
+    """
+    key = sort_key_between(*_neighbour_keys(chapter_id, index, exclude_id))
+    if key is None:
+        renumber_chapter_blocks(chapter_id)
+        key = sort_key_between(*_neighbour_keys(chapter_id, index, exclude_id))
+    return int(key)  # type: ignore[arg-type]
+
+
+def move_sort_key(chapter_id: str, block_id: str, sort_key: int, index: int) -> Optional[int]:
+    """Return a new key moving a block to dense ``index``, or ``None`` if it is already there.
+
+    Renumbering may rewrite the block's stored key, so callers re-read it when needed.
+    """
+    previous, following = _neighbour_keys(chapter_id, index, block_id)
+    if (previous is None or previous < sort_key) and (following is None or sort_key < following):
+        return None
+    key = sort_key_between(previous, following)
+    return key if key is not None else sort_key_at(chapter_id, index, exclude_id=block_id)
+
+
+def _key_beside(chapter_id: str, block_id: str, *, after: bool) -> Optional[int]:
+    """Return a key between ``block_id`` and its next (or previous) sibling, if any fits."""
+    try:
+        sort_key = ChapterBlock.objects.values_list("sort_key", flat=True).get(
+            chapter_id=chapter_id, pk=block_id
+        )
+    except ChapterBlock.DoesNotExist as exc:
+        raise KeyError(f"Unknown block: {block_id}") from exc
+    siblings = ChapterBlock.objects.filter(chapter_id=chapter_id)
+    if after:
+        siblings = siblings.filter(following_blocks(sort_key, block_id)).order_by(*BLOCK_ORDERING)
+    else:
+        siblings = siblings.filter(preceding_blocks(sort_key, block_id)).order_by(
+            "-sort_key", "-id"
+        )
+    neighbour = siblings.values_list("sort_key", flat=True).first()
+    return sort_key_between(sort_key, neighbour) if after else sort_key_between(neighbour, sort_key)
+
+
+def _sort_key_beside(chapter_id: str, block_id: str, *, after: bool) -> int:
+    key = _key_beside(chapter_id, block_id, after=after)
+    if key is None:
+        renumber_chapter_blocks(chapter_id)
+        key = _key_beside(chapter_id, block_id, after=after)
+    return int(key)  # type: ignore[arg-type]
+
+
+def sort_key_after(chapter_id: str, block_id: str) -> int:
+    """Return a key placing a new block right after ``block_id``, renumbering if needed."""
+    return _sort_key_beside(chapter_id, block_id, after=True)
+
+
+def sort_key_before(chapter_id: str, block_id: str) -> int:
+    """Return a key placing a new block right before ``block_id``, renumbering if needed."""
+    return _sort_key_beside(chapter_id, block_id, after=False)
+
+
+def append_sort_key(chapter_id: str) -> int:
+    current_max = ChapterBlock.objects.filter(chapter_id=chapter_id).aggregate(Max("sort_key"))[
+        "sort_key__max"
+    ]
+    return sort_key_between(current_max, None)  # type: ignore[return-value]
+
+
+def renumber_chapter_blocks(chapter_id: str) -> None:
+    """Respace every block of the chapter ``SORT_KEY_GAP`` apart, keeping their order."""
+    ordered_ids = list(ordered_chapter_blocks(chapter_id).values_list("id", flat=True))
+    _write_sort_keys({block_id: index * SORT_KEY_GAP for index, block_id in enumerate(ordered_ids)})
+
+
+def _write_sort_keys(keys: Dict[str, int]) -> None:
+    if keys:
+        ChapterBlock.objects.bulk_update(
+            [ChapterBlock(pk=block_id, sort_key=key) for block_id, key in keys.items()],
+            ["sort_key"],
+            batch_size=500,
+        )
+
+
+def _longest_increasing_run(keys: Sequence[Optional[int]]) -> set[int]:
+    """Return the indexes of a longest strictly increasing subsequence of ``keys``."""
+    tails: List[int] = []
+    tail_indexes: List[int] = []
+    parents: List[int] = [-1] * len(keys)
+    for index, key in enumerate(keys):
+        if key is None:
+            continue
+        slot = bisect_left(tails, key)
+        if slot == len(tails):
+            tails.append(key)
+            tail_indexes.append(index)
+        else:
+            tails[slot] = key
+            tail_indexes[slot] = index
+        parents[index] = tail_indexes[slot - 1] if slot else -1
+
+    kept: set[int] = set()
+    cursor = tail_indexes[-1] if tail_indexes else -1
+    while cursor != -1:
+        kept.add(cursor)
+        cursor = parents[cursor]
+    return kept
+
+
+def plan_sort_keys(keys: Sequence[Optional[int]]) -> Optional[List[int]]:
+    """Return keys for blocks in their final order, reusing as many current keys as possible.
+
+    ``keys`` holds the current key of each block (``None`` for new ones). Returns ``None``
+    when the untouched keys leave no room for the moved blocks.
+    """
+    kept = _longest_increasing_run(keys)
+    planned: List[int] = []
+    index = 0
+    total = len(keys)
+    previous: Optional[int] = None
+    while index < total:
+        if index in kept:
+            previous = int(keys[index])  # type: ignore[arg-type]
+            planned.append(previous)
+            index += 1
+            continue
+        end = index
+        while end < total and end not in kept:
+            end += 1
+        following = int(keys[end]) if end < total else None  # type: ignore[arg-type]
+        count = end - index
+        if previous is None and following is None:
+            start, step = 0, SORT_KEY_GAP
+        elif previous is None:
+            start, step = following - count * SORT_KEY_GAP, SORT_KEY_GAP  # type: ignore[operator]
+        elif following is None:
+            start, step = previous + SORT_KEY_GAP, SORT_KEY_GAP
+        else:
+            step = (following - previous) // (count + 1)
+            if step < 1:
+                return None
+            start = previous + step
+        planned.extend(start + offset * step for offset in range(count))
+        index = end
+    return planned
+
+
+def apply_block_order(chapter_id: str, ordered_ids: List[str]) -> None:
+    """Persist ``ordered_ids`` as the chapter order, writing only blocks that must move."""
+    current = dict(ordered_chapter_blocks(chapter_id).values_list("id", "sort_key"))
+    planned = plan_sort_keys([current.get(block_id) for block_id in ordered_ids])
+    if planned is None:
+        planned = [index * SORT_KEY_GAP for index in range(len(ordered_ids))]
+    _write_sort_keys(
+        {
+            block_id: key
+            for block_id, key in zip(ordered_ids, planned, strict=True)
+            if current.get(block_id) != key
+        }
+    )
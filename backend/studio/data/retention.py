@@ -0,0 +1,227 @@
+"""Retention policies for chapter block versions.
+
+A version survives pruning when any enabled rule keeps it:
+
+* ``keep_last``: the N highest version numbers of the block.
+* ``daily_checkpoint_days``: the last version created on each day of the past N days.
+* ``keep_activated_days``: versions activated within the past N days.
+
+The active version is always kept. Blocks whose highest version number passes
+``compact_above`` are renumbered from 1 afterwards so edits stay clear of the 999 cap.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple, TypedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from ..models import ChapterBlock, ChapterBlockVersion
+from .chapters import bump_chapter_revision
+from .versions import detach_version_dependents
+
+__all__ = [
+    "DEFAULT_VERSION_RETENTION",
+    "VersionRetentionPolicy",
+    "VersionPruneResult",
+    "iter_prunable_block_batches",
+    "prune_block_versions",
+    "resolve_retention_policy",
+    "select_prunable_versions",
+]
+
+
+class VersionRetentionPolicy(TypedDict):
+    keep_last: Optional[int]
+    daily_checkpoint_days: Optional[int]
+    keep_activated_days: Optional[int]
+    compact_above: Optional[int]
+
+
+class VersionPruneResult(TypedDict):
+    blocks: int
+    deletedVersions: int
+    compactedBlocks: int
+    lastBlockId: Optional[str]
+
+
+DEFAULT_VERSION_RETENTION: VersionRetentionPolicy = {
+    "keep_last": 50,
+    "daily_checkpoint_days": 30,
+    "keep_activated_days": 30,
+    "compact_above": 900,
+}
+
+
+def resolve_retention_policy(
+    overrides: Optional[Mapping[str, Any]] = None,
+) -> VersionRetentionPolicy:
+    """Merge ``STUDIO_BLOCK_VERSION_RETENTION`` and ``overrides`` over the defaults."""
+    policy: Dict[str, Any] = dict(DEFAULT_VERSION_RETENTION)
+    policy.update(getattr(settings, "STUDIO_BLOCK_VERSION_RETENTION", {}) or {})
+    policy.update({key: value for key, value in (overrides or {}).items() if value is not None})
+    unknown = set(policy) - set(DEFAULT_VERSION_RETENTION)
+    if unknown:
+        raise ValueError(f"Unknown retention settings: {', '.join(sorted(unknown))}")
+    for key, value in policy.items():
+        if value is not None and int(value) < 0:
+            raise ValueError(f"Retention setting '{key}' cannot be negative.")
+    return policy  # type: ignore[return-value]
+
+
+def select_prunable_versions(
+    versions: Iterable[ChapterBlockVersion],
+    policy: VersionRetentionPolicy,
+    *,
+    now: datetime,
+) -> List[int]:
+    """Return the version numbers of a single block that no retention rule keeps."""
+    ordered = sorted(versions, key=lambda item: item.version)
+    kept: Set[int] = {int(item.version) for item in ordered if item.is_active}
+
+    keep_last = policy["keep_last"]
+    if keep_last:
+        kept.update(int(item.version) for item in ordered[-keep_last:])
+
+    checkpoint_days = policy["daily_checkpoint_days"]
+    if checkpoint_days:
+        since = now - timedelta(days=checkpoint_days)
+        checkpoints: Dict[Any, int] = {}
+        for item in ordered:
+            if item.created_at >= since:
+                checkpoints[timezone.localdate(item.created_at)] = int(item.version)
+        kept.update(checkpoints.values())
+
+    activated_days = policy["keep_activated_days"]
+    if activated_days:
+        since = now - timedelta(days=activated_days)
+        kept.update(
+            int(item.version)
+            for item in ordered
+            if item.activated_at is not None and item.activated_at >= since
+        )
+
+    return [int(item.version) for item in ordered if int(item.version) not in kept]
+
+
+def _compact_version_numbers(block: ChapterBlock, versions: List[ChapterBlockVersion]) -> None:
+    """Renumber ``versions`` as 1..N, keeping their order and delta base references."""
+    mapping = {int(item.version): index for index, item in enumerate(versions, start=1)}
+    # Ascending order never collides: every new number is at most the old one.
+    for item in versions:
+        new_number = mapping[int(item.version)]
+        delta = item.delta
+        if delta is not None:
+            delta = {**delta, "base": mapping[int(delta["base"])]}
+        if new_number != item.version or delta != item.delta:
+            ChapterBlockVersion.objects.filter(pk=item.pk).update(version=new_number, delta=delta)
+    block.active_version_number = mapping.get(
+        int(block.active_version_number), block.active_version_number
+    )
+
+
+def _prune_block(
+    block: ChapterBlock,
+    policy: VersionRetentionPolicy,
+    *,
+    now: datetime,
+    dry_run: bool,
+) -> Tuple[int, bool]:
+    versions = list(
+        ChapterBlockVersion.objects.filter(block=block)
+        .order_by("version")
+        .only("id", "block_id", "version", "is_active", "created_at", "activated_at", "delta")
+    )
+    prunable = select_prunable_versions(versions, policy, now=now)
+    compact_above = policy["compact_above"]
+    remaining = [item for item in versions if int(item.version) not in set(prunable)]
+    needs_compaction = (
+        compact_above is not None and bool(remaining) and int(remaining[-1].version) > compact_above
+    )
+    if dry_run or not (prunable or needs_compaction):
+        return len(prunable), needs_compaction
+
+    if prunable:
+        detach_version_dependents(block.id, prunable)
+        ChapterBlockVersion.objects.filter(block=block, version__in=prunable).delete()
+        # Deltas turned into keyframes must not be renumbered with stale base numbers.
+        remaining = list(
+            ChapterBlockVersion.objects.filter(block=block)
+            .order_by("version")
+            .only("id", "version", "delta")
+        )
+    if needs_compaction:
+        _compact_version_numbers(block, remaining)
+
+    block.version_count = len(remaining)
+    block.revision = F("revision") + 1
+    block.save(update_fields=["version_count", "active_version_number", "revision", "updated_at"])
+    return len(prunable), needs_compaction
+
+
+def iter_prunable_block_batches(
+    policy: VersionRetentionPolicy,
+    *,
+    batch_size: int,
+    after: Optional[str] = None,
+) -> Iterator[List[str]]:
+    """Yield block identifiers in ``id`` order, skipping blocks no rule can prune."""
+    queryset = ChapterBlock.objects.order_by("id")
+    if policy["keep_last"]:
+        filters = Q(version_count__gt=policy["keep_last"])
+        if policy["compact_above"] is not None:
+            filters |= Exists(
+                ChapterBlockVersion.objects.filter(
+                    block=OuterRef("pk"),
+                    version__gt=policy["compact_above"],
+                )
+            )
+        queryset = queryset.filter(filters)
+    cursor = after
+    while True:
+        page = queryset.filter(id__gt=cursor) if cursor is not None else queryset
+        block_ids = list(page.values_list("id", flat=True)[:batch_size])
+        if not block_ids:
+            return
+        yield block_ids
+        cursor = block_ids[-1]
+
+
+def prune_block_versions(
+    block_ids: Iterable[str],
+    policy: VersionRetentionPolicy,
+    *,
+    now: Optional[datetime] = None,
+    dry_run: bool = False,
+) -> VersionPruneResult:
+    """Apply ``policy`` to a batch of blocks inside one transaction.
+
+    Blocks are locked while pruning, so concurrent edits wait for the batch to finish.
+    Chapters whose blocks changed get a single revision bump, since block payloads
+    report ``versionCount`` and ``activeVersion``.
+    """
+    now = now or timezone.now()
+    result: VersionPruneResult = {
+        "blocks": 0,
+        "deletedVersions": 0,
+        "compactedBlocks": 0,
+        "lastBlockId": None,
+    }
+    changed_chapter_ids: Set[str] = set()
+    with transaction.atomic():
+        blocks = ChapterBlock.objects.select_for_update().filter(pk__in=list(block_ids))
+        for block in blocks.order_by("id"):
+            deleted, compacted = _prune_block(block, policy, now=now, dry_run=dry_run)
+            result["blocks"] += 1
+            result["deletedVersions"] += deleted
+            result["compactedBlocks"] += int(compacted)
+            result["lastBlockId"] = block.id
+            if (deleted or compacted) and not dry_run:
+                changed_chapter_ids.add(block.chapter_id)
+        for chapter_id in sorted(changed_chapter_ids):
+            bump_chapter_revision(chapter_id)
+    return result
@@ -0,0 +1,248 @@
+"""Storage of block version payloads as keyframes or deltas.
+
+With ``STUDIO_BLOCK_VERSION_STORAGE = "delta"`` a new version stores only the changes
+against the latest existing version of its block: long string fields are kept as text
+diffs and every other changed key is stored whole. A full keyframe is written whenever
+the delta chain would reach ``STUDIO_BLOCK_VERSION_KEYFRAME_INTERVAL`` versions, so
+rebuilding any payload reads a bounded number of rows. ``"full"`` keeps the previous
+behaviour of one complete payload per version.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from ..models import ChapterBlockVersion
+from ..payloads import render_block_text
+from ..tokens import estimate_tokens
+
+__all__ = [
+    "VERSION_STORAGE_DELTA",
+    "VERSION_STORAGE_FULL",
+    "activate_version",
+    "apply_text_delta",
+    "build_text_delta",
+    "deactivate_versions",
+    "detach_version_dependents",
+    "keyframe_interval",
+    "stored_version_fields",
+    "uses_delta_storage",
+    "version_payload",
+    "version_payloads",
+]
+
+VERSION_STORAGE_FULL = "full"
+VERSION_STORAGE_DELTA = "delta"
+
+# Strings shorter than this are cheaper to store whole than as a diff.
+_MIN_TEXT_DELTA_LENGTH = 64
+_TOKEN_PATTERN = re.compile(r"\s+|\S+")
+
+TextDelta = List[Any]
+
+
+def uses_delta_storage() -> bool:
+    mode = getattr(settings, "STUDIO_BLOCK_VERSION_STORAGE", VERSION_STORAGE_FULL)
+    return mode == VERSION_STORAGE_DELTA
+
+
+def keyframe_interval() -> int:
+    return max(1, int(getattr(settings, "STUDIO_BLOCK_VERSION_KEYFRAME_INTERVAL", 16)))
+
+
+def build_text_delta(source: str, target: str) -> TextDelta:
+    """Encode ``target`` as ``[start, end]`` copies from ``source`` and inserted strings."""
+    source_tokens = _TOKEN_PATTERN.findall(source)
+    target_tokens = _TOKEN_PATTERN.findall(target)
+    offsets = [0]
+    for token in source_tokens:
+        offsets.append(offsets[-1] + len(token))
+
+    ops: TextDelta = []
+    matcher = SequenceMatcher(None, source_tokens, target_tokens, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([offsets[i1], offsets[i2]])
+        elif tag in {"replace", "insert"}:
+            inserted = "".join(target_tokens[j1:j2])
+            if ops and isinstance(ops[-1], str):
+                ops[-1] += inserted
+            else:
+                ops.append(inserted)
+    return ops
+
+
+def apply_text_delta(source: str, ops: Sequence[Any]) -> str:
+    return "".join(op if isinstance(op, str) else source[op[0] : op[1]] for op in ops)
+
+
+def _encoded_size(value: Any) -> int:
+    return len(json.dumps(value, ensure_ascii=False, cls=DjangoJSONEncoder))
+
+
+def _payload_delta(base: Dict[str, Any], target: Dict[str, Any], base_version: int) -> Dict:
+    changed: Dict[str, Any] = {}
+    text: Dict[str, TextDelta] = {}
+    for key, value in target.items():
+        previous = base.get(key)
+        if key in base and previous == value:
+            continue
+        if (
+            isinstance(previous, str)
+            and isinstance(value, str)
+            and len(value) >= _MIN_TEXT_DELTA_LENGTH
+        ):
+            ops = build_text_delta(previous, value)
+            if _encoded_size(ops) < _encoded_size(value):
+                text[key] = ops
+                continue
+        changed[key] = value
+    return {
+        "base": base_version,
+        "set": changed,
+        "unset": [key for key in base if key not in target],
+        "text": text,
+    }
+
+
+def _apply_payload_delta(base: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    payload = {key: value for key, value in base.items() if key not in set(delta["unset"])}
+    for key, ops in delta["text"].items():
+        payload[key] = apply_text_delta(str(base.get(key) or ""), ops)
+    payload.update(delta["set"])
+    return payload
+
+
+def _chain_payload(
+    version: ChapterBlockVersion,
+    known: Dict[int, Dict[str, Any]],
+) -> Dict[str, Any]:
+    if version.delta is None:
+        return dict(version.payload or {})
+    base = known.get(int(version.delta["base"]))
+    if base is None:
+        raise ValueError(
+            f"Missing base version {version.delta['base']} for {version.block_id}:v{version.version}"
+        )
+    return _apply_payload_delta(base, version.delta)
+
+
+def _load_chain(block_id: str, version_number: int) -> List[ChapterBlockVersion]:
+    """Return the rows needed to rebuild ``version_number``, oldest first."""
+    queryset = (
+        ChapterBlockVersion.objects.filter(block_id=block_id, version__lte=version_number)
+        .order_by("-version")
+        .only("id", "block_id", "version", "payload", "delta")
+    )
+    # Chains never outgrow the keyframe interval unless it was lowered afterwards.
+    for rows in (queryset[: keyframe_interval()], queryset):
+        chain: List[ChapterBlockVersion] = []
+        for row in rows:
+            chain.append(row)
+            if row.delta is None:
+                return chain[::-1]
+    return chain[::-1]
+
+
+def version_payload(version: ChapterBlockVersion) -> Dict[str, Any]:
+    """Return the full payload of ``version``, rebuilding it from its delta chain."""
+    if version.delta is None:
+        return dict(version.payload or {})
+    known: Dict[int, Dict[str, Any]] = {}
+    for row in _load_chain(version.block_id, int(version.version)):
+        known[int(row.version)] = _chain_payload(row, known)
+    return known[int(version.version)]
+
+
+def version_payloads(versions: Iterable[ChapterBlockVersion]) -> Dict[int, Dict[str, Any]]:
+    """Rebuild the payloads of a block's versions, mapping version number to payload.
+
+    ``versions`` must include every version of the block from the first keyframe on, as
+    when listing the full history; each delta is applied once, in version order.
+    """
+    known: Dict[int, Dict[str, Any]] = {}
+    for version in sorted(versions, key=lambda item: item.version):
+        known[int(version.version)] = _chain_payload(version, known)
+    return known
+
+
+def stored_version_fields(
+    block_id: str,
+    payload: Dict[str, Any],
+    *,
+    latest: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Return the ``payload``/``delta`` columns for a new version following ``latest``."""
+    if latest is None or not uses_delta_storage():
+        return {"payload": payload, "delta": None}
+
+    chain = _load_chain(block_id, int(latest))
+    if len(chain) >= keyframe_interval():
+        return {"payload": payload, "delta": None}
+
+    known: Dict[int, Dict[str, Any]] = {}
+    for row in chain:
+        known[int(row.version)] = _chain_payload(row, known)
+    return {"payload": {}, "delta": _payload_delta(known[int(latest)], payload, int(latest))}
+
+
+def deactivate_versions(queryset: QuerySet[ChapterBlockVersion]) -> None:
+    """Mark versions inactive; with delta storage their rendered text is dropped too."""
+    fields: Dict[str, Any] = {"is_active": False}
+    if uses_delta_storage():
+        # Only the active version's rendering is read; it is rebuilt on activation.
+        fields["rendered_text"] = ""
+    queryset.update(**fields)
+
+
+def activate_version(
+    version: ChapterBlockVersion,
+    block_type: str,
+    payload: Dict[str, Any],
+) -> None:
+    """Mark ``version`` active, restoring its rendered text when it was dropped."""
+    update_fields = []
+    if not version.is_active:
+        version.is_active = True
+        version.activated_at = timezone.now()
+        update_fields.extend(["is_active", "activated_at"])
+    rendered_text = render_block_text(block_type, payload)
+    if version.rendered_text != rendered_text:
+        version.rendered_text = rendered_text
+        update_fields.append("rendered_text")
+        token_count = estimate_tokens(rendered_text)
+        if version.token_count != token_count:
+            version.token_count = token_count
+            update_fields.append("token_count")
+    if update_fields:
+        version.save(update_fields=[*update_fields, "updated_at"])
+
+
+def detach_version_dependents(block_id: str, removed_numbers: Iterable[int]) -> None:
+    """Turn deltas based on versions about to be removed into keyframes."""
+    removed = {int(number) for number in removed_numbers}
+    if not removed:
+        return
+    versions = list(ChapterBlockVersion.objects.filter(block_id=block_id).order_by("version"))
+    dependents = [
+        version
+        for version in versions
+        if version.delta is not None
+        and version.version not in removed
+        and int(version.delta["base"]) in removed
+    ]
+    if not dependents:
+        return
+    payloads = version_payloads(versions)
+    for version in dependents:
+        version.payload = payloads[int(version.version)]
+        version.delta = None
+    ChapterBlockVersion.objects.bulk_update(dependents, ["payload", "delta"])
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import io
+import timeit
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from studio.payloads import chapter_detail_from_blocks
+from studio.renderers import FAST_JSON_AVAILABLE, FastJSONParser, FastJSONRenderer
+from studio.representations import represent_chapter_detail
+
+
+def _synthetic_blocks(count: int) -> List[Dict[str, Any]]:
+    blocks: List[Dict[str, Any]] = []
+    for index in range(count):
+        kind = index % 4
+        block: Dict[str, Any] = {"id": f"blk-{index:06d}", "position": index}
+        if kind == 0:
+            block.update(
+                type="dialogue",
+                turns=[
+                    {
+                        "id": f"blk-{index:06d}-t{turn}",
+                        "speakerName": "Aliosha" if turn % 2 else "Iván",
+                        "utterance": "¿Y si Dios no existe? — preguntó, casi en un susurro.",
+                    }
+                    for turn in range(3)
+                ],
+            )
+        elif kind == 3 and index % 40 == 3:
+            block.update(type="scene_boundary", label="Cambio de escena", mood="tenso")
+        else:
+            block.update(
+                type="paragraph",
+                style="narration",
+                text=(
+                    "Alexéi Fiódorovich Karamázov era el tercer hijo de un terrateniente "
+                    "de nuestro distrito, Fiódor Pávlovich Karamázov, tan conocido en su "
+                    "tiempo (y aún hoy recordado) por su muerte trágica y oscura. "
+                )
+                * 2,
+            )
+        block["activeVersion"] = 1
+        block["versionCount"] = 1
+        blocks.append(block)
+    return blocks
+
+
+class Command(BaseCommand):
+    help = "Compare the stdlib and orjson JSON backends on a large synthetic chapter."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--blocks", type=int, default=5000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        if not FAST_JSON_AVAILABLE:
+            raise CommandError("orjson is not installed; the fast backend is disabled.")
+
+        block_count = options["blocks"]
+        repeat = options["repeat"]
+        detail = chapter_detail_from_blocks(
+            chapter_id="benchmark",
+            title="Capítulo sintético",
+            summary=None,
+            ordinal=0,
+            tokens=None,
+            word_count=None,
+            blocks=_synthetic_blocks(block_count),
+            book_id="benchmark-book",
+            book_title="Libro sintético",
+            revision=1,
+        )
+        data = represent_chapter_detail(detail)
+        data["generatedAt"] = datetime.now(timezone.utc)
+
+        stock_renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+        stock_body = stock_renderer.render(data)
+        fast_body = fast_renderer.render(data)
+        if stock_body != fast_body:
+            raise CommandError("The fast renderer output differs from JSONRenderer.")
+
+        def parse(parser) -> Any:
+            return parser.parse(io.BytesIO(stock_body), parser_context={"encoding": "utf-8"})
+
+        if parse(JSONParser()) != parse(FastJSONParser()):
+            raise CommandError("The fast parser output differs from JSONParser.")
+
+        self.stdout.write(
+            f"{block_count} blocks, {len(stock_body) / 1024:.0f} KiB, best of {repeat} runs"
+        )
+        cases = [
+            ("render", lambda: stock_renderer.render(data), lambda: fast_renderer.render(data)),
+            ("parse", lambda: parse(JSONParser()), lambda: parse(FastJSONParser())),
+        ]
+        for label, stock, fast in cases:
+            stock_time = min(timeit.repeat(stock, number=1, repeat=repeat))
+            fast_time = min(timeit.repeat(fast, number=1, repeat=repeat))
+            self.stdout.write(
+                f"{label:<7} stdlib {stock_time * 1000:8.2f} ms   "
+                f"orjson {fast_time * 1000:8.2f} ms   x{stock_time / fast_time:.1f}"
+            )
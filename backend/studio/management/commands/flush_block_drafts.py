@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from studio.data.blocks import flush_chapter_block_drafts
+
+
+class Command(BaseCommand):
+    help = (
+        "Write autosaved block changes older than STUDIO_BLOCK_AUTOSAVE_WINDOW as block "
+        "versions. Meant to run periodically so idle drafts do not wait for the next edit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chapter", default=None, help="Only flush drafts of this chapter.")
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Also flush drafts still inside the autosave window.",
+        )
+
+    def handle(self, *args, **options):
+        flushed = flush_chapter_block_drafts(options["chapter"], due_only=not options["all"])
+        self.stdout.write(f"Flushed {len(flushed)} block drafts.")
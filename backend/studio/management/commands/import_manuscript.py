@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from studio.data.importer import (
+    DEFAULT_IMPORT_BATCH_SIZE,
+    MANUSCRIPT_FORMATS,
+    guess_manuscript_format,
+    import_manuscript,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a Markdown or plain-text manuscript into a book, splitting chapters, scene "
+        "breaks and dialogue. The file is streamed and rows are bulk inserted in one "
+        "transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("book_id")
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format",
+            choices=MANUSCRIPT_FORMATS,
+            default=None,
+            help="Defaults to markdown for .md/.markdown files and text otherwise.",
+        )
+        parser.add_argument(
+            "--title", default="Sin título", help="Title of a headless first chapter."
+        )
+        parser.add_argument("--encoding", default="utf-8-sig")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.is_file():
+            raise CommandError(f"No such file: {path}")
+        manuscript_format = options["format"] or guess_manuscript_format(path.name)
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        try:
+            with path.open(encoding=options["encoding"]) as handle:
+                result = import_manuscript(
+                    options["book_id"],
+                    handle,
+                    markdown=manuscript_format == "markdown",
+                    default_title=options["title"],
+                    batch_size=options["batch_size"],
+                )
+        except KeyError as exc:
+            raise CommandError(f"Unknown book: {options['book_id']}") from exc
+        except UnicodeDecodeError as exc:
+            raise CommandError(str(exc)) from exc
+
+        self.stdout.write(
+            f"Imported {len(result['chapters'])} chapters, {result['blockCount']} blocks and "
+            f"{result['wordCount']} words into {result['bookId']}."
+        )
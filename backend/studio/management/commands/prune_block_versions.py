@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from studio.data.retention import (
+    iter_prunable_block_batches,
+    prune_block_versions,
+    resolve_retention_policy,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Prune chapter block versions according to STUDIO_BLOCK_VERSION_RETENTION. "
+        "Blocks are processed in id order, one transaction per batch; use --after to resume."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keep-last", type=int, dest="keep_last")
+        parser.add_argument("--daily-checkpoint-days", type=int, dest="daily_checkpoint_days")
+        parser.add_argument("--keep-activated-days", type=int, dest="keep_activated_days")
+        parser.add_argument("--compact-above", type=int, dest="compact_above")
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument("--max-batches", type=int, default=None)
+        parser.add_argument("--after", default=None, help="Resume after this block id.")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        try:
+            policy = resolve_retention_policy(
+                {
+                    key: options[key]
+                    for key in (
+                        "keep_last",
+                        "daily_checkpoint_days",
+                        "keep_activated_days",
+                        "compact_above",
+                    )
+                }
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        totals = {"blocks": 0, "deletedVersions": 0, "compactedBlocks": 0}
+        last_block_id = None
+        batches = iter_prunable_block_batches(
+            policy,
+            batch_size=options["batch_size"],
+            after=options["after"],
+        )
+        for index, block_ids in enumerate(batches, start=1):
+            result = prune_block_versions(block_ids, policy, dry_run=options["dry_run"])
+            for key in totals:
+                totals[key] += result[key]
+            last_block_id = result["lastBlockId"] or block_ids[-1]
+            if options["max_batches"] is not None and index >= options["max_batches"]:
+                self.stdout.write(
+                    f"Stopped after {index} batches; resume with --after {last_block_id}"
+                )
+                break
+
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(
+            f"{verb} {totals['deletedVersions']} versions across {totals['blocks']} blocks "
+            f"({totals['compactedBlocks']} renumbered)."
+        )
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from studio.data.chapters import recount_token_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-estimate block version, chapter and book token counts with the tokenizer "
+        "configured in STUDIO_TOKENIZER. Run it after switching tokenizer backends."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--book", default=None, help="Only recount this book.")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        changed = recount_token_counters(options["book"], batch_size=options["batch_size"])
+        self.stdout.write(f"Updated token totals of {changed} chapters.")
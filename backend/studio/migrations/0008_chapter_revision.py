@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("studio", "0007_chapterblockconversion"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chapter",
+            name="revision",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
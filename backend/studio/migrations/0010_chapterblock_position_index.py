@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("studio", "0009_chaptersnapshot"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="chapterblock",
+            index=models.Index(fields=["chapter", "position"], name="chapterblock_chapter_pos"),
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:42
+
+from django.db import migrations, models
+
+
+def render_block_text(block_type, payload):
+    """Frozen copy of ``studio.payloads.render_block_text`` as of this migration."""
+    if block_type == "paragraph":
+        return payload.get("text", "") or ""
+
+    if block_type == "dialogue":
+        lines = []
+        for turn in payload.get("turns", []) or []:
+            utterance = turn.get("utterance", "").strip()
+            if not utterance:
+                continue
+            attachment = turn.get("stageDirection")
+            if attachment:
+                lines.append(f"{utterance} {attachment}".strip())
+            else:
+                lines.append(utterance)
+        return "\n".join(lines)
+
+    if block_type == "scene_boundary":
+        pieces = [piece for piece in [payload.get("label"), payload.get("summary")] if piece]
+        return "[Escena] " + " — ".join(pieces) if pieces else ""
+
+    if block_type == "metadata":
+        kind = payload.get("kind")
+        if kind == "chapter_header":
+            lines = [
+                element
+                for element in [
+                    payload.get("title"),
+                    payload.get("subtitle"),
+                    payload.get("epigraph"),
+                ]
+                if element
+            ]
+            if lines:
+                return "\n".join(lines)
+        if kind == "context":
+            pieces = [
+                piece
+                for piece in [
+                    payload.get("povCharacterName"),
+                    payload.get("locationName"),
+                    payload.get("timelineMarker"),
+                ]
+                if piece
+            ]
+            if pieces:
+                return "[Contexto] " + " — ".join(pieces)
+    return ""
+
+
+def count_words(text):
+    return len(text.split())
+
+
+def backfill_rendered_text(apps, schema_editor):
+    chapter_block_version_model = apps.get_model("studio", "ChapterBlockVersion")
+
+    versions = chapter_block_version_model.objects.select_related("block")
+    for version in versions.iterator():
+        text = render_block_text(version.block.type, dict(version.payload or {}))
+        version.rendered_text = text
+        version.word_count = count_words(text)
+        version.save(update_fields=["rendered_text", "word_count"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("studio", "0010_chapterblock_position_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chapterblockversion",
+            name="rendered_text",
+            field=models.TextField(blank=True, default=""),
+        ),
+        migrations.AddField(
+            model_name="chapterblockversion",
+            name="word_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rendered_text, migrations.RunPython.noop),
+    ]
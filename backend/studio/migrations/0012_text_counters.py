@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:43
+
+from django.db import migrations, models
+
+
+def estimate_tokens(text):
+    # Frozen copy of the estimator these counters were written with; 0020 re-estimates.
+    return (len(text) + 3) // 4
+
+
+def recount_text_counters(apps, schema_editor):
+    book_model = apps.get_model("studio", "Book")
+    chapter_model = apps.get_model("studio", "Chapter")
+    chapter_block_model = apps.get_model("studio", "ChapterBlock")
+
+    # One-off recount; from here on block mutations maintain the totals with deltas. Like
+    # those deltas (and 0020), only active versions count.
+    for book in book_model.objects.all():
+        book_words = 0
+        book_tokens = 0
+        for chapter in chapter_model.objects.filter(book=book):
+            words = 0
+            tokens = 0
+            versions = chapter_block_model.objects.filter(
+                chapter=chapter, active_version__isnull=False
+            ).values_list("active_version__rendered_text", "active_version__word_count")
+            for text, word_count in versions:
+                words += word_count
+                tokens += estimate_tokens(text)
+            chapter.word_count = words
+            chapter.tokens = tokens
+            chapter.save(update_fields=["word_count", "tokens"])
+            book_words += words
+            book_tokens += tokens
+        book.word_count = book_words
+        book.tokens = book_tokens
+        book.save(update_fields=["word_count", "tokens"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("studio", "0011_chapterblockversion_rendered_text"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="tokens",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="word_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(recount_text_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:58
+
+from django.db import migrations, models
+
+SORT_KEY_GAP = 1 << 16
+
+
+def backfill_sort_keys(apps, schema_editor):
+    chapter_block_model = apps.get_model("studio", "ChapterBlock")
+    chapter_snapshot_model = apps.get_model("studio", "ChapterSnapshot")
+
+    blocks = chapter_block_model.objects.order_by("chapter_id", "position", "id").only(
+        "id", "chapter_id"
+    )
+    updated = []
+    current_chapter = None
+    index = 0
+    for block in blocks.iterator(chunk_size=500):
+        if block.chapter_id != current_chapter:
+            current_chapter = block.chapter_id
+            index = 0
+        block.sort_key = index * SORT_KEY_GAP
+        updated.append(block)
+        index += 1
+    chapter_block_model.objects.bulk_update(updated, ["sort_key"], batch_size=500)
+
+    # Snapshots embed the old stored positions; they are rebuilt on the next read.
+    chapter_snapshot_model.objects.all().delete()
+
+
+def restore_positions(apps, schema_editor):
+    chapter_block_model = apps.get_model("studio", "ChapterBlock")
+    chapter_snapshot_model = apps.get_model("studio", "ChapterSnapshot")
+
+    blocks = chapter_block_model.objects.order_by("chapter_id", "sort_key", "id").only(
+        "id", "chapter_id"
+    )
+    updated = []
+    current_chapter = None
+    index = 0
+    for block in blocks.iterator(chunk_size=500):
+        if block.chapter_id != current_chapter:
+            current_chapter = block.chapter_id
+            index = 0
+        block.position = index
+        updated.append(block)
+        index += 1
+    chapter_block_model.objects.bulk_update(updated, ["position"], batch_size=500)
+
+    chapter_snapshot_model.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("studio", "0012_text_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chapterblock",
+            name="sort_key",
+            field=models.BigIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_sort_keys, restore_positions),
+        migrations.AlterModelOptions(
+            name="chapterblock",
+            options={"ordering": ["chapter", "sort_key", "id"]},
+        ),
+        migrations.RemoveIndex(
+            model_name="chapterblock",
+            name="chapterblock_chapter_pos",
+        ),
+        # Re-added with a default when reversed; restore_positions then fills it in.
+        migrations.AlterField(
+            model_name="chapterblock",
+            name="position",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RemoveField(
+            model_name="chapterblock",
+            name="position",
+        ),
+        migrations.AddIndex(
+            model_name="chapterblock",
+            index=models.Index(fields=["chapter", "sort_key"], name="chapterblock_chapter_sort"),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:54
+
+from django.db import migrations, models
+
+from studio.payloads import payload_content_hash
+
+
+def backfill_content_hash(apps, schema_editor):
+    chapter_block_version_model = apps.get_model("studio", "ChapterBlockVersion")
+
+    versions = chapter_block_version_model.objects.only("id", "payload")
+    for version in versions.iterator():
+        version.content_hash = payload_content_hash(dict(version.payload or {}))
+        version.save(update_fields=["content_hash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("studio", "0013_chapterblock_sort_key"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chapterblockversion",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+        migrations.RunPython(backfill_content_hash, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="chapterblockversion",
+            index=models.Index(fields=["block", "content_hash"], name="blockversion_block_hash"),
+        ),
+    ]
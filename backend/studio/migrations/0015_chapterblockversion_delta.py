@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:56
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("studio", "0014_chapterblockversion_content_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chapterblockversion",
+            name="delta",
+            field=models.JSONField(
+                blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:41
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_activated_at(apps, schema_editor):
+    chapter_block_version_model = apps.get_model("studio", "ChapterBlockVersion")
+
+    # Only the active versions are known to have been used; the rest stay unset.
+    chapter_block_version_model.objects.filter(is_active=True).update(activated_at=F("updated_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("studio", "0015_chapterblockversion_delta"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chapterblockversion",
+            name="activated_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_activated_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="chapterblockversion",
+            name="activated_at",
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, null=True),
+        ),
+    ]
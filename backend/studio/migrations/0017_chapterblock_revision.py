@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:59
+
+from django.db import migrations, models
+
+
+def clear_chapter_snapshots(apps, schema_editor):
+    # Snapshots predate the per-block revision; they are rebuilt on the next read.
+    apps.get_model("studio", "ChapterSnapshot").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("studio", "0016_chapterblockversion_activated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chapterblock",
+            name="revision",
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.RunPython(clear_chapter_snapshots, migrations.RunPython.noop),
+    ]
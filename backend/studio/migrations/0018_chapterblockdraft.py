@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:03
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("studio", "0017_chapterblock_revision"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChapterBlockDraft",
+            fields=[
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "block",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="draft",
+                        serialize=False,
+                        to="studio.chapterblock",
+                    ),
+                ),
+                (
+                    "changes",
+                    models.JSONField(
+                        default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder
+                    ),
+                ),
+                (
+                    "chapter",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="block_drafts",
+                        to="studio.chapter",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["chapter", "created_at"], name="blockdraft_chapter_created"
+                    ),
+                    models.Index(fields=["created_at"], name="blockdraft_created"),
+                ],
+            },
+        ),
+    ]
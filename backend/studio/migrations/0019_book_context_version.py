@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("studio", "0018_chapterblockdraft"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="context_version",
+            field=models.CharField(blank=True, default="", max_length=32),
+        ),
+    ]
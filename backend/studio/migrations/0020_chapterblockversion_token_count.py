@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:31
+
+import re
+
+from django.db import migrations, models
+
+_PIECES = re.compile(r"[^\W\d_]+|\d+|[^\w\s]|_")
+
+
+def estimate_tokens(text):
+    """Frozen copy of ``studio.tokens.heuristic_token_count``.
+
+    Migrations must not depend on ``STUDIO_TOKENIZER``; run ``manage.py recount_tokens``
+    afterwards when another backend is configured.
+    """
+    tokens = 0
+    for match in _PIECES.finditer(text):
+        piece = match.group()
+        if piece[0].isalpha():
+            weight = len(piece) + sum(1 for char in piece if ord(char) > 127)
+            tokens += (weight + 3) // 4
+        elif piece[0].isdigit():
+            tokens += (len(piece) + 2) // 3
+        else:
+            tokens += 1
+    return tokens
+
+
+def backfill_token_counts(apps, schema_editor):
+    book_model = apps.get_model("studio", "Book")
+    chapter_model = apps.get_model("studio", "Chapter")
+    chapter_block_model = apps.get_model("studio", "ChapterBlock")
+    chapter_snapshot_model = apps.get_model("studio", "ChapterSnapshot")
+    version_model = apps.get_model("studio", "ChapterBlockVersion")
+
+    pending = []
+    for version in version_model.objects.exclude(rendered_text="").only("id", "rendered_text"):
+        version.token_count = estimate_tokens(version.rendered_text)
+        pending.append(version)
+        if len(pending) >= 500:
+            version_model.objects.bulk_update(pending, ["token_count"])
+            pending = []
+    if pending:
+        version_model.objects.bulk_update(pending, ["token_count"])
+
+    # Chapter and book totals were estimated with the previous formula; realign them
+    # once so later deltas of the stored per-version counts add up.
+    for book in book_model.objects.all():
+        book_tokens = 0
+        for chapter in chapter_model.objects.filter(book=book):
+            tokens = sum(
+                chapter_block_model.objects.filter(
+                    chapter=chapter, active_version__isnull=False
+                ).values_list("active_version__token_count", flat=True)
+            )
+            if chapter.tokens != tokens:
+                # New revision so conditional reads do not keep serving the old count.
+                chapter.tokens = tokens
+                chapter.revision += 1
+                chapter.save(update_fields=["tokens", "revision"])
+            book_tokens += tokens
+        book.tokens = book_tokens
+        book.save(update_fields=["tokens"])
+    chapter_snapshot_model.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("studio", "0019_book_context_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chapterblockversion",
+            name="token_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_token_counts, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 from uuid import uuid4
 
 from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.utils import timezone
 
 from .payloads import (
     ChapterBlockPayload,
@@ -15,7 +16,11 @@ from .payloads import (
     ContextSectionPayload,
     LibraryBookPayload,
     chapter_detail_from_blocks,
+    count_words,
+    payload_content_hash,
+    render_block_text,
 )
+from .tokens import estimate_tokens
 
 
 class TimeStampedModel(models.Model):
@@ -132,6 +137,10 @@ class Book(TimeStampedModel):
     author = models.CharField(max_length=255, blank=True)
     synopsis = models.TextField(blank=True)
     order = models.PositiveIntegerField(default=0)
+    tokens = models.PositiveIntegerField(default=0)
+    word_count = models.PositiveIntegerField(default=0)
+    # Random token replaced on every context write; keys the cached context tree.
+    context_version = models.CharField(max_length=32, blank=True, default="")
 
     class Meta:
         ordering = ["order", "title"]
@@ -144,6 +153,8 @@ class Book(TimeStampedModel):
         payload: LibraryBookPayload = {
             "id": self.id,
             "title": self.title,
+            "tokens": int(self.tokens),
+            "wordCount": int(self.word_count),
             "chapters": chapters,
         }
         if self.author:
@@ -165,6 +176,7 @@ class Chapter(TimeStampedModel):
     ordinal = models.PositiveIntegerField(default=0)
     tokens = models.PositiveIntegerField(null=True, blank=True)
     word_count = models.PositiveIntegerField(null=True, blank=True)
+    revision = models.PositiveIntegerField(default=0)
 
     class Meta:
         ordering = ["book", "ordinal", "id"]
@@ -187,7 +199,7 @@ class Chapter(TimeStampedModel):
         return payload
 
     def to_detail_payload(self) -> ChapterDetailPayload:
-        blocks = [block.to_payload() for block in self.blocks.all()]
+        blocks = [block.to_payload(position=index) for index, block in enumerate(self.blocks.all())]
         return chapter_detail_from_blocks(
             chapter_id=self.id,
             title=self.title,
@@ -198,9 +210,26 @@ class Chapter(TimeStampedModel):
             blocks=blocks,
             book_id=self.book_id,
             book_title=self.book.title if self.book else None,
+            revision=int(self.revision),
         )
 
 
+class ChapterSnapshot(TimeStampedModel):
+    """Pre-rendered chapter detail payload, valid while ``revision`` matches the chapter."""
+
+    chapter = models.OneToOneField(
+        Chapter,
+        primary_key=True,
+        related_name="snapshot",
+        on_delete=models.CASCADE,
+    )
+    revision = models.PositiveIntegerField()
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+
+    def __str__(self) -> str:
+        return f"{self.chapter_id}@r{self.revision}"
+
+
 class ChapterBlockType(models.TextChoices):
     PARAGRAPH = "paragraph", "Paragraph"
     DIALOGUE = "dialogue", "Dialogue"
@@ -219,7 +248,9 @@ class ChapterBlock(TimeStampedModel):
         max_length=32,
         choices=ChapterBlockType.choices,
     )
-    position = models.IntegerField()
+    # Sparse ordering key (see ``studio.data.ordering``); the dense ``position`` exposed by
+    # the API is the block's rank within the chapter.
+    sort_key = models.BigIntegerField()
     payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
     active_version = models.ForeignKey(
         "studio.ChapterBlockVersion",
@@ -230,30 +261,32 @@ class ChapterBlock(TimeStampedModel):
     )
     active_version_number = models.PositiveIntegerField(default=1)
     version_count = models.PositiveIntegerField(default=1)
+    # Compare-and-swap token for concurrent edits; bumped by every change to the block.
+    revision = models.PositiveIntegerField(default=1)
 
     class Meta:
-        ordering = ["chapter", "position", "id"]
+        ordering = ["chapter", "sort_key", "id"]
+        indexes = [
+            models.Index(fields=["chapter", "sort_key"], name="chapterblock_chapter_sort"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.type}:{self.id}"
 
-    def base_payload(self) -> Dict[str, Any]:
+    def base_payload(self, position: int) -> Dict[str, Any]:
         return {
             "id": self.id,
             "type": self.type,
-            "position": int(self.position),
+            "position": int(position),
         }
 
-    def to_payload(self) -> ChapterBlockPayload:
-        data: ChapterBlockPayload = self.base_payload()  # type: ignore[assignment]
-        active_payload: Dict[str, Any]
-        if self.active_version is not None:
-            active_payload = dict(self.active_version.payload or {})
-        else:
-            active_payload = dict(self.payload or {})
-        data.update(active_payload)
+    def to_payload(self, position: int) -> ChapterBlockPayload:
+        data: ChapterBlockPayload = self.base_payload(position)  # type: ignore[assignment]
+        # ``payload`` mirrors the active version, whose own row may hold only a delta.
+        data.update(dict(self.payload or {}))
         data["activeVersion"] = int(self.active_version_number or 1)
         data["versionCount"] = int(self.version_count or 1)
+        data["revision"] = int(self.revision or 1)
         return data
 
 
@@ -268,24 +301,78 @@ class ChapterBlockVersion(TimeStampedModel):
     )
     payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
     is_active = models.BooleanField(default=False)
+    rendered_text = models.TextField(blank=True, default="")
+    word_count = models.PositiveIntegerField(default=0)
+    # Estimated with ``studio.tokens`` when the version is written.
+    token_count = models.PositiveIntegerField(default=0)
+    content_hash = models.CharField(max_length=64, blank=True, default="")
+    # Set for versions stored as a diff against an earlier one (``payload`` is then empty);
+    # see ``studio.data.versions``.
+    delta = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    # Last time the version became active; retention keeps recently used versions.
+    activated_at = models.DateTimeField(null=True, blank=True, default=timezone.now)
 
     class Meta:
         ordering = ["block", "version"]
         constraints = [
             models.UniqueConstraint(fields=["block", "version"], name="uniq_block_version"),
         ]
+        indexes = [
+            models.Index(fields=["block", "content_hash"], name="blockversion_block_hash"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.block_id}:v{self.version}"
 
-    def to_payload(self) -> Dict[str, Any]:
+    @staticmethod
+    def derived_fields(block_type: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the pre-rendered text, counters and content hash for a version ``payload``."""
+        text = render_block_text(block_type, payload or {})
+        return {
+            "rendered_text": text,
+            "word_count": count_words(text),
+            "token_count": estimate_tokens(text),
+            "content_hash": payload_content_hash(payload or {}),
+        }
+
+    def to_payload(self, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Serialize the version; ``payload`` overrides the stored one for delta versions."""
         return {
             "version": int(self.version),
             "isActive": bool(self.is_active),
-            "payload": dict(self.payload or {}),
+            "payload": dict(self.payload or {}) if payload is None else dict(payload),
         }
 
 
+class ChapterBlockDraft(TimeStampedModel):
+    """Autosaved block changes not yet written as a version; see ``studio.data.autosave``.
+
+    ``created_at`` marks the first edit of the burst and ``updated_at`` the latest one.
+    """
+
+    block = models.OneToOneField(
+        ChapterBlock,
+        primary_key=True,
+        related_name="draft",
+        on_delete=models.CASCADE,
+    )
+    chapter = models.ForeignKey(
+        Chapter,
+        related_name="block_drafts",
+        on_delete=models.CASCADE,
+    )
+    changes = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["chapter", "created_at"], name="blockdraft_chapter_created"),
+            models.Index(fields=["created_at"], name="blockdraft_created"),
+        ]
+
+    def __str__(self) -> str:
+        return f"draft:{self.block_id}"
+
+
 class ChapterBlockConversionStatus(models.TextChoices):
     PENDING = "pending", "Pending"
     ACCEPTED = "accepted", "Accepted"
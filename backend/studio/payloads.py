@@ -1,6 +1,11 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Literal, Optional, TypedDict
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Mapping, Optional, TypedDict
+
+from django.core.serializers.json import DjangoJSONEncoder
 
 
 def join_paragraphs(paragraphs: List[str]) -> str:
@@ -48,6 +53,7 @@ class ChapterBlockBasePayload(TypedDict):
 class ChapterBlockVersionInfo(TypedDict, total=False):
     activeVersion: int
     versionCount: int
+    revision: int
 
 
 class ParagraphBlockPayload(ChapterBlockBasePayload, ChapterBlockVersionInfo, total=False):
@@ -112,12 +118,54 @@ class ChapterSummaryPayload(TypedDict, total=False):
     wordCount: Optional[int]
 
 
+class ChapterBlockDraftPayload(TypedDict):
+    block: ChapterBlockPayload
+    pendingSince: datetime
+
+
 class ChapterDetailPayload(ChapterSummaryPayload, total=False):
     content: str
     paragraphs: List[str]
     blocks: List[ChapterBlockPayload]
     bookId: Optional[str]
     bookTitle: Optional[str]
+    revision: Optional[int]
+    pendingDrafts: List[ChapterBlockDraftPayload]
+
+
+class ChapterBlockPositionPayload(TypedDict):
+    id: str
+    position: int
+
+
+class ChapterBlockDeltaPayload(TypedDict):
+    chapterId: str
+    revision: int
+    blocks: List[ChapterBlockPayload]
+    shiftedBlocks: List[ChapterBlockPositionPayload]
+    removedBlockIds: List[str]
+
+
+class ChapterBlockTransferPayload(TypedDict):
+    blockIds: List[str]
+    source: ChapterDetailPayload
+    target: ChapterDetailPayload
+
+
+class ChapterBlockAutosavePayload(TypedDict):
+    chapterId: str
+    revision: int
+    block: ChapterBlockPayload
+    pendingSince: datetime
+
+
+class ChapterBlockWindowPayload(TypedDict):
+    chapterId: str
+    revision: int
+    blocks: List[ChapterBlockPayload]
+    previousCursor: Optional[str]
+    nextCursor: Optional[str]
+    pendingDrafts: List[ChapterBlockDraftPayload]
 
 
 class LibraryBookPayload(TypedDict, total=False):
@@ -125,6 +173,8 @@ class LibraryBookPayload(TypedDict, total=False):
     title: str
     author: Optional[str]
     synopsis: Optional[str]
+    tokens: int
+    wordCount: int
     chapters: List[ChapterSummaryPayload]
 
 
@@ -144,6 +194,20 @@ class ContextItemPayload(TypedDict, total=False):
     visibleForChapter: bool
 
 
+class DroppedContextItemPayload(TypedDict):
+    id: str
+    name: str
+    tokens: int
+
+
+class PackedContextPayload(TypedDict):
+    items: List[ContextItemPayload]
+    budget: int
+    tokens: int
+    trimmed: List[str]
+    dropped: List[DroppedContextItemPayload]
+
+
 class ContextSectionPayload(TypedDict, total=False):
     id: str
     title: str
@@ -224,6 +288,34 @@ def block_to_text(block: ChapterBlockPayload) -> List[str]:
     return []
 
 
+def render_block_text(block_type: str, payload: Mapping[str, Any]) -> str:
+    """Return the plain-text paragraph a block contributes to chapter content.
+
+    ``block_to_text`` yields at most one paragraph per block, so an empty string means the
+    block adds nothing to ``paragraphs``.
+    """
+    return "\n\n".join(block_to_text({**payload, "type": block_type}))  # type: ignore[typeddict-item]
+
+
+def payload_content_hash(payload: Mapping[str, Any]) -> str:
+    """Return the SHA-256 of the canonical JSON encoding of a version ``payload``.
+
+    Keys are sorted and whitespace is dropped so equal payloads always hash the same.
+    """
+    canonical = json.dumps(
+        payload,
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        cls=DjangoJSONEncoder,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
 def blocks_to_paragraphs(blocks: List[ChapterBlockPayload]) -> List[str]:
     paragraphs: List[str] = []
     for block in sorted(blocks, key=lambda b: b.get("position", 0)):
@@ -242,8 +334,11 @@ def chapter_detail_from_blocks(
     blocks: List[ChapterBlockPayload],
     book_id: Optional[str],
     book_title: Optional[str],
+    revision: Optional[int] = None,
+    paragraphs: Optional[List[str]] = None,
 ) -> ChapterDetailPayload:
-    paragraphs = blocks_to_paragraphs(blocks)
+    if paragraphs is None:
+        paragraphs = blocks_to_paragraphs(blocks)
     return {
         "id": chapter_id,
         "title": title,
@@ -256,19 +351,20 @@ def chapter_detail_from_blocks(
         "blocks": blocks,
         "bookId": book_id,
         "bookTitle": book_title,
+        "revision": revision,
     }
 
 
 def build_editor_state(
     *,
     source: ChapterDetailPayload,
-    token_budget: int,
+    tokens: int,
 ) -> EditorPayload:
     return {
         "paragraphs": source["paragraphs"],
         "content": source["content"],
         "blocks": source["blocks"],
-        "tokens": token_budget,
+        "tokens": tokens,
         "cursor": None,
         "bookId": source.get("bookId"),
         "bookTitle": source.get("bookTitle"),
@@ -1,11 +1,23 @@
 """Prompt builders used to interact with AI providers."""
 
+from .context_packing import (
+    DEFAULT_CONTEXT_TOKEN_BUDGETS,
+    ContextItemRenderer,
+    context_token_budget,
+    pack_context_items,
+)
 from .paragraph_suggestion import (
     build_paragraph_suggestion_prompt,
     build_paragraph_suggestion_prompt_base,
+    render_paragraph_context_item,
 )
 
 __all__ = [
+    "ContextItemRenderer",
+    "DEFAULT_CONTEXT_TOKEN_BUDGETS",
     "build_paragraph_suggestion_prompt",
     "build_paragraph_suggestion_prompt_base",
+    "context_token_budget",
+    "pack_context_items",
+    "render_paragraph_context_item",
 ]
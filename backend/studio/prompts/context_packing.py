@@ -0,0 +1,162 @@
+"""Token-budgeted selection of library context items for prompts.
+
+Each prompt type has a context budget (``DEFAULT_CONTEXT_TOKEN_BUDGETS``, overridable
+per type through ``STUDIO_CONTEXT_TOKEN_BUDGETS``). Active items are ranked by relevance:
+
+* items scoped to the chapter first,
+* then items whose name or title is mentioned in the focus text (the target block, its
+  neighbours and the user's instructions),
+* then by type: style notes, characters, world details and chapter summaries;
+  ties keep the library order.
+
+Each prompt passes the function that renders an item's entry, so an item costs exactly
+the tokens of the text the prompt shows for it; items rendered as an empty string are
+never shown and are skipped. Items are taken greedily in ranking order. An item that does
+not fit has its rendered long fields trimmed to the remaining budget when at least
+``MIN_TRIMMED_TOKENS`` are left and is dropped otherwise. The selected items keep their
+library order.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence, cast
+
+from django.conf import settings
+
+from ..payloads import ContextItemPayload, DroppedContextItemPayload, PackedContextPayload
+from ..tokens import estimate_tokens
+
+__all__ = [
+    "ContextItemRenderer",
+    "DEFAULT_CONTEXT_TOKEN_BUDGETS",
+    "MIN_TRIMMED_TOKENS",
+    "context_item_tokens",
+    "context_token_budget",
+    "pack_context_items",
+]
+
+ContextItemRenderer = Callable[[ContextItemPayload], str]
+
+DEFAULT_CONTEXT_TOKEN_BUDGETS: Dict[str, int] = {"paragraph": 1500, "general": 1500}
+MIN_TRIMMED_TOKENS = 32
+
+# Longest rendered one first when trimming; names and roles are never cut.
+_TRIMMABLE_FIELDS = ("description", "summary")
+_TYPE_PRIORITY = {"styleTone": 3, "character": 2, "world": 1, "chapter": 0}
+_TRIM_MARK = "…"
+_WORDS = re.compile(r"\w+")
+
+
+def context_token_budget(prompt_type: str) -> int:
+    budgets = {
+        **DEFAULT_CONTEXT_TOKEN_BUDGETS,
+        **getattr(settings, "STUDIO_CONTEXT_TOKEN_BUDGETS", {}),
+    }
+    if prompt_type not in budgets:
+        raise ValueError(f"Unknown prompt type: {prompt_type}")
+    return max(0, int(budgets[prompt_type]))
+
+
+def context_item_tokens(item: ContextItemPayload, render: ContextItemRenderer) -> int:
+    """Estimate the tokens of the entry ``render`` emits for a context item."""
+    return estimate_tokens(render(item))
+
+
+def _item_label(item: ContextItemPayload) -> str:
+    return str(item.get("name") or item.get("title") or item.get("id") or "")
+
+
+def _is_mentioned(item: ContextItemPayload, focus_words: set[str]) -> bool:
+    label_words = {word for word in _WORDS.findall(_item_label(item).casefold()) if len(word) > 3}
+    return not label_words.isdisjoint(focus_words)
+
+
+def _rendered_fields(item: Dict[str, Any], render: ContextItemRenderer) -> List[str]:
+    """Return the trimmable fields whose text shows up in the rendered entry."""
+    rendered = render(cast(ContextItemPayload, item))
+    return [
+        field
+        for field in _TRIMMABLE_FIELDS
+        if item.get(field) and render(cast(ContextItemPayload, {**item, field: ""})) != rendered
+    ]
+
+
+def _trim_item(
+    item: ContextItemPayload,
+    available: int,
+    render: ContextItemRenderer,
+) -> Optional[ContextItemPayload]:
+    """Shorten the rendered long fields of ``item`` until it fits in ``available`` tokens."""
+
+    def cost(candidate: Dict[str, Any]) -> int:
+        return context_item_tokens(cast(ContextItemPayload, candidate), render)
+
+    trimmed: Dict[str, Any] = dict(item)
+    while cost(trimmed) > available:
+        fields = _rendered_fields(trimmed, render)
+        if not fields:
+            return None
+        field = max(fields, key=lambda name: len(str(trimmed.get(name))))
+        words = str(trimmed.get(field)).split()
+        # Keep the most words that fit; at least one goes, so every round shortens a field.
+        low, high = 0, len(words) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if cost({**trimmed, field: " ".join(words[:middle]) + _TRIM_MARK}) <= available:
+                low = middle
+            else:
+                high = middle - 1
+        trimmed[field] = " ".join(words[:low]) + _TRIM_MARK if low > 0 else ""
+    return cast(ContextItemPayload, trimmed)
+
+
+def pack_context_items(
+    items: Sequence[ContextItemPayload],
+    *,
+    budget: int,
+    render: ContextItemRenderer,
+    focus_text: str = "",
+) -> PackedContextPayload:
+    """Select and trim ``items`` to fit ``budget`` tokens, reporting what was left out."""
+    focus_words = set(_WORDS.findall(focus_text.casefold()))
+    ranked = sorted(
+        (index for index in range(len(items)) if render(items[index])),
+        key=lambda index: (
+            not items[index].get("chapterId"),
+            not _is_mentioned(items[index], focus_words),
+            -_TYPE_PRIORITY.get(str(items[index].get("type")), 0),
+            index,
+        ),
+    )
+
+    selected: Dict[int, ContextItemPayload] = {}
+    trimmed_ids: List[str] = []
+    dropped: List[DroppedContextItemPayload] = []
+    used = 0
+    for index in ranked:
+        item = items[index]
+        cost = context_item_tokens(item, render)
+        available = budget - used
+        packed: Optional[ContextItemPayload] = item
+        if cost > available:
+            packed = (
+                _trim_item(item, available, render) if available >= MIN_TRIMMED_TOKENS else None
+            )
+            if packed is None:
+                dropped.append(
+                    {"id": str(item.get("id")), "name": _item_label(item), "tokens": cost}
+                )
+                continue
+            trimmed_ids.append(str(item.get("id")))
+            cost = context_item_tokens(packed, render)
+        selected[index] = cast(ContextItemPayload, {**packed, "tokens": cost})
+        used += cost
+
+    return {
+        "items": [selected[index] for index in sorted(selected)],
+        "budget": budget,
+        "tokens": used,
+        "trimmed": trimmed_ids,
+        "dropped": dropped,
+    }
@@ -179,54 +179,70 @@ def _format_chapter_section(
     return "\n".join(lines)
 
 
+def render_paragraph_context_item(item: ContextItemPayload, *, indent: str = "  ") -> str:
+    """Return the entry line the paragraph prompt shows for ``item``, or ``""`` if none."""
+    item_type = item.get("type")
+
+    if item_type == "character":
+        name = item.get("name", "")
+        role = item.get("role")
+        summary = item.get("summary")
+        entry = f"{indent}  • {name}" if name else f"{indent}  • Personaje"
+        if role:
+            entry += f" ({role})"
+        if summary:
+            entry += f": {summary}"
+        return entry
+
+    if item_type == "world":
+        name = item.get("name") or item.get("title", "")
+        description = item.get("description") or item.get("summary")
+        entry = f"{indent}  • {name}" if name else f"{indent}  • Escenario"
+        if description:
+            entry += f": {description}"
+        return entry
+
+    if item_type == "styleTone":
+        name = item.get("name") or "Estilo"
+        description = item.get("description")
+        entry = f"{indent}  • {name}"
+        if description:
+            entry += f": {description}"
+        return entry
+
+    return ""
+
+
 def _render_context_groups(
     items: List[ContextItemPayload],
     *,
     indent: str,
 ) -> List[str]:
-    characters = [item for item in items if item.get("type") == "character"]
-    world_items = [item for item in items if item.get("type") == "world"]
-    style_items = [item for item in items if item.get("type") == "styleTone"]
+    groups = (
+        ("character", "Personajes clave"),
+        ("world", "Detalles del mundo"),
+        ("styleTone", "Notas de estilo y tono"),
+    )
 
     lines: List[str] = []
-
-    if characters:
-        lines.append(f"{indent}- Personajes clave:")
-        for char in characters:
-            name = char.get("name", "")
-            role = char.get("role")
-            summary = char.get("summary")
-            entry = f"{indent}  • {name}" if name else f"{indent}  • Personaje"
-            if role:
-                entry += f" ({role})"
-            if summary:
-                entry += f": {summary}"
-            lines.append(entry)
-
-    if world_items:
-        lines.append(f"{indent}- Detalles del mundo:")
-        for item in world_items:
-            name = item.get("name") or item.get("title", "")
-            description = item.get("description") or item.get("summary")
-            entry = f"{indent}  • {name}" if name else f"{indent}  • Escenario"
-            if description:
-                entry += f": {description}"
-            lines.append(entry)
-
-    if style_items:
-        lines.append(f"{indent}- Notas de estilo y tono:")
-        for item in style_items:
-            name = item.get("name") or "Estilo"
-            description = item.get("description")
-            entry = f"{indent}  • {name}"
-            if description:
-                entry += f": {description}"
-            lines.append(entry)
+    for item_type, heading in groups:
+        entries = [
+            render_paragraph_context_item(item, indent=indent)
+            for item in items
+            if item.get("type") == item_type
+        ]
+        if entries:
+            lines.append(f"{indent}- {heading}:")
+            lines.extend(entries)
 
     return lines
 
 
-def _format_context_items_section(context_items: List[ContextItemPayload]) -> str:
+def _format_context_items_section(
+    context_items: List[ContextItemPayload],
+    *,
+    omitted: int = 0,
+) -> str:
     """Format active library context items grouped by scope."""
     if not context_items:
         return ""
@@ -246,6 +262,9 @@ def _format_context_items_section(context_items: List[ContextItemPayload]) -> st
         lines.append("- Elementos del capítulo:")
         lines.extend(_render_context_groups(chapter_items, indent="  "))
 
+    if omitted > 0:
+        lines.append(f"- ... y {omitted} elementos adicionales.")
+
     return "\n".join([line for line in lines if line])
 
 
@@ -340,6 +359,7 @@ def _build_paragraph_suggestion_sections(
     block: Optional[ParagraphBlockPayload],
     user_instructions: Optional[str] = None,
     context_items: Optional[List[ContextItemPayload]] = None,
+    omitted_context_items: int = 0,
     metadata_block: Optional[MetadataBlockPayload] = None,
     scene_block: Optional[SceneBoundaryBlockPayload] = None,
     preceding_blocks: Optional[List[ChapterBlockPayload]] = None,
@@ -378,7 +398,10 @@ def _build_paragraph_suggestion_sections(
 
     # Add context items if available before listing chapter content
     if context_items:
-        context_section = _format_context_items_section(context_items)
+        context_section = _format_context_items_section(
+            context_items,
+            omitted=omitted_context_items,
+        )
         if context_section:
             sections.append(context_section)
 
@@ -404,6 +427,7 @@ def build_paragraph_suggestion_prompt_base(
     block: Optional[ParagraphBlockPayload],
     user_instructions: Optional[str] = None,
     context_items: Optional[List[ContextItemPayload]] = None,
+    omitted_context_items: int = 0,
     metadata_block: Optional[MetadataBlockPayload] = None,
     scene_block: Optional[SceneBoundaryBlockPayload] = None,
     preceding_blocks: Optional[List[ChapterBlockPayload]] = None,
@@ -419,6 +443,7 @@ def build_paragraph_suggestion_prompt_base(
         block=block,
         user_instructions=user_instructions,
         context_items=context_items,
+        omitted_context_items=omitted_context_items,
         metadata_block=metadata_block,
         scene_block=scene_block,
         preceding_blocks=preceding_blocks,
@@ -443,6 +468,7 @@ def build_paragraph_suggestion_prompt(
     block: Optional[ParagraphBlockPayload],
     user_instructions: Optional[str] = None,
     context_items: Optional[List[ContextItemPayload]] = None,
+    omitted_context_items: int = 0,
     metadata_block: Optional[MetadataBlockPayload] = None,
     scene_block: Optional[SceneBoundaryBlockPayload] = None,
     preceding_blocks: Optional[List[ChapterBlockPayload]] = None,
@@ -458,6 +484,7 @@ def build_paragraph_suggestion_prompt(
         block=block,
         user_instructions=user_instructions,
         context_items=context_items,
+        omitted_context_items=omitted_context_items,
         metadata_block=metadata_block,
         scene_block=scene_block,
         preceding_blocks=preceding_blocks,
@@ -0,0 +1,92 @@
+"""JSON renderer and parser backed by ``orjson`` when it is installed.
+
+Install the ``fast`` extra to enable it. Both classes are drop-in replacements for DRF's
+stock JSON classes and produce the same bytes: values ``orjson`` cannot encode natively
+(datetimes, lazy strings, ...) are delegated to DRF's encoder, and anything ``orjson``
+rejects outright falls back to the stdlib implementation. ``orjson`` spells some floats
+differently, so output that may hold one is rendered again by the stdlib; API payloads
+carry no floats, so the byte scan that decides this practically never matches. The one
+difference left is that ``NaN`` and ``Infinity`` render as ``null`` where DRF raises.
+"""
+
+from __future__ import annotations
+
+import io
+import re
+from typing import Any
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:  # pragma: no cover - exercised implicitly depending on the environment
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+__all__ = ["FastJSONRenderer", "FastJSONParser", "FAST_JSON_AVAILABLE"]
+
+FAST_JSON_AVAILABLE = orjson is not None
+
+_encoder: Any = encoders.JSONEncoder()
+_LINE_SEPARATOR = "\u2028".encode()
+_PARAGRAPH_SEPARATOR = "\u2029".encode()
+# Where ``orjson`` and the stdlib spell a float differently: exponents (``1e16`` for
+# ``1e+16``, ``1e-7`` for ``1e-07``) and small values the stdlib writes with one
+# (``0.00001`` for ``1e-05``). String text can match too, which only costs a stdlib render.
+_EXPONENT = re.compile(rb"e-?[0-9]{1,3}(?:[,\]}]|\Z)")
+_SMALL_FLOAT = b"0.0000"
+
+
+class FastJSONRenderer(JSONRenderer):
+    """Render compact UTF-8 JSON with ``orjson``, matching ``JSONRenderer`` output."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            rendered = orjson.dumps(
+                data,
+                default=_encoder.default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS,
+            )
+        except TypeError:
+            # e.g. integers beyond 64 bits or non-string dict keys.
+            return super().render(data, accepted_media_type, renderer_context)
+        if _SMALL_FLOAT in rendered or _EXPONENT.search(rendered):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Mirror DRF's escaping of the JavaScript line terminators.
+        if _LINE_SEPARATOR in rendered:
+            rendered = rendered.replace(_LINE_SEPARATOR, b"\\u2028")
+        if _PARAGRAPH_SEPARATOR in rendered:
+            rendered = rendered.replace(_PARAGRAPH_SEPARATOR, b"\\u2029")
+        return rendered
+
+
+class FastJSONParser(JSONParser):
+    """Parse request bodies with ``orjson``, deferring to ``JSONParser`` on any error."""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+
+        raw = stream.read() if stream is not None else b""
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # Let the stdlib parser decide, so error messages and lenient inputs
+            # (such as lone surrogate escapes) behave exactly as before.
+            return super().parse(io.BytesIO(raw), media_type, parser_context)
@@ -0,0 +1,151 @@
+"""Compiled, read-only representations of the hot response serializers.
+
+DRF stays in charge of validating writes. For reads, the declared serializer fields are
+walked once at import time and turned into a flat plan of ``(name, convert, missing)``
+steps that reproduce ``Serializer.to_representation`` without the per-field machinery.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Mapping, Tuple, Type
+
+from rest_framework import fields as drf_fields
+from rest_framework import serializers
+from rest_framework.fields import empty
+
+from .serializers import (
+    ChapterBlockSerializer,
+    ChapterDetailSerializer,
+    LibraryBookSerializer,
+    LibraryBooksResponseSerializer,
+    reshape_block_representation,
+)
+
+__all__ = [
+    "compile_serializer",
+    "represent_chapter_block",
+    "represent_chapter_detail",
+    "represent_library_book",
+    "represent_library_books",
+]
+
+Converter = Callable[[Any], Any]
+Representation = Callable[[Mapping[str, Any]], Dict[str, Any]]
+
+# Serializers that customise ``to_representation`` must register the equivalent
+# post-processing step here; anything else is rejected when compiling.
+_POST_PROCESSORS: Dict[Type[serializers.Serializer], Callable[..., Dict[str, Any]]] = {
+    ChapterBlockSerializer: reshape_block_representation,
+}
+
+_SKIP = object()
+_RAISE = object()
+
+
+def _as_str(value: Any) -> str:
+    return value if type(value) is str else str(value)
+
+
+def _as_int(value: Any) -> int:
+    return value if type(value) is int else int(value)
+
+
+def _choice_converter(field: drf_fields.ChoiceField) -> Converter:
+    lookup = dict(field.choice_strings_to_values)
+
+    def convert(value: Any) -> Any:
+        if value == "":
+            return value
+        return lookup.get(str(value), value)
+
+    return convert
+
+
+def _list_converter(child: Converter) -> Converter:
+    def convert(value: Any) -> List[Any]:
+        return [None if item is None else child(item) for item in value]
+
+    return convert
+
+
+def _many_converter(child: Converter) -> Converter:
+    def convert(value: Any) -> List[Any]:
+        return [child(item) for item in value]
+
+    return convert
+
+
+def _field_converter(field: drf_fields.Field) -> Converter:
+    if isinstance(field, serializers.ListSerializer):
+        return _many_converter(_compile(field.child))
+    if isinstance(field, serializers.Serializer):
+        return _compile(field)
+
+    field_type = type(field)
+    if field_type is drf_fields.CharField:
+        return _as_str
+    if field_type is drf_fields.IntegerField:
+        return _as_int
+    if field_type is drf_fields.ChoiceField:
+        return _choice_converter(field)
+    if field_type is drf_fields.ListField:
+        return _list_converter(_field_converter(field.child))
+    if field_type is drf_fields.DateTimeField:
+        return field.to_representation
+    raise TypeError(f"Unsupported serializer field for compiled output: {field_type.__name__}")
+
+
+def _missing_behaviour(field: drf_fields.Field) -> Any:
+    # Mirrors ``Field.get_attribute`` when the key is absent from the instance.
+    if field.default is not empty:
+        return field.get_default
+    if field.allow_null:
+        return lambda: None
+    if not field.required:
+        return _SKIP
+    return _RAISE
+
+
+def _compile(serializer: serializers.Serializer) -> Representation:
+    serializer_class = type(serializer)
+    post_process = _POST_PROCESSORS.get(serializer_class)
+    if (
+        post_process is None
+        and serializer_class.to_representation is not serializers.Serializer.to_representation
+    ):
+        raise TypeError(f"{serializer_class.__name__} customises to_representation")
+
+    plan: List[Tuple[str, Converter, Any]] = []
+    for field in serializer._readable_fields:
+        if field.source != field.field_name:
+            raise TypeError(f"{serializer_class.__name__}.{field.field_name} uses a custom source")
+        plan.append((field.field_name, _field_converter(field), _missing_behaviour(field)))
+
+    def represent(instance: Mapping[str, Any]) -> Dict[str, Any]:
+        data: Dict[str, Any] = {}
+        for name, convert, missing in plan:
+            try:
+                value = instance[name]
+            except KeyError:
+                if missing is _SKIP:
+                    continue
+                if missing is _RAISE:
+                    raise
+                value = missing()
+            data[name] = None if value is None else convert(value)
+        if post_process is not None:
+            data = post_process(instance, data)
+        return data
+
+    return represent
+
+
+def compile_serializer(serializer_class: Type[serializers.Serializer]) -> Representation:
+    """Return a function producing ``serializer_class(instance).data`` for dict instances."""
+    return _compile(serializer_class())
+
+
+represent_chapter_block = compile_serializer(ChapterBlockSerializer)
+represent_chapter_detail = compile_serializer(ChapterDetailSerializer)
+represent_library_book = compile_serializer(LibraryBookSerializer)
+represent_library_books = compile_serializer(LibraryBooksResponseSerializer)
@@ -48,6 +48,47 @@ class SceneDetailsSerializer(serializers.Serializer):
     mood = serializers.CharField(required=False, allow_blank=True, allow_null=True)
 
 
+def reshape_block_representation(
+    instance: Dict[str, Any],
+    data: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Group flattened metadata/scene fields into ``narrativeContext``/``sceneDetails``."""
+    block_type = instance.get("type")
+
+    if block_type == "metadata":
+        kind = instance.get("kind")
+        context_field_names = [
+            "povCharacterId",
+            "povCharacterName",
+            "timelineMarker",
+            "locationId",
+            "locationName",
+        ]
+        context_payload: Dict[str, Any] = {
+            field: instance.get(field) for field in context_field_names
+        }
+        theme_tags = instance.get("themeTags")
+        if theme_tags is None:
+            theme_tags = data.get("themeTags")
+        if theme_tags is None or not isinstance(theme_tags, list):
+            theme_tags = []
+        context_payload["themeTags"] = theme_tags
+
+        if (
+            kind == "context"
+            or any(context_payload[field] not in (None, "") for field in context_field_names)
+            or bool(theme_tags)
+        ):
+            data["narrativeContext"] = context_payload
+
+    if block_type == "scene_boundary":
+        scene_detail_keys = ("locationId", "locationName", "timestamp", "mood")
+        if any(instance.get(key) not in (None, "") for key in scene_detail_keys):
+            data["sceneDetails"] = {key: instance.get(key) for key in scene_detail_keys}
+
+    return data
+
+
 class ChapterBlockSerializer(serializers.Serializer):
     id = serializers.CharField()
     type = serializers.ChoiceField(
@@ -57,6 +98,7 @@ class ChapterBlockSerializer(serializers.Serializer):
     version = serializers.IntegerField(required=False, min_value=1, max_value=999, write_only=True)
     activeVersion = serializers.IntegerField(required=False, read_only=True)
     versionCount = serializers.IntegerField(required=False, read_only=True)
+    revision = serializers.IntegerField(required=False, read_only=True)
     text = serializers.CharField(required=False, allow_blank=True)
     style = serializers.CharField(required=False, allow_blank=True, allow_null=True)
     tags = serializers.ListField(
@@ -110,44 +152,9 @@ class ChapterBlockSerializer(serializers.Serializer):
 
     def to_representation(self, instance: Any) -> Dict[str, Any]:
         data = super().to_representation(instance)
-
         if not isinstance(instance, dict):
             return data
-
-        block_type = instance.get("type")
-
-        if block_type == "metadata":
-            kind = instance.get("kind")
-            context_field_names = [
-                "povCharacterId",
-                "povCharacterName",
-                "timelineMarker",
-                "locationId",
-                "locationName",
-            ]
-            context_payload: Dict[str, Any] = {
-                field: instance.get(field) for field in context_field_names
-            }
-            theme_tags = instance.get("themeTags")
-            if theme_tags is None:
-                theme_tags = data.get("themeTags")
-            if theme_tags is None or not isinstance(theme_tags, list):
-                theme_tags = []
-            context_payload["themeTags"] = theme_tags
-
-            if (
-                kind == "context"
-                or any(context_payload[field] not in (None, "") for field in context_field_names)
-                or bool(theme_tags)
-            ):
-                data["narrativeContext"] = context_payload
-
-        if block_type == "scene_boundary":
-            scene_detail_keys = ("locationId", "locationName", "timestamp", "mood")
-            if any(instance.get(key) not in (None, "") for key in scene_detail_keys):
-                data["sceneDetails"] = {key: instance.get(key) for key in scene_detail_keys}
-
-        return data
+        return reshape_block_representation(instance, data)
 
 
 class ChapterBlockUpdateSerializer(ChapterBlockSerializer):
@@ -171,6 +178,11 @@ class ChapterBlockCreateSerializer(ChapterBlockSerializer):
         self.fields["position"].required = False
 
 
+class ChapterBlockConflictSerializer(serializers.Serializer):
+    detail = serializers.CharField()
+    block = ChapterBlockSerializer(allow_null=True)
+
+
 class ChapterBlockVersionSerializer(serializers.Serializer):
     version = serializers.IntegerField()
     isActive = serializers.BooleanField()
@@ -220,6 +232,7 @@ class ContextItemUpdateSerializer(serializers.Serializer):
     title = serializers.CharField(required=False, allow_blank=True, allow_null=True)
     description = serializers.CharField(required=False, allow_blank=True, allow_null=True)
     facts = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    tokens = serializers.IntegerField(required=False, allow_null=True, min_value=0)
 
 
 class ContextItemsUpdateRequestSerializer(serializers.Serializer):
@@ -239,7 +252,7 @@ class ContextItemCreateSerializer(serializers.Serializer):
     title = serializers.CharField(required=False, allow_blank=True, allow_null=True)
     description = serializers.CharField(required=False, allow_blank=True, allow_null=True)
     facts = serializers.CharField(required=False, allow_blank=True, allow_null=True)
-    tokens = serializers.IntegerField(required=False, allow_null=True)
+    tokens = serializers.IntegerField(required=False, allow_null=True, min_value=0)
     checked = serializers.BooleanField(required=False)
     disabled = serializers.BooleanField(required=False)
 
@@ -280,6 +293,8 @@ class LibraryBookSerializer(serializers.Serializer):
     title = serializers.CharField()
     author = serializers.CharField(required=False, allow_blank=True, allow_null=True)
     synopsis = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    tokens = serializers.IntegerField(required=False)
+    wordCount = serializers.IntegerField(required=False)
     chapters = ChapterSummarySerializer(many=True)
 
 
@@ -292,14 +307,48 @@ class ChapterUpsertSerializer(serializers.Serializer):
     title = serializers.CharField()
     summary = serializers.CharField(required=False, allow_blank=True, allow_null=True)
     ordinal = serializers.IntegerField(required=False, min_value=0)
-    tokens = serializers.IntegerField(required=False, allow_null=True, min_value=0)
-    wordCount = serializers.IntegerField(required=False, allow_null=True, min_value=0)
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         if self.partial:
             self.fields["title"].required = False
 
+    def validate(self, attrs: Dict[str, Any]) -> Dict[str, Any]:  # type: ignore[override]
+        # Word and token counters follow the chapter blocks; they cannot be set by hand.
+        derived = [field for field in ("tokens", "wordCount") if field in self.initial_data]
+        if derived:
+            raise serializers.ValidationError(
+                {field: "Se calcula a partir del contenido del capítulo." for field in derived}
+            )
+        return attrs
+
+
+class BookExportQuerySerializer(serializers.Serializer):
+    output = serializers.ChoiceField(
+        choices=("markdown", "text", "jsonl"),
+        required=False,
+        default="markdown",
+        help_text="Export format. ('format' is reserved by the API for content negotiation.)",
+    )
+
+
+class ManuscriptImportRequestSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    format = serializers.ChoiceField(choices=("markdown", "text"), required=False)
+    defaultTitle = serializers.CharField(required=False, allow_blank=True, max_length=255)
+
+
+class ManuscriptImportResultSerializer(serializers.Serializer):
+    bookId = serializers.CharField()
+    chapters = ChapterSummarySerializer(many=True)
+    blockCount = serializers.IntegerField()
+    wordCount = serializers.IntegerField()
+
+
+class ChapterBlockDraftSerializer(serializers.Serializer):
+    block = ChapterBlockSerializer()
+    pendingSince = serializers.DateTimeField()
+
 
 class ChapterDetailSerializer(ChapterSummarySerializer):
     content = serializers.CharField()
@@ -311,6 +360,91 @@ class ChapterDetailSerializer(ChapterSummarySerializer):
         allow_blank=True,
         allow_null=True,
     )
+    revision = serializers.IntegerField(required=False, allow_null=True)
+    pendingDrafts = ChapterBlockDraftSerializer(many=True, required=False)
+
+
+class ChapterBlockPositionSerializer(serializers.Serializer):
+    id = serializers.CharField()
+    position = serializers.IntegerField()
+
+
+class ChapterBlockOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=("create", "update", "delete", "move", "activateVersion"))
+    blockId = serializers.CharField(required=False)
+    block = ChapterBlockCreateSerializer(required=False)
+    changes = ChapterBlockUpdateSerializer(required=False)
+    position = serializers.IntegerField(required=False, min_value=0)
+    version = serializers.IntegerField(required=False, min_value=1, max_value=999)
+
+    def validate(self, attrs: Dict[str, Any]) -> Dict[str, Any]:  # type: ignore[override]
+        op = attrs["op"]
+        if op == "create":
+            if "block" not in attrs:
+                raise serializers.ValidationError({"block": "Este campo es obligatorio."})
+            return attrs
+        if not attrs.get("blockId"):
+            raise serializers.ValidationError({"blockId": "Este campo es obligatorio."})
+        if op == "update" and not attrs.get("changes"):
+            raise serializers.ValidationError({"changes": "No se enviaron cambios."})
+        if op == "move" and "position" not in attrs:
+            raise serializers.ValidationError({"position": "Este campo es obligatorio."})
+        if op == "activateVersion" and "version" not in attrs:
+            raise serializers.ValidationError({"version": "Este campo es obligatorio."})
+        return attrs
+
+
+class ChapterBlockOperationsRequestSerializer(serializers.Serializer):
+    operations = ChapterBlockOperationSerializer(many=True, allow_empty=False, max_length=1000)
+
+
+class ChapterBlockTransferRequestSerializer(serializers.Serializer):
+    mode = serializers.ChoiceField(choices=("move", "copy"), default="move")
+    targetChapterId = serializers.CharField()
+    firstBlockId = serializers.CharField()
+    lastBlockId = serializers.CharField(required=False)
+    position = serializers.IntegerField(required=False, min_value=0)
+
+
+class ChapterBlockTransferSerializer(serializers.Serializer):
+    blockIds = serializers.ListField(child=serializers.CharField())
+    source = ChapterDetailSerializer()
+    target = ChapterDetailSerializer()
+
+
+class ChapterBlockWindowQuerySerializer(serializers.Serializer):
+    after = serializers.CharField(required=False)
+    before = serializers.CharField(required=False)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=200, default=50)
+
+    def validate(self, attrs: Dict[str, Any]) -> Dict[str, Any]:  # type: ignore[override]
+        if attrs.get("after") is not None and attrs.get("before") is not None:
+            raise serializers.ValidationError("Usa solo uno de los cursores 'after' o 'before'.")
+        return attrs
+
+
+class ChapterBlockWindowSerializer(serializers.Serializer):
+    chapterId = serializers.CharField()
+    revision = serializers.IntegerField()
+    blocks = ChapterBlockSerializer(many=True)
+    previousCursor = serializers.CharField(allow_null=True)
+    nextCursor = serializers.CharField(allow_null=True)
+    pendingDrafts = ChapterBlockDraftSerializer(many=True)
+
+
+class ChapterBlockAutosaveSerializer(serializers.Serializer):
+    chapterId = serializers.CharField()
+    revision = serializers.IntegerField()
+    block = ChapterBlockSerializer()
+    pendingSince = serializers.DateTimeField()
+
+
+class ChapterBlockDeltaSerializer(serializers.Serializer):
+    chapterId = serializers.CharField()
+    revision = serializers.IntegerField()
+    blocks = ChapterBlockSerializer(many=True)
+    shiftedBlocks = ChapterBlockPositionSerializer(many=True)
+    removedBlockIds = serializers.ListField(child=serializers.CharField())
 
 
 class ParagraphSuggestionRequestSerializer(serializers.Serializer):
@@ -322,8 +456,24 @@ class ParagraphSuggestionResponseSerializer(serializers.Serializer):
     paragraphSuggestion = serializers.CharField()
 
 
+class DroppedContextItemSerializer(serializers.Serializer):
+    id = serializers.CharField()
+    name = serializers.CharField(allow_blank=True)
+    tokens = serializers.IntegerField()
+
+
+class PromptContextSerializer(serializers.Serializer):
+    budget = serializers.IntegerField()
+    tokens = serializers.IntegerField()
+    included = serializers.ListField(child=serializers.CharField())
+    trimmed = serializers.ListField(child=serializers.CharField())
+    dropped = DroppedContextItemSerializer(many=True)
+
+
 class ParagraphSuggestionPromptResponseSerializer(serializers.Serializer):
     prompt = serializers.CharField()
+    tokens = serializers.IntegerField()
+    context = PromptContextSerializer()
 
 
 class GeneralSuggestionRequestSerializer(serializers.Serializer):
@@ -382,6 +532,8 @@ class GeneralSuggestionResponseSerializer(serializers.Serializer):
 
 class GeneralSuggestionPromptResponseSerializer(serializers.Serializer):
     prompt = serializers.CharField()
+    tokens = serializers.IntegerField()
+    context = PromptContextSerializer()
 
 
 class BlockConversionRequestSerializer(serializers.Serializer):
@@ -0,0 +1,31 @@
+"""Signal receivers that keep derived caches in step with model writes."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .data.context import invalidate_book_context
+from .models import ChapterContextVisibility, LibraryContextItem, LibrarySection
+
+
+@receiver([post_save, post_delete], sender=LibrarySection)
+def invalidate_context_on_section_change(sender, instance: LibrarySection, **kwargs: Any) -> None:
+    invalidate_book_context(pk=instance.book_id)
+
+
+@receiver([post_save, post_delete], sender=LibraryContextItem)
+def invalidate_context_on_item_change(sender, instance: LibraryContextItem, **kwargs: Any) -> None:
+    invalidate_book_context(context_sections__id=instance.section_id)
+
+
+# Overrides are only deleted by update_chapter_context_visibility, which invalidates
+# explicitly, or by cascades from an item (covered above) or a chapter (whose trees are
+# never read again). Skipping post_delete keeps those deletes set-based.
+@receiver(post_save, sender=ChapterContextVisibility)
+def invalidate_context_on_visibility_change(
+    sender, instance: ChapterContextVisibility, **kwargs: Any
+) -> None:
+    invalidate_book_context(chapters__id=instance.chapter_id)
@@ -1,11 +1,70 @@
 from __future__ import annotations
 
+import io
+import json
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
 from unittest.mock import patch
-
-from django.test import TestCase
+from uuid import UUID
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-
-from studio.models import Book, Chapter, ChapterBlock, ChapterBlockVersion, LibraryContextItem
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from studio.data import (
+    apply_block_conversion_suggestion,
+    delete_chapter_block,
+    delete_chapter_block_version,
+    get_book_context_sections,
+    get_chapter_detail,
+    get_library_books,
+    list_chapter_block_versions,
+    update_book_context_items,
+    update_chapter_block,
+)
+from studio.data.autosave import store_block_draft
+from studio.data.export import iter_book_export
+from studio.data.importer import import_manuscript
+from studio.data.materializer import materialize_chapter_detail, materialize_chapter_header
+from studio.data.ordering import renumber_chapter_blocks
+from studio.data.versions import version_payloads
+from studio.models import (
+    Book,
+    Chapter,
+    ChapterBlock,
+    ChapterBlockConversion,
+    ChapterBlockDraft,
+    ChapterBlockVersion,
+    ChapterContextVisibility,
+    ChapterSnapshot,
+    LibraryContextItem,
+)
+from studio.payloads import payload_content_hash
+from studio.prompts import pack_context_items, render_paragraph_context_item
+from studio.prompts.context_packing import context_item_tokens
+from studio.renderers import FastJSONParser, FastJSONRenderer
+from studio.representations import (
+    compile_serializer,
+    represent_chapter_block,
+    represent_chapter_detail,
+    represent_library_books,
+)
+from studio.serializers import (
+    ChapterBlockSerializer,
+    ChapterDetailSerializer,
+    LibraryBooksResponseSerializer,
+)
+from studio.tokens import estimate_tokens, heuristic_token_count
+from studio.views.streaming import ChapterChangedDuringStreamError, iter_chapter_detail_json
 
 ORIGIN = "http://localhost:5173"
 
@@ -34,6 +93,18 @@ class LibraryEndpointTests(TestCase):
         self.assertGreaterEqual(len(first_book["chapters"]), 1)
         self.assertEqual(response["Access-Control-Allow-Origin"], ORIGIN)
 
+    def test_library_books_stream_matches_buffered_response(self) -> None:
+        Book.objects.create(id="bk-empty", title="Sin capítulos", order=99)
+        buffered = self.client.get(reverse("library-books"), HTTP_ORIGIN=ORIGIN)
+        streamed = self.client.get(reverse("library-books"), {"stream": "1"}, HTTP_ORIGIN=ORIGIN)
+
+        self.assertEqual(streamed.status_code, 200)
+        self.assertTrue(streamed.streaming)
+        self.assertEqual(streamed["Content-Type"], "application/json")
+        body = json.loads(b"".join(streamed.streaming_content))
+        self.assertEqual(body, buffered.json())
+        self.assertEqual(body["books"][-1]["chapters"], [])
+
     def test_create_library_book(self) -> None:
         response = self.client.post(
             reverse("library-books"),
@@ -122,6 +193,37 @@ class LibraryEndpointTests(TestCase):
         )
         self.assertEqual(response["Access-Control-Allow-Origin"], ORIGIN)
 
+    def test_update_context_items_in_bulk(self) -> None:
+        book_id = "bk-karamazov"
+        items = list(
+            LibraryContextItem.objects.filter(section__book_id=book_id, chapter__isnull=True)
+            .select_related("section")
+            .order_by("id")[:3]
+        )
+        self.assertEqual(len(items), 3)
+        updates = [
+            {"sectionSlug": item.section.slug, "id": item.item_id, "summary": f"Resumen {index}"}
+            for index, item in enumerate(items)
+        ]
+        get_book_context_sections(book_id)
+
+        # One locked read, one bulk update and the version bump, then a rebuilt tree;
+        # nothing scales with the number of items.
+        with self.assertNumQueries(10):
+            sections = update_book_context_items(book_id, updates)
+
+        summaries = {entry["id"]: entry.get("summary") for s in sections for entry in s["items"]}
+        for index, item in enumerate(items):
+            self.assertEqual(summaries[item.item_id], f"Resumen {index}")
+
+        response = self.client.patch(
+            reverse("library-book-context-items", kwargs={"book_id": book_id}),
+            data={"items": [{**updates[0], "id": "missing-item"}]},
+            content_type="application/json",
+            HTTP_ORIGIN=ORIGIN,
+        )
+        self.assertEqual(response.status_code, 404)
+
     def test_create_context_item_unknown_section(self) -> None:
         response = self.client.post(
             reverse("library-book-context-items", kwargs={"book_id": "bk-karamazov"}),
@@ -191,6 +293,157 @@ class ChapterEndpointTests(TestCase):
         self.assertEqual(response.status_code, 404)
         self.assertEqual(response["Access-Control-Allow-Origin"], ORIGIN)
 
+    def test_chapter_detail_honours_if_none_match(self) -> None:
+        chapter_id = "bk-karamazov-ch-01"
+        url = reverse("library-chapter-detail", kwargs={"chapter_id": chapter_id})
+        response = self.client.get(url, HTTP_ORIGIN=ORIGIN)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertTrue(etag.startswith('"'))
+
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=etag, HTTP_ORIGIN=ORIGIN)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached["ETag"], etag)
+        self.assertEqual(cached.content, b"")
+
+        self.client.patch(
+            reverse(
+                "library-chapter-block-update",
+                kwargs={"chapter_id": chapter_id, "block_id": "para-ch1-001"},
+            ),
+            data={"text": "Texto que invalida la caché."},
+            content_type="application/json",
+            HTTP_ORIGIN=ORIGIN,
+        )
+        refreshed = self.client.get(url, HTTP_IF_NONE_MATCH=etag, HTTP_ORIGIN=ORIGIN)
+        self.assertEqual(refreshed.status_code, 200)
+        self.assertNotEqual(refreshed["ETag"], etag)
+        self.assertEqual(refreshed.json()["revision"], Chapter.objects.get(pk=chapter_id).revision)
+
+    def test_chapter_patch_rejects_manual_counters(self) -> None:
+        chapter = Chapter.objects.select_related("book").get(pk="bk-karamazov-ch-01")
+        url = reverse("library-chapter-detail", kwargs={"chapter_id": chapter.id})
+
+        rejected = self.client.patch(
+            url,
+            data={"title": "Otro título", "tokens": 5, "wordCount": 3},
+            content_type="application/json",
+            HTTP_ORIGIN=ORIGIN,
+        )
+        self.assertEqual(rejected.status_code, 400)
+        self.assertEqual(set(rejected.json()), {"tokens", "wordCount"})
+
+        renamed = self.client.patch(
+            url, data={"title": "Otro título"}, content_type="application/json", HTTP_ORIGIN=ORIGIN
+        )
+        self.assertEqual(renamed.status_code, 200)
+        refreshed = Chapter.objects.select_related("book").get(pk=chapter.id)
+        self.assertEqual(refreshed.title, "Otro título")
+        self.assertEqual(
+            (refreshed.tokens, refreshed.word_count), (chapter.tokens, chapter.word_count)
+        )
+        self.assertEqual(refreshed.book.word_count, chapter.book.word_count)
+
+    def test_context_visibility_update_bumps_chapter_revision(self) -> None:
+        chapter = Chapter.objects.get(pk="bk-karamazov-ch-01")
+        item = LibraryContextItem.objects.filter(
+            section__book_id=chapter.book_id, chapter__isnull=True
+        ).first()
+        self.assertIsNotNone(item)
+
+        response = self.client.patch(
+            reverse("library-chapter-context-visibility", kwargs={"chapter_id": chapter.id}),
+            data={
+                "items": [
+                    {"id": item.item_id, "sectionSlug": item.section.slug, "visible": False}
+                ]
+            },
+            content_type="application/json",
+            HTTP_ORIGIN=ORIGIN,
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Chapter.objects.get(pk=chapter.id).revision, chapter.revision + 1)
+
+    def test_context_visibility_toggles_a_section_in_constant_queries(self) -> None:
+        chapter = Chapter.objects.get(pk="bk-karamazov-ch-01")
+        url = reverse("library-chapter-context-visibility", kwargs={"chapter_id": chapter.id})
+        items = list(
+            LibraryContextItem.objects.filter(
+                section__book_id=chapter.book_id, chapter__isnull=True
+            ).select_related("section")
+        )
+        self.assertGreater(len(items), 2)
+
+        def toggle(targets, *, hidden: bool) -> int:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.patch(
+                    url,
+                    data={
+                        "items": [
+                            {
+                                "id": item.item_id,
+                                "sectionSlug": item.section.slug,
+                                "visible": item.checked != hidden,
+                            }
+                            for item in targets
+                        ]
+                    },
+                    content_type="application/json",
+                    HTTP_ORIGIN=ORIGIN,
+                )
+            self.assertEqual(response.status_code, 200)
+            return len(queries)
+
+        single = toggle(items[:1], hidden=True)
+        self.assertEqual(toggle(items, hidden=True), single)
+        self.assertEqual(
+            ChapterContextVisibility.objects.filter(chapter=chapter).count(), len(items)
+        )
+        toggle(items, hidden=False)
+        self.assertFalse(ChapterContextVisibility.objects.filter(chapter=chapter).exists())
+
+    def test_context_tree_is_cached_until_a_context_write(self) -> None:
+        cache.clear()
+        chapter = Chapter.objects.get(pk="bk-karamazov-ch-01")
+        item = LibraryContextItem.objects.filter(
+            section__book_id=chapter.book_id, chapter__isnull=True
+        ).first()
+        self.assertIsNotNone(item)
+        get_book_context_sections(chapter.book_id, chapter_id=chapter.id)
+
+        with self.assertNumQueries(1):
+            cached = get_book_context_sections(chapter.book_id, chapter_id=chapter.id)
+        url = reverse("library-chapter-context-visibility", kwargs={"chapter_id": chapter.id})
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(url, HTTP_ORIGIN=ORIGIN).status_code, 200)
+
+        self.client.patch(
+            reverse("library-chapter-context-visibility", kwargs={"chapter_id": chapter.id}),
+            data={
+                "items": [
+                    {
+                        "id": item.item_id,
+                        "sectionSlug": item.section.slug,
+                        "visible": not item.checked,
+                    }
+                ]
+            },
+            content_type="application/json",
+            HTTP_ORIGIN=ORIGIN,
+        )
+
+        def visibility(sections):
+            return {
+                entry["id"]: entry.get("visibleForChapter")
+                for section in sections
+                for entry in section["items"]
+            }
+
+        refreshed = get_book_context_sections(chapter.book_id, chapter_id=chapter.id)
+        self.assertEqual(visibility(cached)[item.item_id], item.checked)
+        self.assertEqual(visibility(refreshed)[item.item_id], not item.checked)
+
     def test_create_chapter_for_book(self) -> None:
         book = Book.objects.get(pk="bk-karamazov")
         response = self.client.post(
@@ -206,6 +459,141 @@ class ChapterEndpointTests(TestCase):
         self.assertTrue(Chapter.objects.filter(id=payload["id"]).exists())
         self.assertEqual(response["Access-Control-Allow-Origin"], ORIGIN)
 
+    def test_import_manuscript_splits_chapters_scenes_and_dialogue(self) -> None:
+        book = Book.objects.get(pk="bk-karamazov")
+        initial_words = int(book.word_count or 0)
+        manuscript = (
+            "# Capítulo importado\n\n"
+            "Primer párrafo que\ncontinúa en otra línea.\n\n"
+            "—¿Quién anda ahí? —preguntó Aliosha.\n"
+            "—Nadie.\n\n"
+            "***\n\n"
+            "Capítulo 2\n\n"
+            "Final breve.\n"
+        )
+        upload = SimpleUploadedFile("novela.md", manuscript.encode("utf-8"))
+
+        response = self.client.post(
+            reverse("library-book-import", kwargs={"book_id": book.id}),
+            data={"file": upload},
+            HTTP_ORIGIN=ORIGIN,
+        )
+
+        self.assertEqual(response.status_code, 201)
+        payload = response.json()
+        self.assertEqual(
+            [chapter["title"] for chapter in payload["chapters"]],
+            ["Capítulo importado", "Capítulo 2"],
+        )
+        self.assertEqual(payload["blockCount"], 4)
+        first_id = payload["chapters"][0]["id"]
+        detail = self.client.get(
+            reverse("library-chapter-detail", kwargs={"chapter_id": first_id}),
+            HTTP_ORIGIN=ORIGIN,
+        ).json()
+        self.assertEqual(
+            [block["type"] for block in detail["blocks"]],
+            ["paragraph", "dialogue", "scene_boundary"],
+        )
+        self.assertEqual(detail["blocks"][0]["text"], "Primer párrafo que continúa en otra línea.")
+        self.assertEqual(len(detail["blocks"][1]["turns"]), 2)
+        self.assertEqual(
+            ChapterBlockVersion.objects.filter(block__chapter_id=first_id, is_active=True).count(),
+            3,
+        )
+        self.assertFalse(
+            ChapterBlock.objects.filter(chapter_id=first_id, active_version__isnull=True).exists()
+        )
+        book.refresh_from_db()
+        self.assertEqual(int(book.word_count or 0), initial_words + payload["wordCount"])
+
+    def test_import_manuscript_keeps_markdown_bullets_as_paragraphs(self) -> None:
+        manuscript = (
+            "# Notas\n\n"
+            "- Primera idea.\n"
+            "- Segunda idea.\n\n"
+            "– Sí —dijo ella.\n"
+        )
+        upload = SimpleUploadedFile("notas.md", manuscript.encode("utf-8"))
+
+        response = self.client.post(
+            reverse("library-book-import", kwargs={"book_id": "bk-karamazov"}),
+            data={"file": upload},
+            HTTP_ORIGIN=ORIGIN,
+        )
+
+        self.assertEqual(response.status_code, 201)
+        chapter_id = response.json()["chapters"][0]["id"]
+        detail = self.client.get(
+            reverse("library-chapter-detail", kwargs={"chapter_id": chapter_id}),
+            HTTP_ORIGIN=ORIGIN,
+        ).json()
+        self.assertEqual([block["type"] for block in detail["blocks"]], ["paragraph", "dialogue"])
+        self.assertEqual(detail["blocks"][0]["text"], "- Primera idea. - Segunda idea.")
+
+    def test_markdown_export_escapes_markers_and_round_trips(self) -> None:
+        for book_id in ("bk-source", "bk-copy"):
+            Book.objects.create(id=book_id, title="Ida y vuelta", order=99)
+        texts = ["# No es un título", "***", "- No es una lista", "> Ni una cita", "Normal."]
+        manuscript = "# Capítulo\n" + "".join(f"\nPárrafo {index}.\n" for index in range(5))
+        imported = import_manuscript("bk-source", manuscript.splitlines(), markdown=True)
+        chapter_id = imported["chapters"][0]["id"]
+        block_ids = ChapterBlock.objects.filter(chapter_id=chapter_id).order_by("sort_key")
+        for block_id, text in zip(block_ids.values_list("id", flat=True), texts, strict=True):
+            update_chapter_block(chapter_id, block_id, {"text": text})
+
+        exported = "".join(iter_book_export("bk-source", "markdown"))
+        self.assertIn("\n\\# No es un título\n", exported)
+        self.assertIn("\n\\***\n", exported)
+        self.assertIn("\n\\- No es una lista\n", exported)
+
+        copy = import_manuscript("bk-copy", exported.splitlines(keepends=True), markdown=True)
+        self.assertEqual([chapter["title"] for chapter in copy["chapters"]], ["Capítulo"])
+        detail = materialize_chapter_detail(copy["chapters"][0]["id"])
+        self.assertEqual(
+            [(block["type"], block.get("text")) for block in detail["blocks"]],
+            [("paragraph", text) for text in texts],
+        )
+
+    def test_book_export_streams_markdown_and_jsonl(self) -> None:
+        book_id = "bk-karamazov"
+        url = reverse("library-book-export", kwargs={"book_id": book_id})
+        chapters = list(Chapter.objects.filter(book_id=book_id).order_by("ordinal"))
+
+        markdown = self.client.get(url, HTTP_ORIGIN=ORIGIN)
+        self.assertEqual(markdown.status_code, 200)
+        self.assertTrue(markdown.streaming)
+        self.assertTrue(markdown["Content-Type"].startswith("text/markdown"))
+        body = b"".join(markdown.streaming_content).decode("utf-8")
+        headings = [line[2:] for line in body.splitlines() if line.startswith("# ")]
+        self.assertEqual(headings, [chapter.title for chapter in chapters])
+        first_detail = self.client.get(
+            reverse("library-chapter-detail", kwargs={"chapter_id": chapters[0].id}),
+            HTTP_ORIGIN=ORIGIN,
+        ).json()
+        paragraph = next(b for b in first_detail["blocks"] if b["type"] == "paragraph")
+        self.assertIn(paragraph["text"], body)
+
+        jsonl = self.client.get(url + "?output=jsonl", HTTP_ORIGIN=ORIGIN)
+        records = [
+            json.loads(line)
+            for line in b"".join(jsonl.streaming_content).decode("utf-8").splitlines()
+        ]
+        self.assertEqual(records[0]["kind"], "book")
+        block_records = [r for r in records if r["kind"] == "block"]
+        self.assertEqual(
+            len(block_records),
+            ChapterBlock.objects.filter(chapter__book_id=book_id).count(),
+        )
+        first_blocks = [r["block"] for r in block_records if r["chapterId"] == chapters[0].id]
+        self.assertEqual(first_blocks, first_detail["blocks"])
+
+        missing = self.client.get(
+            reverse("library-book-export", kwargs={"book_id": "missing"}),
+            HTTP_ORIGIN=ORIGIN,
+        )
+        self.assertEqual(missing.status_code, 404)
+
     def test_update_chapter_metadata(self) -> None:
         chapter = Chapter.objects.get(pk="bk-karamazov-ch-01")
         response = self.client.patch(
@@ -415,6 +803,69 @@ class ChapterEndpointTests(TestCase):
         self.assertEqual(kwargs.get("placement"), "append")
         self.assertEqual(response["Access-Control-Allow-Origin"], ORIGIN)
 
+    def test_block_conversion_apply_materializes_only_the_final_chapter(self) -> None:
+        chapter_id = "bk-karamazov-ch-01"
+        conversion = ChapterBlockConversion.objects.create(
+            chapter_id=chapter_id,
+            source_text="Uno. Dos.",
+            suggested_blocks=[
+                {"type": "paragraph", "text": "Uno."},
+                {"type": "paragraph", "text": "Dos."},
+            ],
+        )
+
+        with (
+            patch("studio.data.blocks._build_block_delta") as build_delta,
+            patch("studio.data.blocks._materialize_mutated_chapter") as materialize,
+        ):
+            detail = apply_block_conversion_suggestion(
+                conversion_id=str(conversion.id), placement="append"
+            )
+
+        build_delta.assert_not_called()
+        materialize.assert_not_called()
+        self.assertEqual([block.get("text") for block in detail["blocks"][-2:]], ["Uno.", "Dos."])
+
+    def test_block_conversion_apply_inserts_next_to_the_anchor_without_counting(self) -> None:
+        chapter_id = "bk-karamazov-ch-01"
+        ordered_ids = list(
+            ChapterBlock.objects.filter(chapter_id=chapter_id)
+            .order_by("sort_key", "id")
+            .values_list("id", flat=True)
+        )
+        anchor_id = ordered_ids[1]
+        # Adjacent keys leave no room next to the anchor, forcing a lazy renumber.
+        ChapterBlock.objects.filter(pk=ordered_ids[0]).update(sort_key=0)
+        ChapterBlock.objects.filter(pk=anchor_id).update(sort_key=1)
+        ChapterBlock.objects.filter(pk=ordered_ids[2]).update(sort_key=2)
+
+        for placement, expected in (
+            ("after", [ordered_ids[0], anchor_id, "Uno.", "Dos.", ordered_ids[2]]),
+            ("before", [ordered_ids[0], "Uno.", "Dos.", anchor_id, "Uno.", "Dos."]),
+        ):
+            conversion = ChapterBlockConversion.objects.create(
+                chapter_id=chapter_id,
+                source_text="Uno. Dos.",
+                suggested_blocks=[
+                    {"type": "paragraph", "text": "Uno."},
+                    {"type": "paragraph", "text": "Dos."},
+                ],
+            )
+            with CaptureQueriesContext(connection) as queries:
+                detail = apply_block_conversion_suggestion(
+                    conversion_id=str(conversion.id),
+                    anchor_block_id=anchor_id,
+                    placement=placement,
+                )
+            self.assertFalse(
+                any("COUNT(" in query["sql"] for query in queries.captured_queries), placement
+            )
+            labels = [
+                block.get("text") if block["id"] not in ordered_ids else block["id"]
+                for block in detail["blocks"]
+            ]
+            self.assertEqual(labels[: len(expected)], expected)
+
     def test_patch_block_creates_new_version(self) -> None:
         chapter_id = "bk-karamazov-ch-01"
         block_id = "para-ch1-001"
@@ -542,6 +993,666 @@ class ChapterEndpointTests(TestCase):
         self.assertEqual(block.version_count, 1)
         self.assertEqual(block.active_version_number, 1)
 
+    def test_patch_block_delta_response_returns_changed_block_only(self) -> None:
+        chapter_id = "bk-karamazov-ch-01"
+        block_id = "para-ch1-001"
+        initial_revision = Chapter.objects.get(pk=chapter_id).revision
+
+        response = self.client.patch(
+            reverse(
+                "library-chapter-block-update",
+                kwargs={"chapter_id": chapter_id, "block_id": block_id},
+            )
+            + "?response=delta",
+            data={"text": "Cambio mínimo con respuesta delta."},
+            content_type="application/json",
+            HTTP_ORIGIN=ORIGIN,
+        )
+
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        self.assertEqual(payload["chapterId"], chapter_id)
+        self.assertEqual(payload["revision"], initial_revision + 1)
+        self.assertNotIn("content", payload)
+        self.assertEqual([block["id"] for block in payload["blocks"]], [block_id])
+        self.assertEqual(payload["blocks"][0]["text"], "Cambio mínimo con respuesta delta.")
+        self.assertEqual(payload["shiftedBlocks"], [])
+        self.assertEqual(payload["removedBlockIds"], [])
+
+    def test_patch_block_if_match_rejects_stale_revision(self) -> None:
+        chapter_id = "bk-karamazov-ch-01"
+        block_id = "para-ch1-001"
+        url = reverse(
+            "library-chapter-block-update",
+            kwargs={"chapter_id": chapter_id, "block_id": block_id},
+        )
+        revision = ChapterBlock.objects.get(pk=block_id).revision
+
+        accepted = self.client.patch(
+            url,
+            data={"text": "Primera edición."},
+            content_type="application/json",
+            HTTP_IF_MATCH=f'"{revision}"',
+            HTTP_ORIGIN=ORIGIN,
+        )
+        self.assertEqual(accepted.status_code, 200)
+        self.assertEqual(ChapterBlock.objects.get(pk=block_id).revision, revision + 1)
+
+        conflict = self.client.patch(
+            url,
+            data={"text": "Edición basada en una copia antigua."},
+            content_type="application/json",
+            HTTP_IF_MATCH=f'"{revision}"',
+            HTTP_ORIGIN=ORIGIN,
+        )
+        self.assertEqual(conflict.status_code, 409)
+        body = conflict.json()
+        self.assertEqual(body["block"]["id"], block_id)
+        self.assertEqual(body["block"]["text"], "Primera edición.")
+        self.assertEqual(body["block"]["revision"], revision + 1)
+
+        malformed = self.client.patch(
+            url,
+            data={"text": "Sin revisión válida."},
+            content_type="application/json",
+            HTTP_IF_MATCH="abc",
+            HTTP_ORIGIN=ORIGIN,
+        )
+        self.assertEqual(malformed.status_code, 400)
+
+    def test_autosave_coalesces_edits_into_one_version(self) -> None:
+        chapter_id = "bk-karamazov-ch-01"
+        first_id, second_id = (
+            ChapterBlock.objects.filter(chapter_id=chapter_id, type="paragraph")
+            .order_by("sort_key")
+            .values_list("id", flat=True)[:2]
+        )
+        initial_revision = Chapter.objects.get(pk=chapter_id).revision
+        initial_versions = ChapterBlock.objects.get(pk=first_id).version_count
+
+        def autosave(block_id: str, text: str):
+            return self.client.patch(
+                reverse(
+                    "library-chapter-block-update",
+                    kwargs={"chapter_id": chapter_id, "block_id": block_id},
+                )
+                + "?autosave=1",
+                data={"text": text},
+                content_type="application/json",
+                HTTP_ORIGIN=ORIGIN,
+            )
+
+        for text in ("E", "Es", "Escribo"):
+            response = autosave(first_id, text)
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual(response.json()["block"]["text"], text)
+        self.assertEqual(ChapterBlock.objects.get(pk=first_id).version_count, initial_versions)
+        self.assertEqual(Chapter.objects.get(pk=chapter_id).revision, initial_revision)
+
+        # Touching another block writes the first burst as a single version.
+        self.assertEqual(autosave(second_id, "Otro bloque").status_code, 202)
+        first = ChapterBlock.objects.get(pk=first_id)
+        self.assertEqual(first.version_count, initial_versions + 1)
+        self.assertEqual(first.payload["text"], "Escribo")
+
+        committed = self.client.post(
+            reverse(
+                "library-chapter-block-commit",
+                kwargs={"chapter_id": chapter_id, "block_id": second_id},
+            ),
+            HTTP_ORIGIN=ORIGIN,
+        )
+        self.assertEqual(committed.status_code, 200)
+        self.assertEqual(ChapterBlock.objects.get(pk=second_id).payload["text"], "Otro bloque")
+        self.assertEqual(Chapter.objects.get(pk=chapter_id).revision, initial_revision + 2)
+        self.assertFalse(ChapterBlockDraft.objects.exists())
+
+    def test_concurrent_first_autosave_merges_into_the_winning_draft(self) -> None:
+        chapter_id = "bk-karamazov-ch-01"
+        block_id = "para-ch1-001"
+        # Another request starts the burst right after our lookup found no draft.
+        ChapterBlockDraft.objects.create(
+            block_id=block_id,
+            chapter_id=chapter_id,
+            changes={"text": "Otra pestaña.", "style": "narration"},
+        )
+        first = QuerySet.first
+        lookups = []
+
+        def stale_first(queryset):
+            lookups.append(queryset)
+            return None if len(lookups) == 1 else first(queryset)
+
+        with patch.object(QuerySet, "first", autospec=True, side_effect=stale_first):
+            draft = store_block_draft(chapter_id, block_id, {"text": "Esta pestaña."})
+
+        self.assertEqual(draft.changes, {"text": "Esta pestaña.", "style": "narration"})
+        self.assertEqual(ChapterBlockDraft.objects.get(pk=block_id).changes, draft.changes)
+
+    def test_idle_block_drafts_are_flushed(self) -> None:
+        chapter_id = "bk-karamazov-ch-01"
+        block_id = "para-ch1-001"
+        url = reverse(
+            "library-chapter-block-update",
+            kwargs={"chapter_id": chapter_id, "block_id": block_id},
+        )
+        response = self.client.patch(
+            url + "?autosave=1",
+            data={"text": "Borrador pendiente."},
+            content_type="application/json",
+            HTTP_ORIGIN=ORIGIN,
+        )
+        self.assertEqual(response.status_code, 202)
+
+        call_command("flush_block_drafts", stdout=io.StringIO())
+        self.assertTrue(ChapterBlockDraft.objects.filter(pk=block_id).exists())
+
+        detail_url = reverse("library-chapter-detail", kwargs={"chapter_id": chapter_id})
+        with override_settings(STUDIO_BLOCK_AUTOSAVE_WINDOW=0):
+            # Reads never write; only the flush command picks up idle drafts.
+            self.assertEqual(self.client.get(detail_url, HTTP_ORIGIN=ORIGIN).status_code, 200)
+            self.assertTrue(ChapterBlockDraft.objects.filter(pk=block_id).exists())
+            call_command("flush_block_drafts", stdout=io.StringIO())
+        detail = self.client.get(detail_url, HTTP_ORIGIN=ORIGIN)
+        texts = {block["id"]: block.get("text") for block in detail.json()["blocks"]}
+        self.assertEqual(texts[block_id], "Borrador pendiente.")
+        self.assertFalse(ChapterBlockDraft.objects.exists())
+
+        rejected = self.client.patch(
+            url + "?autosave=1",
+            data={"text": "Mover", "position": 3},
+            content_type="application/json",
+            HTTP_ORIGIN=ORIGIN,
+        )
+        self.assertEqual(rejected.status_code, 400)
+
+    def test_chapter_reads_report_pending_drafts(self) -> None:
+        chapter_id = "bk-karamazov-ch-01"
+        block_id = "para-ch1-001"
+        detail_url = reverse("library-chapter-detail", kwargs={"chapter_id": chapter_id})
+        before = self.client.get(detail_url, HTTP_ORIGIN=ORIGIN)
+        self.assertEqual(before.json()["pendingDrafts"], [])
+
+        response = self.client.patch(
+            reverse(
+                "library-chapter-block-update",
+                kwargs={"chapter_id": chapter_id, "block_id": block_id},
+            )
+            + "?autosave=1",
+            data={"text": "Borrador visible."},
+            content_type="application/json",
+            HTTP_ORIGIN=ORIGIN,
+        )
+        self.assertEqual(response.status_code, 202)
+
+        revalidated = self.client.get(
+            detail_url, HTTP_IF_NONE_MATCH=before["ETag"], HTTP_ORIGIN=ORIGIN
+        )
+        self.assertEqual(revalidated.status_code, 200)
+        self.assertNotEqual(revalidated["ETag"], before["ETag"])
+        drafts = revalidated.json()["pendingDrafts"]
+        self.assertEqual([draft["block"]["id"] for draft in drafts], [block_id])
+        self.assertEqual(drafts[0]["block"]["text"], "Borrador visible.")
+        self.assertEqual(revalidated.json()["revision"], before.json()["revision"])
+
+        streamed = self.client.get(detail_url + "?stream=1", HTTP_ORIGIN=ORIGIN)
+        body = json.loads(b"".join(streamed.streaming_content))
+        self.assertEqual(body["pendingDrafts"], drafts)
+
+        window = self.client.get(
+            reverse("library-chapter-blocks", kwargs={"chapter_id": chapter_id}),
+            HTTP_ORIGIN=ORIGIN,
+        )
+        self.assertEqual(window.json()["pendingDrafts"], drafts)
+
+    def test_create_block_delta_response_reports_shifted_blocks(self) -> None:
+        chapter_id = "bk-karamazov-ch-01"
+        sort_keys = dict(
+            ChapterBlock.objects.filter(chapter_id=chapter_id)
+            .order_by("sort_key", "id")
+            .values_list("id", "sort_key")
+        )
+        following_ids = list(sort_keys)[1:]
+
+        response = self.client.post(
+            reverse("library-chapter-blocks", kwargs={"chapter_id": chapter_id})
+            + "?response=delta",
+            data={"id": "para-delta-insert", "type": "paragraph", "text": "Nuevo", "position": 1},
+            content_type="application/json",
+            HTTP_ORIGIN=ORIGIN,
+        )
+
+        self.assertEqual(response.status_code, 201)
+        payload = response.json()
+        self.assertEqual([block["id"] for block in payload["blocks"]], ["para-delta-insert"])
+        self.assertEqual(payload["blocks"][0]["position"], 1)
+        shifted = {entry["id"]: entry["position"] for entry in payload["shiftedBlocks"]}
+        self.assertEqual(set(shifted), set(following_ids))
+        detail_positions = {
+            block["id"]: block["position"]
+            for block in self.client.get(
+                reverse("library-chapter-detail", kwargs={"chapter_id": chapter_id}),
+                HTTP_ORIGIN=ORIGIN,
+            ).json()["blocks"]
+        }
+        for block_id, position in shifted.items():
+            self.assertEqual(detail_positions[block_id], position)
+        # Only the new row was written; siblings keep their sort keys.
+        self.assertEqual(
+            dict(
+                ChapterBlock.objects.filter(pk__in=sort_keys).values_list("id", "sort_key")
+            ),
+            sort_keys,
+        )
+
+    def test_block_moves_and_deletes_keep_sibling_sort_keys(self) -> None:
+        chapter_id = "bk-karamazov-ch-01"
+        sort_keys = dict(
+            ChapterBlock.objects.filter(chapter_id=chapter_id)
+            .order_by("sort_key", "id")
+            .values_list("id", "sort_key")
+        )
+        ordered_ids = list(sort_keys)
+        moved_id, removed_id = ordered_ids[-1], ordered_ids[0]
+
+        in_place = update_chapter_block(chapter_id, ordered_ids[2], {"position": 2}, delta=True)
+        self.assertEqual(in_place["shiftedBlocks"], [])
+        self.assertEqual(
+            ChapterBlock.objects.get(pk=ordered_ids[2]).sort_key, sort_keys[ordered_ids[2]]
+        )
+
+        moved = update_chapter_block(chapter_id, moved_id, {"position": 1}, delta=True)
+        self.assertEqual(moved["blocks"][0]["position"], 1)
+        self.assertEqual(
+            [(entry["id"], entry["position"]) for entry in moved["shiftedBlocks"]],
+            [(block_id, index + 2) for index, block_id in enumerate(ordered_ids[1:-1])],
+        )
+
+        removed = delete_chapter_block(chapter_id, removed_id, delta=True)
+        self.assertEqual(removed["shiftedBlocks"][0], {"id": moved_id, "position": 0})
+
+        expected_ids = [moved_id, *ordered_ids[1:-1]]
+        detail = materialize_chapter_detail(chapter_id)
+        self.assertEqual(
+            [(block["id"], block["position"]) for block in detail["blocks"]],
+            [(block_id, index) for index, block_id in enumerate(expected_ids)],
+        )
+        current_keys = dict(
+            ChapterBlock.objects.filter(chapter_id=chapter_id).values_list("id", "sort_key")
+        )
+        self.assertEqual(
+            {block_id: current_keys[block_id] for block_id in ordered_ids[1:-1]},
+            {block_id: sort_keys[block_id] for block_id in ordered_ids[1:-1]},
+        )
+
+    def test_block_update_reuses_version_with_identical_content(self) -> None:
+        chapter_id = "bk-karamazov-ch-01"
+        block_id = "para-ch1-001"
+        original = ChapterBlockVersion.objects.get(block_id=block_id, version=1)
+        self.assertEqual(original.content_hash, payload_content_hash(original.payload))
+
+        update_chapter_block(chapter_id, block_id, {"text": "Texto intermedio"}, delta=True)
+        result = update_chapter_block(
+            chapter_id, block_id, {"text": original.payload["text"]}, delta=True
+        )
+
+        block = ChapterBlock.objects.get(pk=block_id)
+        self.assertEqual(block.active_version_id, original.id)
+        self.assertEqual(block.version_count, 2)
+        self.assertEqual(result["blocks"][0]["activeVersion"], 1)
+        self.assertEqual(ChapterBlockVersion.objects.filter(block_id=block_id).count(), 2)
+
+    @override_settings(
+        STUDIO_BLOCK_VERSION_STORAGE="delta",
+        STUDIO_BLOCK_VERSION_KEYFRAME_INTERVAL=3,
+    )
+    def test_block_versions_store_deltas_between_keyframes(self) -> None:
+        chapter_id = "bk-karamazov-ch-01"
+        block_id = "para-ch1-001"
+        base_text = ChapterBlock.objects.get(pk=block_id).payload["text"]
+        texts = [f"{base_text} Añadido {index}." for index in range(1, 5)]
+        for text in texts:
+            update_chapter_block(chapter_id, block_id, {"text": text}, delta=True)
+
+        stored = {
+            version.version: version
+            for version in ChapterBlockVersion.objects.filter(block_id=block_id)
+        }
+        self.assertEqual(
+            [stored[number].delta is None for number in sorted(stored)],
+            [True, False, False, True, False],
+        )
+        self.assertEqual(stored[2].payload, {})
+        self.assertEqual(stored[3].rendered_text, "")
+
+        response = self.client.get(
+            reverse(
+                "library-chapter-block-versions",
+                kwargs={"chapter_id": chapter_id, "block_id": block_id},
+            ),
+            HTTP_ORIGIN=ORIGIN,
+        )
+        listed = [item["payload"]["text"] for item in response.json()["versions"]]
+        self.assertEqual(listed, [base_text, *texts])
+
+        # Removing a base turns its dependent delta into a keyframe.
+        delete_chapter_block_version(chapter_id, block_id, 2)
+        version_three = ChapterBlockVersion.objects.get(block_id=block_id, version=3)
+        self.assertIsNone(version_three.delta)
+        self.assertEqual(version_three.payload["text"], texts[1])
+
+        result = update_chapter_block(chapter_id, block_id, {"version": 3}, delta=True)
+        self.assertEqual(result["blocks"][0]["text"], texts[1])
+        version_three.refresh_from_db()
+        self.assertEqual(version_three.rendered_text, texts[1])
+
+    def test_prune_block_versions_applies_retention_and_compacts(self) -> None:
+        chapter_id = "bk-karamazov-ch-01"
+        block_id = "para-ch1-001"
+        base_text = ChapterBlock.objects.get(pk=block_id).payload["text"]
+        texts = [f"{base_text} Revisión {index}." for index in range(1, 7)]
+        for text in texts:
+            update_chapter_block(chapter_id, block_id, {"text": text}, delta=True)
+        # Reactivate version 3 so it becomes the active one, then age every version.
+        update_chapter_block(chapter_id, block_id, {"version": 3}, delta=True)
+        long_ago = datetime.now(timezone.utc) - timedelta(days=90)
+        ChapterBlockVersion.objects.filter(block_id=block_id).update(
+            created_at=long_ago, activated_at=long_ago
+        )
+        initial_revision = Chapter.objects.get(pk=chapter_id).revision
+
+        call_command(
+            "prune_block_versions",
+            "--keep-last=2",
+            "--compact-above=4",
+            stdout=io.StringIO(),
+        )
+
+        block = ChapterBlock.objects.get(pk=block_id)
+        remaining = list(
+            ChapterBlockVersion.objects.filter(block_id=block_id).order_by("version")
+        )
+        self.assertEqual([version.version for version in remaining], [1, 2, 3])
+        self.assertEqual(block.version_count, 3)
+        self.assertEqual(block.active_version_number, 1)
+        self.assertEqual(block.active_version_id, remaining[0].id)
+        self.assertEqual(Chapter.objects.get(pk=chapter_id).revision, initial_revision + 1)
+
+        listed = list_chapter_block_versions(chapter_id, block_id)
+        self.assertEqual(
+            [item["payload"]["text"] for item in listed], [texts[1], texts[4], texts[5]]
+        )
+        self.assertEqual([item["isActive"] for item in listed], [True, False, False])
+
+    def test_block_mutations_maintain_word_and_token_counts(self) -> None:
+        chapter_id = "bk-karamazov-ch-01"
+        block_id = "para-ch1-001"
+        chapter = Chapter.objects.select_related("book").get(pk=chapter_id)
+        block = ChapterBlock.objects.select_related("active_version").get(pk=block_id)
+        previous_words = block.active_version.word_count
+        chapter_words, chapter_tokens = chapter.word_count, chapter.tokens
+        book_words = chapter.book.word_count
+
+        update_chapter_block(chapter_id, block_id, {"text": "Dos palabras"}, delta=True)
+        chapter.refresh_from_db()
+        chapter.book.refresh_from_db()
+        self.assertEqual(chapter.word_count, chapter_words - previous_words + 2)
+        self.assertEqual(chapter.book.word_count, book_words - previous_words + 2)
+        self.assertNotEqual(chapter.tokens, chapter_tokens)
+
+        response = self.client.delete(
+            reverse(
+                "library-chapter-block-update",
+                kwargs={"chapter_id": chapter_id, "block_id": block_id},
+            ),
+            HTTP_ORIGIN=ORIGIN,
+        )
+        self.assertEqual(response.status_code, 200)
+        chapter.refresh_from_db()
+        chapter.book.refresh_from_db()
+        self.assertEqual(chapter.word_count, chapter_words - previous_words)
+        self.assertEqual(chapter.book.word_count, book_words - previous_words)
+
+    def test_block_operations_apply_in_one_transaction(self) -> None:
+        chapter_id = "bk-karamazov-ch-01"
+        ordered_ids = list(
+            ChapterBlock.objects.filter(chapter_id=chapter_id)
+            .order_by("sort_key", "id")
+            .values_list("id", flat=True)
+        )
+        initial_revision = Chapter.objects.get(pk=chapter_id).revision
+
+        response = self.client.post(
+            reverse("library-chapter-block-operations", kwargs={"chapter_id": chapter_id}),
+            data={
+                "operations": [
+                    {
+                        "op": "create",
+                        "block": {"id": "para-batch", "type": "paragraph", "text": "Nuevo"},
+                    },
+                    {"op": "update", "blockId": "para-batch", "changes": {"text": "Editado"}},
+                    {"op": "move", "blockId": "para-batch", "position": 0},
+                    {"op": "delete", "blockId": ordered_ids[-1]},
+                    {"op": "move", "blockId": ordered_ids[0], "position": 99},
+                ]
+            },
+            content_type="application/json",
+            HTTP_ORIGIN=ORIGIN,
+        )
+
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        expected_ids = ["para-batch", *ordered_ids[1:-1], ordered_ids[0]]
+        self.assertEqual([block["id"] for block in payload["blocks"]], expected_ids)
+        self.assertEqual(
+            [block["position"] for block in payload["blocks"]], list(range(len(expected_ids)))
+        )
+        self.assertEqual(payload["blocks"][0]["text"], "Editado")
+        self.assertEqual(payload["blocks"][0]["versionCount"], 2)
+        self.assertEqual(payload["revision"], initial_revision + 1)
+
+    def test_block_operations_roll_back_on_error(self) -> None:
+        chapter_id = "bk-karamazov-ch-01"
+        block_count = ChapterBlock.objects.filter(chapter_id=chapter_id).count()
+
+        response = self.client.post(
+            reverse("library-chapter-block-operations", kwargs={"chapter_id": chapter_id}),
+            data={
+                "operations": [
+                    {"op": "create", "block": {"id": "para-rollback", "type": "paragraph"}},
+                    {"op": "delete", "blockId": "missing-block"},
+                ]
+            },
+            content_type="application/json",
+            HTTP_ORIGIN=ORIGIN,
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Operación 2", response.json()["operations"])
+        self.assertFalse(ChapterBlock.objects.filter(pk="para-rollback").exists())
+        self.assertEqual(ChapterBlock.objects.filter(chapter_id=chapter_id).count(), block_count)
+
+    def test_block_transfer_moves_range_with_versions_and_counters(self) -> None:
+        source_id, target_id = "bk-karamazov-ch-01", "bk-karamazov-ch-02"
+        update_chapter_block(source_id, "para-ch1-001", {"text": "Texto revisado."})
+        ordered_ids = list(
+            ChapterBlock.objects.filter(chapter_id=source_id)
+            .order_by("sort_key", "id")
+            .values_list("id", flat=True)
+        )
+        moved_ids = ordered_ids[:2]
+        version_count = ChapterBlockVersion.objects.filter(block_id__in=moved_ids).count()
+        source_before = Chapter.objects.get(pk=source_id)
+        target_before = Chapter.objects.get(pk=target_id)
+
+        response = self.client.post(
+            reverse("library-chapter-block-transfers", kwargs={"chapter_id": source_id}),
+            data={
+                "targetChapterId": target_id,
+                "firstBlockId": moved_ids[0],
+                "lastBlockId": moved_ids[-1],
+                "position": 0,
+            },
+            content_type="application/json",
+            HTTP_ORIGIN=ORIGIN,
+        )
+
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        self.assertEqual(payload["blockIds"], moved_ids)
+        self.assertEqual([block["id"] for block in payload["target"]["blocks"][:2]], moved_ids)
+        self.assertNotIn(moved_ids[0], [block["id"] for block in payload["source"]["blocks"]])
+        self.assertEqual(
+            ChapterBlockVersion.objects.filter(
+                block_id__in=moved_ids, block__chapter_id=target_id
+            ).count(),
+            version_count,
+        )
+        source_after = Chapter.objects.get(pk=source_id)
+        target_after = Chapter.objects.get(pk=target_id)
+        self.assertEqual(
+            source_before.word_count + target_before.word_count,
+            source_after.word_count + target_after.word_count,
+        )
+        self.assertGreater(target_after.word_count, target_before.word_count)
+        self.assertEqual(payload["target"]["revision"], target_before.revision + 1)
+
+    def test_block_transfer_copies_history_and_rejects_reversed_range(self) -> None:
+        chapter_id = "bk-karamazov-ch-01"
+        block_id = "para-ch1-001"
+        update_chapter_block(chapter_id, block_id, {"text": "Texto revisado."})
+        url = reverse("library-chapter-block-transfers", kwargs={"chapter_id": chapter_id})
+
+        response = self.client.post(
+            url,
+            data={"mode": "copy", "targetChapterId": chapter_id, "firstBlockId": block_id},
+            content_type="application/json",
+            HTTP_ORIGIN=ORIGIN,
+        )
+
+        self.assertEqual(response.status_code, 200)
+        (copy_id,) = response.json()["blockIds"]
+        self.assertNotEqual(copy_id, block_id)
+        copied = ChapterBlock.objects.get(pk=copy_id)
+        self.assertEqual(copied.version_count, 2)
+        self.assertEqual(copied.active_version.version, 2)
+        self.assertEqual(response.json()["target"]["blocks"][-1]["text"], "Texto revisado.")
+        self.assertTrue(ChapterBlock.objects.filter(pk=block_id, chapter_id=chapter_id).exists())
+
+        reversed_range = self.client.post(
+            url,
+            data={"targetChapterId": chapter_id, "firstBlockId": copy_id, "lastBlockId": block_id},
+            content_type="application/json",
+            HTTP_ORIGIN=ORIGIN,
+        )
+        self.assertEqual(reversed_range.status_code, 400)
+
+    @override_settings(STUDIO_BLOCK_VERSION_STORAGE="delta")
+    def test_block_transfer_copy_gives_dialogue_turns_new_ids(self) -> None:
+        chapter_id = "bk-karamazov-ch-01"
+        block_id = "dialog-ch1-001"
+        turns = ChapterBlock.objects.get(pk=block_id).payload["turns"]
+        update_chapter_block(chapter_id, block_id, {"turns": [*turns, {"utterance": "—Basta."}]})
+        source_turn_ids = {
+            turn["id"] for turn in ChapterBlock.objects.get(pk=block_id).payload["turns"]
+        }
+
+        response = self.client.post(
+            reverse("library-chapter-block-transfers", kwargs={"chapter_id": chapter_id}),
+            data={"mode": "copy", "targetChapterId": chapter_id, "firstBlockId": block_id},
+            content_type="application/json",
+            HTTP_ORIGIN=ORIGIN,
+        )
+
+        self.assertEqual(response.status_code, 200)
+        (copy_id,) = response.json()["blockIds"]
+        copied = ChapterBlock.objects.get(pk=copy_id)
+        copied_turn_ids = [turn["id"] for turn in copied.payload["turns"]]
+        self.assertEqual(len(copied_turn_ids), len(source_turn_ids))
+        self.assertTrue(all(turn_id.startswith(f"{copy_id}-turn-") for turn_id in copied_turn_ids))
+        versions = list(ChapterBlockVersion.objects.filter(block_id=copy_id))
+        self.assertIsNotNone(max(versions, key=lambda version: version.version).delta)
+        payloads = version_payloads(versions)
+        for version in versions:
+            self.assertEqual(version.content_hash, payload_content_hash(payloads[version.version]))
+            self.assertFalse(
+                source_turn_ids & {turn["id"] for turn in payloads[version.version]["turns"]}
+            )
+        self.assertEqual(payloads[copied.active_version_number], copied.payload)
+
+    def test_block_window_pages_by_position_cursor(self) -> None:
+        chapter_id = "bk-karamazov-ch-01"
+        ordered_ids = list(
+            ChapterBlock.objects.filter(chapter_id=chapter_id)
+            .order_by("sort_key", "id")
+            .values_list("id", flat=True)
+        )
+        url = reverse("library-chapter-blocks", kwargs={"chapter_id": chapter_id})
+
+        first = self.client.get(url, {"limit": 2}, HTTP_ORIGIN=ORIGIN)
+        self.assertEqual(first.status_code, 200)
+        first_page = first.json()
+        self.assertEqual([block["id"] for block in first_page["blocks"]], ordered_ids[:2])
+        self.assertIsNone(first_page["previousCursor"])
+        self.assertIsNotNone(first_page["nextCursor"])
+        self.assertIn("activeVersion", first_page["blocks"][0])
+        self.assertIn("versionCount", first_page["blocks"][0])
+
+        second = self.client.get(
+            url, {"limit": 2, "after": first_page["nextCursor"]}, HTTP_ORIGIN=ORIGIN
+        ).json()
+        self.assertEqual([block["id"] for block in second["blocks"]], ordered_ids[2:4])
+        self.assertIsNotNone(second["previousCursor"])
+
+        back = self.client.get(
+            url, {"limit": 2, "before": second["previousCursor"]}, HTTP_ORIGIN=ORIGIN
+        ).json()
+        self.assertEqual(back["blocks"], first_page["blocks"])
+
+    def test_block_window_cursor_handles_tied_and_renumbered_keys(self) -> None:
+        chapter_id = "bk-karamazov-ch-01"
+        # Unlocked concurrent inserts can land on the same key; ties order by id.
+        ChapterBlock.objects.filter(chapter_id=chapter_id).update(sort_key=0)
+        ordered_ids = list(
+            ChapterBlock.objects.filter(chapter_id=chapter_id)
+            .order_by("sort_key", "id")
+            .values_list("id", flat=True)
+        )
+        url = reverse("library-chapter-blocks", kwargs={"chapter_id": chapter_id})
+
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 2} if cursor is None else {"limit": 2, "after": cursor}
+            page = self.client.get(url, params, HTTP_ORIGIN=ORIGIN).json()
+            seen.extend(block["id"] for block in page["blocks"])
+            cursor = page["nextCursor"]
+            if cursor is None:
+                break
+            if len(seen) == 2:
+                renumber_chapter_blocks(chapter_id)
+        self.assertEqual(seen, ordered_ids)
+
+        back = self.client.get(
+            url, {"limit": 2, "before": f"0:{ordered_ids[2]}"}, HTTP_ORIGIN=ORIGIN
+        ).json()
+        self.assertEqual([block["id"] for block in back["blocks"]], ordered_ids[:2])
+        self.assertIsNone(back["previousCursor"])
+
+        invalid = self.client.get(url, {"after": "3"}, HTTP_ORIGIN=ORIGIN)
+        self.assertEqual(invalid.status_code, 400)
+
+    def test_block_window_rejects_both_cursors_and_missing_chapter(self) -> None:
+        url = reverse("library-chapter-blocks", kwargs={"chapter_id": "bk-karamazov-ch-01"})
+        response = self.client.get(url, {"after": 1, "before": 3}, HTTP_ORIGIN=ORIGIN)
+        self.assertEqual(response.status_code, 400)
+
+        missing = self.client.get(
+            reverse("library-chapter-blocks", kwargs={"chapter_id": "missing"}),
+            HTTP_ORIGIN=ORIGIN,
+        )
+        self.assertEqual(missing.status_code, 404)
+
     def test_delete_block_last_version_is_rejected(self) -> None:
         chapter_id = "bk-karamazov-ch-01"
         block_id = "para-ch1-001"
@@ -557,6 +1668,302 @@ class ChapterEndpointTests(TestCase):
         self.assertEqual(response.status_code, 400)
 
 
+    def test_chapter_detail_stream_matches_buffered_response(self) -> None:
+        chapter_id = "bk-karamazov-ch-01"
+        url = reverse("library-chapter-detail", kwargs={"chapter_id": chapter_id})
+        buffered = self.client.get(url, HTTP_ORIGIN=ORIGIN)
+        streamed = self.client.get(url, {"stream": "true"}, HTTP_ORIGIN=ORIGIN)
+
+        self.assertEqual(streamed.status_code, 200)
+        self.assertTrue(streamed.streaming)
+        self.assertNotIn("ETag", streamed)
+        self.assertEqual(streamed["Cache-Control"], "no-store")
+        body = json.loads(b"".join(streamed.streaming_content))
+        self.assertEqual(body, buffered.json())
+        self.assertEqual(list(body), list(buffered.json()))
+
+    def test_chapter_detail_stream_aborts_when_the_chapter_changes(self) -> None:
+        chapter_id = "bk-karamazov-ch-01"
+        chunks = iter_chapter_detail_json(materialize_chapter_header(chapter_id))
+        for chunk in chunks:
+            if chunk == ',"paragraphs":':
+                break
+
+        update_chapter_block(chapter_id, "para-ch1-001", {"text": "Editado a mitad."})
+        with self.assertRaises(ChapterChangedDuringStreamError):
+            list(chunks)
+
+
+class ChapterMaterializerTests(TestCase):
+    def test_materialized_detail_matches_model_payload(self) -> None:
+        chapter = Chapter.objects.select_related("book").get(pk="bk-karamazov-ch-01")
+        expected = chapter.to_detail_payload()
+
+        with self.assertNumQueries(2):
+            detail = materialize_chapter_detail(chapter.id)
+
+        self.assertEqual(detail, expected)
+
+    def test_block_versions_store_rendered_text(self) -> None:
+        chapter_id = "bk-karamazov-ch-01"
+        update_chapter_block(
+            chapter_id,
+            "para-ch1-001",
+            {"text": "Una frase de cinco palabras."},
+            delta=True,
+        )
+        version = ChapterBlock.objects.get(pk="para-ch1-001").active_version
+        self.assertEqual(version.rendered_text, "Una frase de cinco palabras.")
+        self.assertEqual(version.word_count, 5)
+
+        ChapterBlockVersion.objects.filter(pk=version.pk).update(rendered_text="Precalculado")
+        detail = materialize_chapter_detail(chapter_id)
+        self.assertIn("Precalculado", detail["paragraphs"])
+        self.assertNotIn("Una frase de cinco palabras.", detail["content"])
+
+    def test_materialized_detail_missing_chapter(self) -> None:
+        self.assertIsNone(materialize_chapter_detail("missing"))
+
+    def test_chapter_snapshot_serves_reads_until_revision_changes(self) -> None:
+        chapter_id = "bk-karamazov-ch-01"
+        first = get_chapter_detail(chapter_id)
+        snapshot = ChapterSnapshot.objects.get(pk=chapter_id)
+        self.assertEqual(snapshot.revision, first["revision"])
+
+        with self.assertNumQueries(1):
+            cached = get_chapter_detail(chapter_id)
+        self.assertEqual(cached, first)
+
+        update_chapter_block(chapter_id, "para-ch1-001", {"text": "Texto nuevo"}, delta=True)
+        refreshed = get_chapter_detail(chapter_id)
+        self.assertEqual(refreshed["revision"], first["revision"] + 1)
+        block = next(item for item in refreshed["blocks"] if item["id"] == "para-ch1-001")
+        self.assertEqual(block["text"], "Texto nuevo")
+        self.assertIn("Texto nuevo", refreshed["content"])
+
+
+class RepresentationParityTests(TestCase):
+    def assertMatchesSerializer(self, serializer_class, instance, represent) -> None:
+        expected = serializer_class(instance).data
+        actual = represent(instance)
+        self.assertEqual(actual, expected)
+        self.assertEqual(list(actual), list(expected))
+
+    def test_chapter_detail_matches_serializer_for_every_chapter(self) -> None:
+        for chapter_id in Chapter.objects.values_list("id", flat=True):
+            detail = get_chapter_detail(chapter_id)
+            with self.subTest(chapter_id=chapter_id):
+                self.assertMatchesSerializer(
+                    ChapterDetailSerializer, detail, represent_chapter_detail
+                )
+
+    def test_library_books_match_serializer(self) -> None:
+        payload = {"books": get_library_books()}
+        self.assertMatchesSerializer(LibraryBooksResponseSerializer, payload, represent_library_books)
+
+        Book.objects.all().delete()
+        sample = {"books": get_library_books()}
+        self.assertMatchesSerializer(LibraryBooksResponseSerializer, sample, represent_library_books)
+
+    def test_block_reshaping_matches_serializer(self) -> None:
+        blocks = [
+            {"id": "p", "type": "paragraph", "position": 0, "text": "Hola", "tags": ["a"]},
+            {
+                "id": "d",
+                "type": "dialogue",
+                "position": 1,
+                "turns": [{"id": "t1", "utterance": "¿Sí?", "speakerName": None}],
+            },
+            {"id": "m1", "type": "metadata", "position": 2, "kind": "context"},
+            {
+                "id": "m2",
+                "type": "metadata",
+                "position": 3,
+                "povCharacterName": "Aliosha",
+                "themeTags": ["fe", None],
+            },
+            {"id": "m3", "type": "metadata", "position": 4, "kind": "chapter_header"},
+            {
+                "id": "s1",
+                "type": "scene_boundary",
+                "position": 5,
+                "mood": "tenso",
+                "activeVersion": 2,
+                "versionCount": 3,
+            },
+            {
+                "id": "s2",
+                "type": "scene_boundary",
+                "position": "6",
+                "sceneDetails": {"mood": "calmo"},
+            },
+        ]
+        for block in blocks:
+            with self.subTest(block_id=block["id"]):
+                self.assertMatchesSerializer(ChapterBlockSerializer, block, represent_chapter_block)
+
+    def test_compile_rejects_unsupported_fields(self) -> None:
+        class FlagSerializer(serializers.Serializer):
+            flag = serializers.BooleanField()
+
+        with self.assertRaises(TypeError):
+            compile_serializer(FlagSerializer)
+
+
+class FastJSONBackendTests(TestCase):
+    def test_renderer_output_matches_stock_renderer(self) -> None:
+        data = {
+            "text": "Ñandú — «cita»\u2028línea\u2029fin </script>",
+            "when": datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+            "day": date(2024, 5, 1),
+            "amount": Decimal("12.50"),
+            "uuid": UUID("12345678-1234-5678-1234-567812345678"),
+            "huge": 2**70,
+            "nested": [{"a": None, "b": True, "c": 1.5}],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+    def test_renderer_matches_stock_renderer_for_floats(self) -> None:
+        data = {"values": [1e16, 1e-7, 2.5e-5, 0.1, Decimal("1E+20")], "nested": {"x": 1e300}}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertIn(b"1e+16", FastJSONRenderer().render(data))
+        for value in (1e16, 1e22, 1e-7, -1e-300, 0.00001, 2.5e-5, 1e300, 0.1):
+            self.assertEqual(FastJSONRenderer().render([value]), JSONRenderer().render([value]))
+
+        for value in (float("nan"), float("inf"), float("-inf")):
+            with self.assertRaises(ValueError):
+                JSONRenderer().render({"value": value})
+            self.assertEqual(FastJSONRenderer().render({"value": [value]}), b'{"value":[null]}')
+
+    def test_parser_matches_stock_parser(self) -> None:
+        body = '{"text": "¿Qué?", "items": [1, 2.5, null], "escaped": "\\ud83d\\ude00"}'
+        context = {"encoding": "utf-8"}
+        expected = JSONParser().parse(io.BytesIO(body.encode()), parser_context=context)
+        parsed = FastJSONParser().parse(io.BytesIO(body.encode()), parser_context=context)
+        self.assertEqual(parsed, expected)
+
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"broken": '), parser_context=context)
+
+
+class TokenEstimatorTests(TestCase):
+    def test_heuristic_counts_spanish_prose_and_backend_is_pluggable(self) -> None:
+        self.assertEqual(estimate_tokens(""), 0)
+        # Five punctuation marks plus Quién 2, anda 1, ahí 1, preguntó 3, Aliosha 2.
+        self.assertEqual(heuristic_token_count("—¿Quién anda ahí? —preguntó Aliosha."), 14)
+        self.assertEqual(heuristic_token_count("1879"), 2)
+
+        text = "Alekséi Fiódorovich Karamázov era el tercer hijo de un terrateniente. " * 3
+        with override_settings(STUDIO_TOKENIZER="builtins.len"):
+            self.assertEqual(estimate_tokens(text), len(text))
+        self.assertEqual(estimate_tokens(text), heuristic_token_count(text))
+
+    def test_block_versions_and_context_items_store_estimates(self) -> None:
+        chapter_id = "bk-karamazov-ch-01"
+        update_chapter_block(chapter_id, "para-ch1-001", {"text": "Texto medido localmente."})
+        version = ChapterBlock.objects.select_related("active_version").get(
+            pk="para-ch1-001"
+        ).active_version
+        self.assertEqual(version.token_count, estimate_tokens(version.rendered_text))
+
+        response = self.client.post(
+            reverse("library-book-context-items", kwargs={"book_id": "bk-karamazov"}),
+            data={
+                "sectionSlug": "characters",
+                "type": "character",
+                "id": "char-measured",
+                "name": "Smerdiakov",
+                "summary": "Criado de la casa Karamázov.",
+            },
+            content_type="application/json",
+            HTTP_ORIGIN=ORIGIN,
+        )
+        self.assertEqual(response.status_code, 201)
+        item = LibraryContextItem.objects.get(item_id="char-measured")
+        self.assertEqual(item.tokens, estimate_tokens("Smerdiakov\nCriado de la casa Karamázov."))
+
+        # Updates follow the create rules: an explicit count wins, otherwise it is measured.
+        def update(**fields) -> int:
+            update_book_context_items(
+                "bk-karamazov",
+                [{"id": "char-measured", "sectionSlug": "characters", **fields}],
+            )
+            return LibraryContextItem.objects.get(item_id="char-measured").tokens
+
+        self.assertEqual(update(summary="Criado.", tokens=42), 42)
+        self.assertEqual(update(tokens=7), 7)
+        self.assertEqual(
+            update(summary="Criado y cocinero."),
+            estimate_tokens("Smerdiakov\nCriado y cocinero."),
+        )
+
+
+class ContextPackingTests(TestCase):
+    def test_packer_ranks_trims_and_reports_dropped_items(self) -> None:
+        filler = "Detalle histórico extenso sobre la familia y sus costumbres. " * 12
+        render = render_paragraph_context_item
+        items = [
+            {"id": "world-town", "type": "world", "name": "Pueblo", "description": filler},
+            {"id": "char-dmitri", "type": "character", "name": "Dmitri", "summary": filler},
+            {"id": "style-tone", "type": "styleTone", "name": "Tono", "description": "Sobrio."},
+            {"id": "ch-note", "type": "chapter", "title": "Nota", "chapterId": "bk-ch"},
+            {"id": "char-alyosha", "type": "character", "name": "Aliosha", "chapterId": "bk-ch"},
+        ]
+        costs = {item["id"]: context_item_tokens(item, render) for item in items}
+        # Only the rendered entry is charged: facts never reach the paragraph prompt.
+        self.assertEqual(costs["ch-note"], 0)
+        self.assertEqual(
+            context_item_tokens({**items[1], "facts": filler}, render), costs["char-dmitri"]
+        )
+        budget = costs["char-alyosha"] + costs["style-tone"] + costs["char-dmitri"] + 40
+
+        packed = pack_context_items(
+            items, budget=budget, render=render, focus_text="—Dmitri, ¡espera!"
+        )
+
+        self.assertEqual(
+            [item["id"] for item in packed["items"]],
+            ["world-town", "char-dmitri", "style-tone", "char-alyosha"],
+        )
+        self.assertEqual(packed["trimmed"], ["world-town"])
+        self.assertTrue(packed["items"][0]["description"].endswith("…"))
+        self.assertEqual(
+            packed["tokens"],
+            sum(estimate_tokens(render(item)) for item in packed["items"]),
+        )
+        self.assertLessEqual(packed["tokens"], budget)
+        self.assertEqual(packed["dropped"], [])
+
+        tight = pack_context_items(items, budget=costs["char-alyosha"] + 2, render=render)
+        self.assertEqual([item["id"] for item in tight["items"]], ["char-alyosha"])
+        self.assertEqual(
+            {entry["id"] for entry in tight["dropped"]}, {"world-town", "char-dmitri", "style-tone"}
+        )
+
+    def test_prompt_endpoint_reports_context_budget(self) -> None:
+        url = reverse(
+            "library-chapter-paragraph-suggestion-prompt",
+            kwargs={"chapter_id": "bk-karamazov-ch-01"},
+        )
+        with override_settings(STUDIO_CONTEXT_TOKEN_BUDGETS={"paragraph": 0}):
+            response = self.client.get(url, HTTP_ORIGIN=ORIGIN)
+
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        self.assertEqual(payload["context"]["budget"], 0)
+        self.assertEqual(payload["context"]["included"], [])
+        self.assertGreater(len(payload["context"]["dropped"]), 0)
+        self.assertEqual(payload["tokens"], estimate_tokens(payload["prompt"]))
+
+        with override_settings(STUDIO_CONTEXT_TOKEN_BUDGETS={"paragraph": 60}):
+            partial = self.client.get(url, HTTP_ORIGIN=ORIGIN).json()
+        omitted = len(partial["context"]["dropped"])
+        self.assertGreater(omitted, 0)
+        self.assertGreater(len(partial["context"]["included"]), 0)
+        self.assertIn(f"- ... y {omitted} elementos adicionales.", partial["prompt"])
+
+
 class EditorEndpointTests(TestCase):
     def test_editor_returns_blocks(self) -> None:
         response = self.client.get(reverse("editor"), HTTP_ORIGIN=ORIGIN)
@@ -568,7 +1975,7 @@ class EditorEndpointTests(TestCase):
         self.assertGreater(len(data["paragraphs"]), 0)
         self.assertIn("blocks", data)
         self.assertGreater(len(data["blocks"]), 0)
-        self.assertIn("tokens", data)
+        self.assertEqual(data["tokens"], Chapter.objects.get(pk=data["chapterId"]).tokens)
         self.assertEqual(response["Access-Control-Allow-Origin"], ORIGIN)
 
 
@@ -0,0 +1,93 @@
+"""Offline token estimation for block text, context items and prompts.
+
+The default backend is a heuristic calibrated on Spanish prose against the BPE
+vocabularies of current chat models, which land around 1.5 tokens per Spanish word:
+
+* letter runs cost one token per four characters (rounded up), with non-ASCII letters
+  (``á``, ``ñ``, ``ü``...) counted twice since they usually break merges;
+* digit runs cost one token per three digits;
+* every other non-space character (punctuation, dialogue dashes, quotes) is one token.
+
+Set ``STUDIO_TOKENIZER`` to the dotted path of a callable ``(text: str) -> int`` to use a
+real tokenizer instead. Results are memoized by content hash per backend, so estimating
+unchanged text again is a dictionary lookup.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from collections import OrderedDict
+from functools import lru_cache
+from threading import Lock
+from typing import Callable, Optional, Tuple
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+__all__ = [
+    "TokenCounter",
+    "estimate_tokens",
+    "heuristic_token_count",
+    "token_counter",
+]
+
+TokenCounter = Callable[[str], int]
+
+_PIECES = re.compile(r"[^\W\d_]+|\d+|[^\w\s]|_")
+_CACHE_SIZE = 8192
+# Hashing costs more than estimating very short strings, which are not memoized.
+_MIN_CACHED_LENGTH = 64
+
+_cache: "OrderedDict[Tuple[str, bytes], int]" = OrderedDict()
+_cache_lock = Lock()
+
+
+def heuristic_token_count(text: str) -> int:
+    """Estimate the token count of ``text`` without any tokenizer vocabulary."""
+    tokens = 0
+    for match in _PIECES.finditer(text):
+        piece = match.group()
+        if piece[0].isalpha():
+            weight = len(piece) + sum(1 for char in piece if ord(char) > 127)
+            tokens += (weight + 3) // 4
+        elif piece[0].isdigit():
+            tokens += (len(piece) + 2) // 3
+        else:
+            tokens += 1
+    return tokens
+
+
+@lru_cache(maxsize=8)
+def _load_counter(path: Optional[str]) -> TokenCounter:
+    if not path:
+        return heuristic_token_count
+    return import_string(path)
+
+
+def token_counter() -> Tuple[str, TokenCounter]:
+    """Return the configured backend as ``(dotted path or "heuristic", callable)``."""
+    path = getattr(settings, "STUDIO_TOKENIZER", None)
+    return path or "heuristic", _load_counter(path)
+
+
+def estimate_tokens(text: str) -> int:
+    """Return the estimated model token count of ``text`` with the configured backend."""
+    if not text:
+        return 0
+    backend, count = token_counter()
+    if len(text) < _MIN_CACHED_LENGTH:
+        return int(count(text))
+
+    key = (backend, hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest())
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return cached
+    tokens = int(count(text))
+    with _cache_lock:
+        _cache[key] = tokens
+        if len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return tokens
@@ -2,8 +2,11 @@ from django.urls import path
 
 from .views import (
     BlockConversionApplyView,
+    ChapterBlockCommitView,
     ChapterBlockConversionSuggestionView,
     ChapterBlockListView,
+    ChapterBlockOperationsView,
+    ChapterBlockTransferView,
     ChapterBlockUpdateView,
     ChapterBlockVersionDetailView,
     ChapterBlockVersionListView,
@@ -19,6 +22,8 @@ from .views import (
     LibraryBookContextItemsView,
     LibraryBookContextView,
     LibraryBookDetailView,
+    LibraryBookExportView,
+    LibraryBookImportView,
     LibraryBooksView,
 )
 
@@ -49,6 +54,16 @@ urlpatterns = [
         LibraryBookChaptersView.as_view(),
         name="library-book-chapters",
     ),
+    path(
+        "library/books/<str:book_id>/import/",
+        LibraryBookImportView.as_view(),
+        name="library-book-import",
+    ),
+    path(
+        "library/books/<str:book_id>/export/",
+        LibraryBookExportView.as_view(),
+        name="library-book-export",
+    ),
     path(
         "library/chapters/<str:chapter_id>/",
         ChapterDetailView.as_view(),
@@ -59,11 +74,26 @@ urlpatterns = [
         ChapterBlockListView.as_view(),
         name="library-chapter-blocks",
     ),
+    path(
+        "library/chapters/<str:chapter_id>/block-operations/",
+        ChapterBlockOperationsView.as_view(),
+        name="library-chapter-block-operations",
+    ),
+    path(
+        "library/chapters/<str:chapter_id>/block-transfers/",
+        ChapterBlockTransferView.as_view(),
+        name="library-chapter-block-transfers",
+    ),
     path(
         "library/chapters/<str:chapter_id>/blocks/<str:block_id>/",
         ChapterBlockUpdateView.as_view(),
         name="library-chapter-block-update",
     ),
+    path(
+        "library/chapters/<str:chapter_id>/blocks/<str:block_id>/commit/",
+        ChapterBlockCommitView.as_view(),
+        name="library-chapter-block-commit",
+    ),
     path(
         "library/chapters/<str:chapter_id>/blocks/<str:block_id>/versions/",
         ChapterBlockVersionListView.as_view(),
@@ -1,6 +1,9 @@
 from ..services import generate_paragraph_suggestion
 from .chapters import (
+    ChapterBlockCommitView,
     ChapterBlockListView,
+    ChapterBlockOperationsView,
+    ChapterBlockTransferView,
     ChapterBlockUpdateView,
     ChapterBlockVersionDetailView,
     ChapterBlockVersionListView,
@@ -14,6 +17,8 @@ from .library import (
     LibraryBookContextItemsView,
     LibraryBookContextView,
     LibraryBookDetailView,
+    LibraryBookExportView,
+    LibraryBookImportView,
     LibraryBooksView,
 )
 from .suggestions import (
@@ -26,7 +31,10 @@ from .suggestions import (
 )
 
 __all__ = [
+    "ChapterBlockCommitView",
     "ChapterBlockListView",
+    "ChapterBlockOperationsView",
+    "ChapterBlockTransferView",
     "ChapterBlockUpdateView",
     "ChapterBlockVersionListView",
     "ChapterBlockVersionDetailView",
@@ -44,6 +52,8 @@ __all__ = [
     "LibraryBookContextItemsView",
     "LibraryBookContextView",
     "LibraryBookDetailView",
+    "LibraryBookExportView",
+    "LibraryBookImportView",
     "LibraryBooksView",
     "generate_paragraph_suggestion",
 ]
@@ -1,38 +1,71 @@
 from __future__ import annotations
 
 from django.http import Http404
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
 from rest_framework import status
 from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from ..data import (
+    ChapterBlockConflictError,
+    apply_chapter_block_operations,
+    autosave_chapter_block,
+    commit_chapter_block_draft,
     create_chapter_block,
     delete_chapter_block,
     delete_chapter_block_version,
     get_book_context_sections,
+    get_chapter_block,
+    get_chapter_block_drafts,
+    get_chapter_block_window,
     get_chapter_detail,
+    get_chapter_revision,
     list_chapter_block_versions,
+    transfer_chapter_blocks,
     update_chapter,
     update_chapter_block,
     update_chapter_context_visibility,
 )
+from ..data.materializer import materialize_chapter_blocks, materialize_chapter_header
+from ..models import Chapter
+from ..representations import represent_chapter_detail
 from ..serializers import (
+    ChapterBlockAutosaveSerializer,
+    ChapterBlockConflictSerializer,
     ChapterBlockCreateSerializer,
+    ChapterBlockDeltaSerializer,
+    ChapterBlockOperationsRequestSerializer,
+    ChapterBlockTransferRequestSerializer,
+    ChapterBlockTransferSerializer,
     ChapterBlockUpdateSerializer,
     ChapterBlockVersionListSerializer,
+    ChapterBlockWindowQuerySerializer,
+    ChapterBlockWindowSerializer,
     ChapterContextVisibilityUpdateRequestSerializer,
     ChapterDetailSerializer,
     ChapterSummarySerializer,
     ChapterUpsertSerializer,
     LibraryResponseSerializer,
 )
-from .utils import flatten_structured_block_fields
+from .streaming import iter_chapter_detail_json, streaming_json_response
+from .utils import (
+    build_chapter_etag,
+    etag_matches,
+    flatten_structured_block_fields,
+    if_match_revision,
+    wants_autosave,
+    wants_delta_response,
+    wants_streaming_response,
+)
 
 __all__ = [
     "ChapterDetailView",
+    "ChapterBlockCommitView",
     "ChapterBlockListView",
+    "ChapterBlockOperationsView",
+    "ChapterBlockTransferView",
     "ChapterBlockUpdateView",
     "ChapterBlockVersionListView",
     "ChapterBlockVersionDetailView",
@@ -40,19 +73,109 @@ __all__ = [
 ]
 
 
+DELTA_RESPONSE_PARAMETER = OpenApiParameter(
+    name="response",
+    type=OpenApiTypes.STR,
+    location=OpenApiParameter.QUERY,
+    required=False,
+    enum=["full", "delta"],
+    description=(
+        "Use 'delta' to receive only the changed and shifted blocks plus the new chapter "
+        "revision (ChapterBlockDelta) instead of the full chapter detail."
+    ),
+)
+
+
+IF_MATCH_PARAMETER = OpenApiParameter(
+    name="If-Match",
+    type=OpenApiTypes.STR,
+    location=OpenApiParameter.HEADER,
+    required=False,
+    description=(
+        "Block revision the edit is based on. When the block has moved on, the update is "
+        "rejected with 409 and the current block state."
+    ),
+)
+
+
+AUTOSAVE_PARAMETER = OpenApiParameter(
+    name="autosave",
+    type=OpenApiTypes.BOOL,
+    location=OpenApiParameter.QUERY,
+    required=False,
+    description=(
+        "Buffer the content changes instead of writing a block version. Rapid autosaves "
+        "of a block are merged into one version, written when another block is edited, "
+        "on commit, or once the autosave window has passed. Responds 202 with "
+        "ChapterBlockAutosave. Until written, chapter detail and block window responses "
+        "list the buffered block in pendingDrafts, and a regular edit of the block "
+        "includes them."
+    ),
+)
+
+
+STREAM_RESPONSE_PARAMETER = OpenApiParameter(
+    name="stream",
+    type=OpenApiTypes.BOOL,
+    location=OpenApiParameter.QUERY,
+    required=False,
+    description=(
+        "Render the response incrementally from the database instead of building it in "
+        "memory. The JSON body is identical, but it carries no ETag: an edit landing "
+        "mid-stream truncates the body, and the client should then retry."
+    ),
+)
+
+
+def _etag_headers(etag: str) -> dict[str, str]:
+    # ``no-cache`` lets browsers keep the body but revalidate it on every poll.
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+def _block_mutation_response(request, result, *, status_code: int = status.HTTP_200_OK):
+    if wants_delta_response(request):
+        return Response(ChapterBlockDeltaSerializer(result).data, status=status_code)
+    return Response(represent_chapter_detail(result), status=status_code)
+
+
 class ChapterDetailView(APIView):
     """Return the full content for a single chapter."""
 
     authentication_classes: list = []
     permission_classes: list = []
 
-    @extend_schema(responses=ChapterDetailSerializer)
-    def get(self, _request, chapter_id: str):
+    @extend_schema(
+        parameters=[STREAM_RESPONSE_PARAMETER],
+        responses={200: ChapterDetailSerializer, 304: None},
+    )
+    def get(self, request, chapter_id: str):
+        etag = None
+        revision_state = get_chapter_revision(chapter_id)
+        if revision_state is not None:
+            etag = build_chapter_etag(*revision_state)
+            if etag_matches(request, etag):
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers=_etag_headers(etag))
+
+        if etag is not None and wants_streaming_response(request):
+            header = materialize_chapter_header(chapter_id)
+            if header is None:
+                raise Http404("Chapter not found")
+            header = {**header, "pendingDrafts": get_chapter_block_drafts(chapter_id)}
+            # The status is sent before the body is complete, so a stream aborted by a
+            # concurrent edit must not be cached under a valid-looking ETag.
+            return streaming_json_response(
+                iter_chapter_detail_json(header),
+                headers={"Cache-Control": "no-store"},
+            )
+
         chapter = get_chapter_detail(chapter_id)
         if chapter is None:
             raise Http404("Chapter not found")
-        serializer = ChapterDetailSerializer(chapter)
-        return Response(serializer.data)
+        headers = None
+        if etag is not None:
+            chapter = {**chapter, "pendingDrafts": get_chapter_block_drafts(chapter_id)}
+            headers = _etag_headers(etag)
+        return Response(represent_chapter_detail(chapter), headers=headers)
 
     @extend_schema(request=ChapterUpsertSerializer, responses=ChapterSummarySerializer)
     def patch(self, request, chapter_id: str):
@@ -70,10 +193,6 @@ class ChapterDetailView(APIView):
             updates["summary"] = payload["summary"]
         if "ordinal" in payload:
             updates["ordinal"] = payload["ordinal"]
-        if "tokens" in payload:
-            updates["tokens"] = payload["tokens"]
-        if "wordCount" in payload:
-            updates["word_count"] = payload["wordCount"]
 
         try:
             chapter = update_chapter(chapter_id, updates)
@@ -92,17 +211,22 @@ class ChapterBlockUpdateView(APIView):
 
     @extend_schema(
         request=ChapterBlockUpdateSerializer,
-        responses=ChapterDetailSerializer,
+        parameters=[DELTA_RESPONSE_PARAMETER, IF_MATCH_PARAMETER, AUTOSAVE_PARAMETER],
+        responses={
+            200: ChapterDetailSerializer,
+            202: ChapterBlockAutosaveSerializer,
+            409: ChapterBlockConflictSerializer,
+        },
     )
     def patch(self, request, chapter_id: str, block_id: str):
-        chapter = get_chapter_detail(chapter_id)
-        if chapter is None:
-            raise Http404("Chapter not found")
-
         try:
-            existing_block = next(block for block in chapter["blocks"] if block["id"] == block_id)
-        except StopIteration as exc:
-            raise Http404("Block not found") from exc
+            expected_revision = if_match_revision(request)
+        except ValueError as exc:
+            raise ValidationError(str(exc)) from exc
+
+        existing_block = get_chapter_block(chapter_id, block_id)
+        if existing_block is None:
+            raise Http404("Block not found")
 
         serializer = ChapterBlockUpdateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -127,24 +251,75 @@ class ChapterBlockUpdateView(APIView):
             )
 
         try:
-            updated_chapter = update_chapter_block(chapter_id, block_id, payload)
+            if wants_autosave(request):
+                buffered = autosave_chapter_block(
+                    chapter_id,
+                    block_id,
+                    payload,
+                    expected_revision=expected_revision,
+                )
+                return Response(
+                    ChapterBlockAutosaveSerializer(buffered).data,
+                    status=status.HTTP_202_ACCEPTED,
+                )
+            result = update_chapter_block(
+                chapter_id,
+                block_id,
+                payload,
+                delta=wants_delta_response(request),
+                expected_revision=expected_revision,
+            )
         except KeyError as exc:
             raise Http404(str(exc)) from exc
         except ValueError as exc:
             raise ValidationError({"type": str(exc)}) from exc
+        except ChapterBlockConflictError as exc:
+            conflict = ChapterBlockConflictSerializer({"detail": str(exc), "block": exc.block})
+            return Response(conflict.data, status=status.HTTP_409_CONFLICT)
 
-        response_serializer = ChapterDetailSerializer(updated_chapter)
-        return Response(response_serializer.data)
+        return _block_mutation_response(request, result)
 
-    @extend_schema(responses=ChapterDetailSerializer)
-    def delete(self, _request, chapter_id: str, block_id: str):
+    @extend_schema(parameters=[DELTA_RESPONSE_PARAMETER], responses=ChapterDetailSerializer)
+    def delete(self, request, chapter_id: str, block_id: str):
         try:
-            updated_chapter = delete_chapter_block(chapter_id, block_id)
+            result = delete_chapter_block(
+                chapter_id,
+                block_id,
+                delta=wants_delta_response(request),
+            )
         except KeyError as exc:
             raise Http404(str(exc)) from exc
 
-        response_serializer = ChapterDetailSerializer(updated_chapter)
-        return Response(response_serializer.data)
+        return _block_mutation_response(request, result)
+
+
+class ChapterBlockCommitView(APIView):
+    """Write the autosaved changes buffered for a block as a version."""
+
+    authentication_classes: list = []
+    permission_classes: list = []
+
+    @extend_schema(
+        request=None,
+        parameters=[DELTA_RESPONSE_PARAMETER],
+        responses={200: ChapterDetailSerializer, 409: ChapterBlockConflictSerializer},
+    )
+    def post(self, request, chapter_id: str, block_id: str):
+        try:
+            result = commit_chapter_block_draft(
+                chapter_id,
+                block_id,
+                delta=wants_delta_response(request),
+            )
+        except KeyError as exc:
+            raise Http404(str(exc)) from exc
+        except ValueError as exc:
+            raise ValidationError(str(exc)) from exc
+        except ChapterBlockConflictError as exc:
+            conflict = ChapterBlockConflictSerializer({"detail": str(exc), "block": exc.block})
+            return Response(conflict.data, status=status.HTTP_409_CONFLICT)
+
+        return _block_mutation_response(request, result)
 
 
 class ChapterBlockVersionListView(APIView):
@@ -170,27 +345,56 @@ class ChapterBlockVersionDetailView(APIView):
     authentication_classes: list = []
     permission_classes: list = []
 
-    @extend_schema(responses=ChapterDetailSerializer)
-    def delete(self, _request, chapter_id: str, block_id: str, version: int):
+    @extend_schema(parameters=[DELTA_RESPONSE_PARAMETER], responses=ChapterDetailSerializer)
+    def delete(self, request, chapter_id: str, block_id: str, version: int):
         try:
-            updated_chapter = delete_chapter_block_version(chapter_id, block_id, int(version))
+            result = delete_chapter_block_version(
+                chapter_id,
+                block_id,
+                int(version),
+                delta=wants_delta_response(request),
+            )
         except KeyError as exc:
             raise Http404(str(exc)) from exc
         except ValueError as exc:
             raise ValidationError(str(exc)) from exc
 
-        serializer = ChapterDetailSerializer(updated_chapter)
-        return Response(serializer.data)
+        return _block_mutation_response(request, result)
 
 
 class ChapterBlockListView(APIView):
-    """Create blocks within a chapter."""
+    """List a window of blocks or create blocks within a chapter."""
 
     authentication_classes: list = []
     permission_classes: list = []
 
+    @extend_schema(
+        parameters=[ChapterBlockWindowQuerySerializer],
+        responses=ChapterBlockWindowSerializer,
+    )
+    def get(self, request, chapter_id: str):
+        serializer = ChapterBlockWindowQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        try:
+            window = get_chapter_block_window(
+                chapter_id,
+                after=params.get("after"),
+                before=params.get("before"),
+                limit=params["limit"],
+            )
+        except KeyError as exc:
+            raise Http404(str(exc)) from exc
+        except ValueError as exc:
+            raise ValidationError(str(exc)) from exc
+
+        response_serializer = ChapterBlockWindowSerializer(window)
+        return Response(response_serializer.data)
+
     @extend_schema(
         request=ChapterBlockCreateSerializer,
+        parameters=[DELTA_RESPONSE_PARAMETER],
         responses=ChapterDetailSerializer,
     )
     def post(self, request, chapter_id: str):
@@ -205,14 +409,104 @@ class ChapterBlockListView(APIView):
         )
 
         try:
-            updated_chapter = create_chapter_block(chapter_id, payload)
+            result = create_chapter_block(
+                chapter_id,
+                payload,
+                delta=wants_delta_response(request),
+            )
+        except KeyError as exc:
+            raise Http404(str(exc)) from exc
+        except ValueError as exc:
+            raise ValidationError(str(exc)) from exc
+
+        return _block_mutation_response(request, result, status_code=status.HTTP_201_CREATED)
+
+
+class ChapterBlockOperationsView(APIView):
+    """Apply a batch of block operations to a chapter in a single transaction."""
+
+    authentication_classes: list = []
+    permission_classes: list = []
+
+    @extend_schema(
+        request=ChapterBlockOperationsRequestSerializer,
+        responses=ChapterDetailSerializer,
+    )
+    def post(self, request, chapter_id: str):
+        serializer = ChapterBlockOperationsRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        operations = serializer.validated_data["operations"]
+
+        # Blocks created earlier in the batch can be updated by later operations.
+        update_ids = [item["blockId"] for item in operations if item["op"] == "update"]
+        known_blocks = {
+            block["id"]: block
+            for block in materialize_chapter_blocks(chapter_id, block_ids=update_ids)
+        }
+        for item in operations:
+            if item["op"] == "create":
+                block = flatten_structured_block_fields(
+                    item["block"],
+                    block_type=item["block"].get("type"),
+                    block_kind=item["block"].get("kind"),
+                )
+                item["block"] = block
+                if block.get("id"):
+                    known_blocks[block["id"]] = block
+            elif item["op"] == "update":
+                existing = known_blocks.get(item["blockId"], {})
+                item["changes"] = flatten_structured_block_fields(
+                    item["changes"],
+                    block_type=existing.get("type"),
+                    block_kind=existing.get("kind"),
+                )
+
+        try:
+            chapter = apply_chapter_block_operations(chapter_id, operations)
+        except KeyError as exc:
+            raise Http404(str(exc)) from exc
+        except ValueError as exc:
+            raise ValidationError({"operations": str(exc)}) from exc
+
+        return Response(represent_chapter_detail(chapter))
+
+
+class ChapterBlockTransferView(APIView):
+    """Move or copy a contiguous range of blocks into another chapter of the book."""
+
+    authentication_classes: list = []
+    permission_classes: list = []
+
+    @extend_schema(
+        request=ChapterBlockTransferRequestSerializer,
+        responses=ChapterBlockTransferSerializer,
+    )
+    def post(self, request, chapter_id: str):
+        serializer = ChapterBlockTransferRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        try:
+            result = transfer_chapter_blocks(
+                chapter_id,
+                data["firstBlockId"],
+                target_chapter_id=data["targetChapterId"],
+                last_block_id=data.get("lastBlockId"),
+                position=data.get("position"),
+                copy=data["mode"] == "copy",
+            )
         except KeyError as exc:
             raise Http404(str(exc)) from exc
         except ValueError as exc:
             raise ValidationError(str(exc)) from exc
 
-        response_serializer = ChapterDetailSerializer(updated_chapter)
-        return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+        return Response(
+            {
+                "blockIds": result["blockIds"],
+                "source": represent_chapter_detail(result["source"]),
+                "target": represent_chapter_detail(result["target"]),
+            }
+        )
 
 
 class ChapterContextVisibilityView(APIView):
@@ -223,15 +517,10 @@ class ChapterContextVisibilityView(APIView):
 
     @extend_schema(responses=LibraryResponseSerializer)
     def get(self, _request, chapter_id: str):
-        chapter = get_chapter_detail(chapter_id)
-        if chapter is None:
+        book_id = Chapter.objects.filter(pk=chapter_id).values_list("book_id", flat=True).first()
+        if book_id is None:
             raise Http404("Chapter not found")
 
-        book_id = chapter.get("bookId")
-        if not book_id:
-            serializer = LibraryResponseSerializer({"sections": []})
-            return Response(serializer.data)
-
         sections = get_book_context_sections(book_id, chapter_id=chapter_id)
         filtered_sections = _filter_book_scoped_items(sections)
 
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import io
+
 from django.http import Http404
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
 from rest_framework import status
 from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
@@ -15,11 +19,17 @@ from ..data import (
     delete_book_context_item,
     get_book_context_sections,
     get_library_books,
+    guess_manuscript_format,
+    import_manuscript,
+    iter_book_export,
+    iter_library_books,
     update_book,
     update_book_context_items,
 )
 from ..models import Book
+from ..representations import represent_library_books
 from ..serializers import (
+    BookExportQuerySerializer,
     BookUpsertSerializer,
     ChapterSummarySerializer,
     ChapterUpsertSerializer,
@@ -28,7 +38,15 @@ from ..serializers import (
     LibraryBookSerializer,
     LibraryBooksResponseSerializer,
     LibraryResponseSerializer,
+    ManuscriptImportRequestSerializer,
+    ManuscriptImportResultSerializer,
+)
+from .streaming import (
+    iter_library_books_json,
+    streaming_json_response,
+    streaming_text_response,
 )
+from .utils import wants_streaming_response
 
 __all__ = [
     "LibraryBookContextView",
@@ -37,6 +55,8 @@ __all__ = [
     "LibraryBookContextItemsView",
     "LibraryBookContextItemDetailView",
     "LibraryBookChaptersView",
+    "LibraryBookImportView",
+    "LibraryBookExportView",
 ]
 
 
@@ -64,11 +84,24 @@ class LibraryBooksView(APIView):
     authentication_classes: list = []
     permission_classes: list = []
 
-    @extend_schema(responses=LibraryBooksResponseSerializer)
-    def get(self, _request):
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="stream",
+                type=OpenApiTypes.BOOL,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description="Render the library incrementally, one book at a time.",
+            )
+        ],
+        responses=LibraryBooksResponseSerializer,
+    )
+    def get(self, request):
+        if wants_streaming_response(request):
+            return streaming_json_response(iter_library_books_json(iter_library_books()))
+
         books = get_library_books()
-        serializer = LibraryBooksResponseSerializer({"books": books})
-        return Response(serializer.data)
+        return Response(represent_library_books({"books": books}))
 
     @extend_schema(request=BookUpsertSerializer, responses=LibraryBookSerializer)
     def post(self, request):
@@ -150,8 +183,6 @@ class LibraryBookChaptersView(APIView):
                 title=payload["title"],
                 summary=payload.get("summary"),
                 ordinal=payload.get("ordinal"),
-                tokens=payload.get("tokens"),
-                word_count=payload.get("wordCount"),
             )
         except KeyError as exc:
             raise Http404(str(exc)) from exc
@@ -162,6 +193,73 @@ class LibraryBookChaptersView(APIView):
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
 
+class LibraryBookImportView(APIView):
+    """Append the chapters of an uploaded Markdown or plain-text manuscript to a book."""
+
+    authentication_classes: list = []
+    permission_classes: list = []
+    parser_classes = [MultiPartParser]
+
+    @extend_schema(
+        request={"multipart/form-data": ManuscriptImportRequestSerializer},
+        responses={201: ManuscriptImportResultSerializer},
+    )
+    def post(self, request, book_id: str):
+        serializer = ManuscriptImportRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        payload = serializer.validated_data
+
+        upload = payload["file"]
+        manuscript_format = payload.get("format") or guess_manuscript_format(upload.name or "")
+        # Decoded lazily line by line; large uploads stay in their temporary file.
+        lines = io.TextIOWrapper(upload.file, encoding="utf-8-sig", errors="replace")
+        try:
+            result = import_manuscript(
+                book_id,
+                lines,
+                markdown=manuscript_format == "markdown",
+                default_title=payload.get("defaultTitle") or "Sin título",
+            )
+        except KeyError as exc:
+            raise Http404(str(exc)) from exc
+
+        return Response(
+            ManuscriptImportResultSerializer(result).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class LibraryBookExportView(APIView):
+    """Stream a whole book as Markdown, plain text or JSON Lines."""
+
+    authentication_classes: list = []
+    permission_classes: list = []
+
+    CONTENT_TYPES = {
+        "markdown": ("text/markdown", "md"),
+        "text": ("text/plain", "txt"),
+        "jsonl": ("application/x-ndjson", "jsonl"),
+    }
+
+    @extend_schema(parameters=[BookExportQuerySerializer], responses={200: OpenApiTypes.STR})
+    def get(self, request, book_id: str):
+        query = BookExportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        export_format = query.validated_data["output"]
+
+        try:
+            chunks = iter_book_export(book_id, export_format)
+        except KeyError as exc:
+            raise Http404(str(exc)) from exc
+
+        content_type, extension = self.CONTENT_TYPES[export_format]
+        return streaming_text_response(
+            chunks,
+            content_type=content_type,
+            headers={"Content-Disposition": f'attachment; filename="{book_id}.{extension}"'},
+        )
+
+
 class LibraryBookContextItemDetailView(APIView):
     """Delete a single context item belonging to a book."""
 
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Iterable, Iterator
+
+from django.http import StreamingHttpResponse
+
+from ..data import get_chapter_revision
+from ..data.materializer import iter_chapter_block_payloads, iter_chapter_paragraphs
+from ..payloads import ChapterDetailPayload, LibraryBookPayload
+from ..representations import (
+    represent_chapter_block,
+    represent_chapter_detail,
+    represent_library_book,
+)
+
+__all__ = [
+    "ChapterChangedDuringStreamError",
+    "iter_chapter_detail_json",
+    "iter_library_books_json",
+    "streaming_json_response",
+    "streaming_text_response",
+]
+
+_FLUSH_SIZE = 16 * 1024
+
+# Matches the compact, non-ASCII-escaping output of DRF's JSONRenderer.
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+class ChapterChangedDuringStreamError(RuntimeError):
+    """The chapter was edited while its detail document was being streamed."""
+
+
+def _dumps(value: Any) -> str:
+    return _encoder.encode(value)
+
+
+def _iter_array(items: Iterable[Any], encode: Callable[[Any], str]) -> Iterator[str]:
+    yield "["
+    first = True
+    for item in items:
+        if not first:
+            yield ","
+        first = False
+        yield encode(item)
+    yield "]"
+
+
+def _iter_chapter_content(chapter_id: str) -> Iterator[str]:
+    # JSON escaping works character by character, so the escaped segments of each
+    # paragraph concatenate into the escaped ``join_paragraphs`` body.
+    yield '"'
+    separator = ""
+    for paragraph in iter_chapter_paragraphs(chapter_id):
+        yield separator + _dumps(paragraph.strip("\n"))[1:-1]
+        separator = "\\n\\n"
+    yield '"'
+
+
+def _ensure_unchanged(chapter_id: str, revision: Any) -> None:
+    state = get_chapter_revision(chapter_id)
+    if state is None or state[0] != revision:
+        raise ChapterChangedDuringStreamError(f"Chapter {chapter_id} changed while streaming")
+
+
+def iter_chapter_detail_json(header: ChapterDetailPayload) -> Iterator[str]:
+    """Yield the ``ChapterDetail`` JSON document for ``header`` in small fragments.
+
+    ``content``, ``paragraphs`` and ``blocks`` are produced from separate cursor passes
+    over the chapter blocks, so only one block is held in memory at a time. Every block
+    mutation bumps the chapter revision in its own transaction, so the revision is checked
+    after each pass; if it moved, the stream is aborted with
+    ``ChapterChangedDuringStreamError`` rather than finishing a document that mixes two
+    revisions. Streamed responses carry no ETag, so the client sees a truncated body it
+    cannot cache and retries.
+    """
+    chapter_id = header["id"]
+    fields = represent_chapter_detail({**header, "blocks": []})
+    streamed = {
+        "content": lambda: _iter_chapter_content(chapter_id),
+        "paragraphs": lambda: _iter_array(iter_chapter_paragraphs(chapter_id), _dumps),
+        "blocks": lambda: _iter_array(
+            iter_chapter_block_payloads(chapter_id),
+            lambda block: _dumps(represent_chapter_block(block)),
+        ),
+    }
+
+    yield "{"
+    for index, (key, value) in enumerate(fields.items()):
+        yield ("," if index else "") + _dumps(key) + ":"
+        if key in streamed:
+            yield from streamed[key]()
+            _ensure_unchanged(chapter_id, header.get("revision"))
+        else:
+            yield _dumps(value)
+    yield "}"
+
+
+def iter_library_books_json(books: Iterable[LibraryBookPayload]) -> Iterator[str]:
+    """Yield the ``LibraryBooksResponse`` JSON document one book at a time."""
+    yield '{"books":'
+    yield from _iter_array(books, lambda book: _dumps(represent_library_book(book)))
+    yield "}"
+
+
+def _iter_buffered(chunks: Iterable[str]) -> Iterator[bytes]:
+    buffer: list[str] = []
+    size = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= _FLUSH_SIZE:
+            yield "".join(buffer).encode("utf-8")
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def streaming_json_response(chunks: Iterable[str], **kwargs: Any) -> StreamingHttpResponse:
+    """Wrap JSON fragments in a response that flushes roughly every 16 KiB."""
+    return StreamingHttpResponse(
+        _iter_buffered(chunks),
+        content_type="application/json",
+        **kwargs,
+    )
+
+
+def streaming_text_response(
+    chunks: Iterable[str],
+    *,
+    content_type: str,
+    **kwargs: Any,
+) -> StreamingHttpResponse:
+    """Stream UTF-8 text fragments, flushing roughly every 16 KiB."""
+    return StreamingHttpResponse(
+        _iter_buffered(chunks),
+        content_type=f"{content_type}; charset=utf-8",
+        **kwargs,
+    )
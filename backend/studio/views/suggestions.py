@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from textwrap import dedent
-from typing import Any, Dict, List, Optional, Sequence, cast
+from typing import Any, Dict, List, Optional, Sequence, Tuple, cast
 
 from django.http import Http404
 from drf_spectacular.types import OpenApiTypes
@@ -24,13 +24,20 @@ from ..payloads import (
     ChapterBlockPayload,
     ContextItemPayload,
     MetadataBlockPayload,
+    PackedContextPayload,
     ParagraphBlockPayload,
     SceneBoundaryBlockPayload,
+    block_to_text,
 )
 from ..prompts import (
+    ContextItemRenderer,
     build_paragraph_suggestion_prompt,
     build_paragraph_suggestion_prompt_base,
+    context_token_budget,
+    pack_context_items,
+    render_paragraph_context_item,
 )
+from ..representations import represent_chapter_detail
 from ..serializers import (
     BlockConversionApplySerializer,
     BlockConversionRequestSerializer,
@@ -44,6 +51,7 @@ from ..serializers import (
     ParagraphSuggestionResponseSerializer,
 )
 from ..services.gemini import GeminiServiceError, generate_block_conversion
+from ..tokens import estimate_tokens
 
 __all__ = [
     "ChapterParagraphSuggestionView",
@@ -56,7 +64,6 @@ __all__ = [
 
 
 DEFAULT_SUGGESTION_MODEL = "gemini-2.5-flash-preview-09-2025"
-MAX_CONTEXT_ITEMS = 10
 
 
 class ChapterParagraphSuggestionView(APIView):
@@ -74,7 +81,7 @@ class ChapterParagraphSuggestionView(APIView):
         serializer.is_valid(raise_exception=True)
         payload = serializer.validated_data
 
-        prompt = _build_paragraph_prompt(
+        prompt, _context = _build_paragraph_prompt(
             chapter_id=chapter_id,
             block_id=payload.get("blockId"),
             instructions=payload.get("instructions"),
@@ -123,14 +130,20 @@ class ChapterParagraphSuggestionPromptView(APIView):
         serializer.is_valid(raise_exception=True)
         payload = serializer.validated_data
 
-        prompt = _build_paragraph_prompt(
+        prompt, context = _build_paragraph_prompt(
             chapter_id=chapter_id,
             block_id=payload.get("blockId"),
             instructions=payload.get("instructions"),
             include_response_format=False,
         )
 
-        response_serializer = ParagraphSuggestionPromptResponseSerializer({"prompt": prompt})
+        response_serializer = ParagraphSuggestionPromptResponseSerializer(
+            {
+                "prompt": prompt,
+                "tokens": estimate_tokens(prompt),
+                "context": _context_report(context),
+            }
+        )
         return Response(response_serializer.data)
 
 
@@ -184,7 +197,7 @@ class ChapterGeneralSuggestionPromptView(APIView):
         payload = serializer.validated_data
 
         try:
-            prompt = _build_general_suggestion_prompt(
+            prompt, context = _build_general_suggestion_prompt(
                 chapter_id=chapter_id,
                 placement=payload["placement"],
                 anchor_block_id=payload.get("anchorBlockId"),
@@ -196,7 +209,13 @@ class ChapterGeneralSuggestionPromptView(APIView):
         except ValueError as exc:
             raise ValidationError({"detail": str(exc)}) from exc
 
-        response_serializer = GeneralSuggestionPromptResponseSerializer({"prompt": prompt})
+        response_serializer = GeneralSuggestionPromptResponseSerializer(
+            {
+                "prompt": prompt,
+                "tokens": estimate_tokens(prompt),
+                "context": _context_report(context),
+            }
+        )
         return Response(response_serializer.data)
 
 
@@ -257,8 +276,7 @@ class BlockConversionApplyView(APIView):
         except (ValueError, BlockConversionError) as exc:
             raise ValidationError({"detail": str(exc)}) from exc
 
-        response_serializer = ChapterDetailSerializer(detail)
-        return Response(response_serializer.data)
+        return Response(represent_chapter_detail(detail))
 
 
 def _generate_general_suggestion(
@@ -269,7 +287,7 @@ def _generate_general_suggestion(
     user_prompt: str,
     model: Optional[str],
 ) -> Dict[str, Any]:
-    prompt = _build_general_suggestion_prompt(
+    prompt, _context = _build_general_suggestion_prompt(
         chapter_id=chapter_id,
         placement=placement,
         anchor_block_id=anchor_block_id,
@@ -298,7 +316,7 @@ def _build_general_suggestion_prompt(
     anchor_block_id: Optional[str],
     user_prompt: str,
     include_response_format: bool,
-) -> str:
+) -> Tuple[str, PackedContextPayload]:
     chapter = get_chapter_detail(chapter_id)
     if chapter is None:
         raise Http404("Chapter not found")
@@ -359,12 +377,14 @@ def _build_general_suggestion_prompt(
             book_author = metadata.get("author")
             book_synopsis = metadata.get("synopsis")
 
-        context_items = get_active_context_items(
-            book_id=book_id,
-            chapter_id=chapter.get("id"),
-        )
-    else:
-        context_items = []
+    packed_context = _pack_prompt_context(
+        "general",
+        render=_format_context_item_entry,
+        book_id=book_id,
+        chapter_id=chapter.get("id"),
+        focus_blocks=[*preceding_blocks, *following_blocks],
+        focus_notes=[cleaned_prompt],
+    )
 
     role_section = dedent(
         """
@@ -407,7 +427,10 @@ def _build_general_suggestion_prompt(
         scene_block=scene_block,
     )
 
-    context_items_section = _format_context_items_section(context_items)
+    context_items_section = _format_context_items_section(
+        packed_context["items"],
+        omitted=len(packed_context["dropped"]),
+    )
 
     sections = [
         role_section,
@@ -450,7 +473,41 @@ def _build_general_suggestion_prompt(
         ).strip()
         sections.append(response_section)
 
-    return "\n\n".join(section for section in sections if section)
+    return "\n\n".join(section for section in sections if section), packed_context
+
+
+def _pack_prompt_context(
+    prompt_type: str,
+    *,
+    render: ContextItemRenderer,
+    book_id: Optional[str],
+    chapter_id: Optional[str],
+    focus_blocks: Sequence[ChapterBlockPayload],
+    focus_notes: Sequence[Optional[str]],
+) -> PackedContextPayload:
+    """Fit the active context items of the book into the budget of ``prompt_type``."""
+    context_items = (
+        get_active_context_items(book_id=book_id, chapter_id=chapter_id) if book_id else []
+    )
+    focus_lines = [note for note in focus_notes if note]
+    for block in focus_blocks:
+        focus_lines.extend(block_to_text(block))
+    return pack_context_items(
+        context_items,
+        budget=context_token_budget(prompt_type),
+        render=render,
+        focus_text="\n".join(focus_lines),
+    )
+
+
+def _context_report(packed: PackedContextPayload) -> Dict[str, Any]:
+    return {
+        "budget": packed["budget"],
+        "tokens": packed["tokens"],
+        "included": [str(item.get("id")) for item in packed["items"]],
+        "trimmed": packed["trimmed"],
+        "dropped": packed["dropped"],
+    }
 
 
 def _resolve_insertion_surroundings(
@@ -598,36 +655,39 @@ def _format_chapter_overview(chapter: Dict[str, Any]) -> str:
     return "\n".join(lines)
 
 
+def _format_context_item_entry(item: ContextItemPayload) -> str:
+    item_type = item.get("type") or "desconocido"
+    scope = "capítulo" if item.get("chapterId") else "libro"
+    name = (
+        item.get("name")
+        or item.get("title")
+        or item.get("summary")
+        or item.get("description")
+        or "Elemento sin nombre"
+    )
+    summary = item.get("summary") or item.get("description")
+    entry = f"- ({item_type}, {scope}) {name}"
+    if summary:
+        trimmed = " ".join(summary.split())
+        if len(trimmed) > 160:
+            trimmed = trimmed[:157].rstrip() + "..."
+        entry += f": {trimmed}"
+    return entry
+
+
 def _format_context_items_section(
     context_items: Sequence[ContextItemPayload],
+    *,
+    omitted: int = 0,
 ) -> str:
     if not context_items:
         return ""
 
     lines = ["### Elementos de contexto activos"]
-    limited_items = list(context_items)[:MAX_CONTEXT_ITEMS]
-    for item in limited_items:
-        item_type = item.get("type") or "desconocido"
-        scope = "capítulo" if item.get("chapterId") else "libro"
-        name = (
-            item.get("name")
-            or item.get("title")
-            or item.get("summary")
-            or item.get("description")
-            or "Elemento sin nombre"
-        )
-        summary = item.get("summary") or item.get("description")
-        entry = f"- ({item_type}, {scope}) {name}"
-        if summary:
-            trimmed = " ".join(summary.split())
-            if len(trimmed) > 160:
-                trimmed = trimmed[:157].rstrip() + "..."
-            entry += f": {trimmed}"
-        lines.append(entry)
-
-    remaining = len(context_items) - len(limited_items)
-    if remaining > 0:
-        lines.append(f"- ... y {remaining} elementos adicionales.")
+    lines.extend(_format_context_item_entry(item) for item in context_items)
+
+    if omitted > 0:
+        lines.append(f"- ... y {omitted} elementos adicionales.")
 
     return "\n".join(lines)
 
@@ -732,7 +792,7 @@ def _build_paragraph_prompt(
     block_id: str | None,
     instructions: str | None,
     include_response_format: bool,
-) -> str:
+) -> Tuple[str, PackedContextPayload]:
     chapter = get_chapter_detail(chapter_id)
     if chapter is None:
         raise Http404("Chapter not found")
@@ -765,15 +825,19 @@ def _build_paragraph_prompt(
             book_author = metadata.get("author")
             book_synopsis = metadata.get("synopsis")
 
-    if book_id:
-        context_items = get_active_context_items(
-            book_id=book_id,
-            chapter_id=chapter.get("id"),
-        )
-    else:
-        context_items = []
-
     context = extract_chapter_context_for_block(chapter, block_id)
+    packed_context = _pack_prompt_context(
+        "paragraph",
+        render=render_paragraph_context_item,
+        book_id=book_id,
+        chapter_id=chapter.get("id"),
+        focus_blocks=[
+            *(context.get("preceding_blocks") or []),
+            *([paragraph_block] if paragraph_block else []),
+            *(context.get("following_blocks") or []),
+        ],
+        focus_notes=[instructions],
+    )
 
     prompt_builder = (
         build_paragraph_suggestion_prompt
@@ -781,16 +845,18 @@ def _build_paragraph_prompt(
         else build_paragraph_suggestion_prompt_base
     )
 
-    return prompt_builder(
+    prompt = prompt_builder(
         chapter=chapter,
         book_title=book_title,
         book_author=book_author,
         book_synopsis=book_synopsis,
         block=paragraph_block,
         user_instructions=instructions,
-        context_items=context_items,
+        context_items=packed_context["items"],
+        omitted_context_items=len(packed_context["dropped"]),
         metadata_block=context.get("metadata_block"),
         scene_block=context.get("scene_block"),
         preceding_blocks=context.get("preceding_blocks"),
         following_blocks=context.get("following_blocks"),
     )
+    return prompt, packed_context
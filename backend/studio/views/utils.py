@@ -1,15 +1,90 @@
 from __future__ import annotations
 
+from datetime import datetime
 from typing import Any, Dict, Iterable, Optional
 
+from django.utils.http import parse_etags
+
 from ..models import ChapterBlockType
 
 __all__ = [
     "coerce_optional_text",
     "normalize_theme_tags",
     "flatten_structured_block_fields",
+    "wants_delta_response",
+    "wants_streaming_response",
+    "wants_autosave",
+    "build_chapter_etag",
+    "etag_matches",
+    "if_match_revision",
 ]
 
+DELTA_RESPONSE_MODE = "delta"
+FLAG_VALUES = {"1", "true", "yes"}
+
+
+def wants_delta_response(request: Any) -> bool:
+    """Return whether the client opted into delta responses for block mutations."""
+    mode = request.query_params.get("response") or ""
+    return mode.strip().lower() == DELTA_RESPONSE_MODE
+
+
+def wants_streaming_response(request: Any) -> bool:
+    """Return whether the client asked for an incrementally rendered JSON body."""
+    flag = request.query_params.get("stream") or ""
+    return flag.strip().lower() in FLAG_VALUES
+
+
+def wants_autosave(request: Any) -> bool:
+    """Return whether a block edit should be buffered as an autosave."""
+    flag = request.query_params.get("autosave") or ""
+    return flag.strip().lower() in FLAG_VALUES
+
+
+def _microseconds(moment: datetime) -> str:
+    return f"{int(moment.timestamp() * 1_000_000):x}"
+
+
+def build_chapter_etag(
+    revision: int,
+    created_at: datetime,
+    drafts_updated_at: Optional[datetime] = None,
+) -> str:
+    """Return a strong ETag for a chapter revision.
+
+    The creation timestamp keeps tags distinct if a chapter id is ever reused; the latest
+    draft update distinguishes responses listing different pending autosave drafts.
+    """
+    tag = f"{int(revision)}-{_microseconds(created_at)}"
+    if drafts_updated_at is not None:
+        tag = f"{tag}-{_microseconds(drafts_updated_at)}"
+    return f'"{tag}"'
+
+
+def etag_matches(request: Any, etag: str) -> bool:
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    candidates = parse_etags(header)
+    return "*" in candidates or etag in candidates
+
+
+def if_match_revision(request: Any) -> Optional[int]:
+    """Return the block revision sent in ``If-Match``, or ``None`` when absent or ``*``.
+
+    Accepts the revision bare or quoted as an entity tag (``"7"`` or ``W/"7"``).
+    """
+    header = (request.headers.get("If-Match") or "").strip()
+    if not header or header == "*":
+        return None
+    candidates = parse_etags(header) or [header]
+    if len(candidates) != 1:
+        raise ValueError("If-Match debe indicar una sola revisión del bloque.")
+    value = candidates[0].removeprefix("W/").strip('"')
+    if not value.isdigit():
+        raise ValueError("If-Match debe contener la revisión numérica del bloque.")
+    return int(value)
+
 
 def coerce_optional_text(value: Optional[str]) -> Optional[str]:
     if value is None:
@@ -143,6 +143,40 @@ export interface paths {
         patch?: never;
         trace?: never;
     };
+    "/api/library/books/{book_id}/export/": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        /** @description Stream a whole book as Markdown, plain text or JSON Lines. */
+        get: operations["library_books_export_retrieve"];
+        put?: never;
+        post?: never;
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
+    "/api/library/books/{book_id}/import/": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        get?: never;
+        put?: never;
+        /** @description Append the chapters of an uploaded Markdown or plain-text manuscript to a book. */
+        post: operations["library_books_import_create"];
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
     "/api/library/chapters/{chapter_id}/": {
         parameters: {
             query?: never;
@@ -178,7 +212,7 @@ export interface paths {
         patch?: never;
         trace?: never;
     };
-    "/api/library/chapters/{chapter_id}/blocks/": {
+    "/api/library/chapters/{chapter_id}/block-operations/": {
         parameters: {
             query?: never;
             header?: never;
@@ -187,7 +221,42 @@ export interface paths {
         };
         get?: never;
         put?: never;
-        /** @description Create blocks within a chapter. */
+        /** @description Apply a batch of block operations to a chapter in a single transaction. */
+        post: operations["library_chapters_block_operations_create"];
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
+    "/api/library/chapters/{chapter_id}/block-transfers/": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        get?: never;
+        put?: never;
+        /** @description Move or copy a contiguous range of blocks into another chapter of the book. */
+        post: operations["library_chapters_block_transfers_create"];
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
+    "/api/library/chapters/{chapter_id}/blocks/": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        /** @description List a window of blocks or create blocks within a chapter. */
+        get: operations["library_chapters_blocks_retrieve"];
+        put?: never;
+        /** @description List a window of blocks or create blocks within a chapter. */
         post: operations["library_chapters_blocks_create"];
         delete?: never;
         options?: never;
@@ -213,6 +282,23 @@ export interface paths {
         patch: operations["library_chapters_blocks_partial_update"];
         trace?: never;
     };
+    "/api/library/chapters/{chapter_id}/blocks/{block_id}/commit/": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        get?: never;
+        put?: never;
+        /** @description Write the autosaved changes buffered for a block as a version. */
+        post: operations["library_chapters_blocks_commit_create"];
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
     "/api/library/chapters/{chapter_id}/blocks/{block_id}/versions/": {
         parameters: {
             query?: never;
@@ -384,6 +470,7 @@ export interface components {
             version?: number;
             readonly activeVersion: number;
             readonly versionCount: number;
+            readonly revision: number;
             text?: string;
             style?: string | null;
             tags?: string[];
@@ -411,6 +498,17 @@ export interface components {
             narrativeContext?: components["schemas"]["NarrativeContext"] | null;
             sceneDetails?: components["schemas"]["SceneDetails"] | null;
         };
+        ChapterBlockAutosave: {
+            chapterId: string;
+            revision: number;
+            block: components["schemas"]["ChapterBlock"];
+            /** Format: date-time */
+            pendingSince: string;
+        };
+        ChapterBlockConflict: {
+            detail: string;
+            block: components["schemas"]["ChapterBlock"] | null;
+        };
         ChapterBlockCreate: {
             id?: string;
             type: components["schemas"]["ChapterBlockTypeEnum"];
@@ -418,6 +516,7 @@ export interface components {
             version?: number;
             readonly activeVersion: number;
             readonly versionCount: number;
+            readonly revision: number;
             text?: string;
             style?: string | null;
             tags?: string[];
@@ -445,6 +544,35 @@ export interface components {
             narrativeContext?: components["schemas"]["NarrativeContext"] | null;
             sceneDetails?: components["schemas"]["SceneDetails"] | null;
         };
+        ChapterBlockDraft: {
+            block: components["schemas"]["ChapterBlock"];
+            /** Format: date-time */
+            pendingSince: string;
+        };
+        ChapterBlockOperation: {
+            op: components["schemas"]["OpEnum"];
+            blockId?: string;
+            block?: components["schemas"]["ChapterBlockCreate"];
+            changes?: components["schemas"]["PatchedChapterBlockUpdate"];
+            position?: number;
+            version?: number;
+        };
+        ChapterBlockOperationsRequest: {
+            operations: components["schemas"]["ChapterBlockOperation"][];
+        };
+        ChapterBlockTransfer: {
+            blockIds: string[];
+            source: components["schemas"]["ChapterDetail"];
+            target: components["schemas"]["ChapterDetail"];
+        };
+        ChapterBlockTransferRequest: {
+            /** @default move */
+            mode: components["schemas"]["ModeEnum"];
+            targetChapterId: string;
+            firstBlockId: string;
+            lastBlockId?: string;
+            position?: number;
+        };
         /**
          * @description * `paragraph` - paragraph
          *     * `dialogue` - dialogue
@@ -461,6 +589,14 @@ export interface components {
         ChapterBlockVersionList: {
             versions: components["schemas"]["ChapterBlockVersion"][];
         };
+        ChapterBlockWindow: {
+            chapterId: string;
+            revision: number;
+            blocks: components["schemas"]["ChapterBlock"][];
+            previousCursor: string | null;
+            nextCursor: string | null;
+            pendingDrafts: components["schemas"]["ChapterBlockDraft"][];
+        };
         ChapterContextVisibilityUpdateItem: {
             id: string;
             sectionSlug: string;
@@ -478,6 +614,8 @@ export interface components {
             blocks: components["schemas"]["ChapterBlock"][];
             bookId?: string | null;
             bookTitle?: string | null;
+            revision?: number | null;
+            pendingDrafts?: components["schemas"]["ChapterBlockDraft"][];
         };
         ChapterSummary: {
             id: string;
@@ -492,8 +630,6 @@ export interface components {
             title: string;
             summary?: string | null;
             ordinal?: number;
-            tokens?: number | null;
-            wordCount?: number | null;
         };
         ContextItem: {
             id: string;
@@ -543,6 +679,7 @@ export interface components {
             title?: string | null;
             description?: string | null;
             facts?: string | null;
+            tokens?: number | null;
         };
         ContextSection: {
             id: string;
@@ -558,6 +695,11 @@ export interface components {
             stageDirection?: string | null;
             tone?: string | null;
         };
+        DroppedContextItem: {
+            id: string;
+            name: string;
+            tokens: number;
+        };
         EditorState: {
             content: string;
             paragraphs: string[];
@@ -569,8 +711,16 @@ export interface components {
             chapterId?: string | null;
             chapterTitle?: string | null;
         };
+        /**
+         * @description * `markdown` - markdown
+         *     * `text` - text
+         * @enum {string}
+         */
+        FormatEnum: "markdown" | "text";
         GeneralSuggestionPromptResponse: {
             prompt: string;
+            tokens: number;
+            context: components["schemas"]["PromptContext"];
         };
         GeneralSuggestionRequest: {
             prompt: string;
@@ -587,6 +737,8 @@ export interface components {
             title: string;
             author?: string | null;
             synopsis?: string | null;
+            tokens?: number;
+            wordCount?: number;
             chapters: components["schemas"]["ChapterSummary"][];
         };
         LibraryBooksResponse: {
@@ -595,6 +747,24 @@ export interface components {
         LibraryResponse: {
             sections: components["schemas"]["ContextSection"][];
         };
+        ManuscriptImportRequest: {
+            /** Format: uri */
+            file: string;
+            format?: components["schemas"]["FormatEnum"];
+            defaultTitle?: string;
+        };
+        ManuscriptImportResult: {
+            bookId: string;
+            chapters: components["schemas"]["ChapterSummary"][];
+            blockCount: number;
+            wordCount: number;
+        };
+        /**
+         * @description * `move` - move
+         *     * `copy` - copy
+         * @enum {string}
+         */
+        ModeEnum: "move" | "copy";
         NarrativeContext: {
             povCharacterId?: string | null;
             povCharacterName?: string | null;
@@ -603,8 +773,19 @@ export interface components {
             locationName?: string | null;
             themeTags?: string[] | null;
         };
+        /**
+         * @description * `create` - create
+         *     * `update` - update
+         *     * `delete` - delete
+         *     * `move` - move
+         *     * `activateVersion` - activateVersion
+         * @enum {string}
+         */
+        OpEnum: "create" | "update" | "delete" | "move" | "activateVersion";
         ParagraphSuggestionPromptResponse: {
             prompt: string;
+            tokens: number;
+            context: components["schemas"]["PromptContext"];
         };
         ParagraphSuggestionRequest: {
             blockId?: string;
@@ -627,6 +808,7 @@ export interface components {
             version?: number;
             readonly activeVersion?: number;
             readonly versionCount?: number;
+            readonly revision?: number;
             text?: string;
             style?: string | null;
             tags?: string[];
@@ -662,8 +844,6 @@ export interface components {
             title?: string;
             summary?: string | null;
             ordinal?: number;
-            tokens?: number | null;
-            wordCount?: number | null;
         };
         PatchedContextItemsUpdateRequest: {
             items?: components["schemas"]["ContextItemUpdate"][];
@@ -675,6 +855,13 @@ export interface components {
          * @enum {string}
          */
         PlacementEnum: "before" | "after" | "append";
+        PromptContext: {
+            budget: number;
+            tokens: number;
+            included: string[];
+            trimmed: string[];
+            dropped: components["schemas"]["DroppedContextItem"][];
+        };
         SceneDetails: {
             locationId?: string | null;
             locationName?: string | null;
@@ -736,7 +923,10 @@ export interface operations {
     };
     library_books_retrieve: {
         parameters: {
-            query?: never;
+            query?: {
+                /** @description Render the library incrementally, one book at a time. */
+                stream?: boolean;
+            };
             header?: never;
             path?: never;
             cookie?: never;
@@ -939,10 +1129,66 @@ export interface operations {
             };
         };
     };
-    library_chapters_retrieve: {
+    library_books_export_retrieve: {
+        parameters: {
+            query?: {
+                /** @description Export format. ('format' is reserved by the API for content negotiation.)
+ *     
+ *     * `markdown` - markdown
+ *     * `text` - text
+ *     * `jsonl` - jsonl */
+                output?: "markdown" | "text" | "jsonl";
+            };
+            header?: never;
+            path: {
+                book_id: string;
+            };
+            cookie?: never;
+        };
+        requestBody?: never;
+        responses: {
+            200: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": string;
+                };
+            };
+        };
+    };
+    library_books_import_create: {
         parameters: {
             query?: never;
             header?: never;
+            path: {
+                book_id: string;
+            };
+            cookie?: never;
+        };
+        requestBody: {
+            content: {
+                "multipart/form-data": components["schemas"]["ManuscriptImportRequest"];
+            };
+        };
+        responses: {
+            201: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["ManuscriptImportResult"];
+                };
+            };
+        };
+    };
+    library_chapters_retrieve: {
+        parameters: {
+            query?: {
+                /** @description Render the response incrementally from the database instead of building it in memory. The JSON body is identical, but it carries no ETag: an edit landing mid-stream truncates the body, and the client should then retry. */
+                stream?: boolean;
+            };
+            header?: never;
             path: {
                 chapter_id: string;
             };
@@ -958,6 +1204,13 @@ export interface operations {
                     "application/json": components["schemas"]["ChapterDetail"];
                 };
             };
+            /** @description No response body */
+            304: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content?: never;
+            };
         };
     };
     library_chapters_partial_update: {
@@ -1010,7 +1263,7 @@ export interface operations {
             };
         };
     };
-    library_chapters_blocks_create: {
+    library_chapters_block_operations_create: {
         parameters: {
             query?: never;
             header?: never;
@@ -1019,6 +1272,84 @@ export interface operations {
             };
             cookie?: never;
         };
+        requestBody: {
+            content: {
+                "application/json": components["schemas"]["ChapterBlockOperationsRequest"];
+            };
+        };
+        responses: {
+            200: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["ChapterDetail"];
+                };
+            };
+        };
+    };
+    library_chapters_block_transfers_create: {
+        parameters: {
+            query?: never;
+            header?: never;
+            path: {
+                chapter_id: string;
+            };
+            cookie?: never;
+        };
+        requestBody: {
+            content: {
+                "application/json": components["schemas"]["ChapterBlockTransferRequest"];
+            };
+        };
+        responses: {
+            200: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["ChapterBlockTransfer"];
+                };
+            };
+        };
+    };
+    library_chapters_blocks_retrieve: {
+        parameters: {
+            query?: {
+                after?: string;
+                before?: string;
+                limit?: number;
+            };
+            header?: never;
+            path: {
+                chapter_id: string;
+            };
+            cookie?: never;
+        };
+        requestBody?: never;
+        responses: {
+            200: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["ChapterBlockWindow"];
+                };
+            };
+        };
+    };
+    library_chapters_blocks_create: {
+        parameters: {
+            query?: {
+                /** @description Use 'delta' to receive only the changed and shifted blocks plus the new chapter revision (ChapterBlockDelta) instead of the full chapter detail. */
+                response?: "delta" | "full";
+            };
+            header?: never;
+            path: {
+                chapter_id: string;
+            };
+            cookie?: never;
+        };
         requestBody: {
             content: {
                 "application/json": components["schemas"]["ChapterBlockCreate"];
@@ -1037,7 +1368,10 @@ export interface operations {
     };
     library_chapters_blocks_destroy: {
         parameters: {
-            query?: never;
+            query?: {
+                /** @description Use 'delta' to receive only the changed and shifted blocks plus the new chapter revision (ChapterBlockDelta) instead of the full chapter detail. */
+                response?: "delta" | "full";
+            };
             header?: never;
             path: {
                 block_id: string;
@@ -1058,8 +1392,16 @@ export interface operations {
     };
     library_chapters_blocks_partial_update: {
         parameters: {
-            query?: never;
-            header?: never;
+            query?: {
+                /** @description Buffer the content changes instead of writing a block version. Rapid autosaves of a block are merged into one version, written when another block is edited, on commit, or once the autosave window has passed. Responds 202 with ChapterBlockAutosave. Until written, chapter detail and block window responses list the buffered block in pendingDrafts, and a regular edit of the block includes them. */
+                autosave?: boolean;
+                /** @description Use 'delta' to receive only the changed and shifted blocks plus the new chapter revision (ChapterBlockDelta) instead of the full chapter detail. */
+                response?: "delta" | "full";
+            };
+            header?: {
+                /** @description Block revision the edit is based on. When the block has moved on, the update is rejected with 409 and the current block state. */
+                "If-Match"?: string;
+            };
             path: {
                 block_id: string;
                 chapter_id: string;
@@ -1080,6 +1422,55 @@ export interface operations {
                     "application/json": components["schemas"]["ChapterDetail"];
                 };
             };
+            202: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["ChapterBlockAutosave"];
+                };
+            };
+            409: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["ChapterBlockConflict"];
+                };
+            };
+        };
+    };
+    library_chapters_blocks_commit_create: {
+        parameters: {
+            query?: {
+                /** @description Use 'delta' to receive only the changed and shifted blocks plus the new chapter revision (ChapterBlockDelta) instead of the full chapter detail. */
+                response?: "delta" | "full";
+            };
+            header?: never;
+            path: {
+                block_id: string;
+                chapter_id: string;
+            };
+            cookie?: never;
+        };
+        requestBody?: never;
+        responses: {
+            200: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["ChapterDetail"];
+                };
+            };
+            409: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["ChapterBlockConflict"];
+                };
+            };
         };
     };
     library_chapters_blocks_versions_retrieve: {
@@ -1106,7 +1497,10 @@ export interface operations {
     };
     library_chapters_blocks_versions_destroy: {
         parameters: {
-            query?: never;
+            query?: {
+                /** @description Use 'delta' to receive only the changed and shifted blocks plus the new chapter revision (ChapterBlockDelta) instead of the full chapter detail. */
+                response?: "delta" | "full";
+            };
             header?: never;
             path: {
                 block_id: string;